@@ -0,0 +1,497 @@
+"""
+In-memory menu catalog snapshot with an inverted-index search engine
+Holds every fc_menu_items row (plus its section and restaurant) in process
+memory and answers menu searches with BM25 scoring over name, description,
+section and restaurant, so a lookup costs microseconds instead of a PostgREST
+round trip and items matching any query word can be found.
+
+database.py owns loading rows from Supabase; this module is pure data.
+"""
+
+import bisect
+import math
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fuzzy import FuzzyIndex
+
+# Field weights for BM25F-style term frequencies: a hit in the item name
+# counts three times as much as one in the description.
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "section": 1.0,
+    "restaurant": 1.0,
+    "description": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Minimum fuzzy score for replacing an unknown query word with an indexed term
+FUZZY_MIN_SCORE = 0.5
+# Close-sounding terms weighed against the rest of the query before one is picked
+FUZZY_CANDIDATES = 5
+# Partial item names shorter than this are not matched as word prefixes
+NAME_PREFIX_MIN_LENGTH = 3
+# Equally good item matches offered back to the user ("Jerk Chicken or Chicken Satay?")
+PRICE_CANDIDATES = 3
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "with", "for", "to", "in", "on", "or",
+    "some", "me", "i", "want", "like", "get", "style", "please", "any",
+}
+NEGATIONS = {"no", "without", "not"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+CATALOG_TABLES = ("fc_restaurants", "fc_menu_sections", "fc_menu_items")
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a PostgREST timestamptz string ("2026-02-13T01:23:11.041133+00:00")"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def stem(token: str) -> str:
+    """Very small plural stemmer so "tacos" matches "taco" and "dumplings" matches "dumpling" """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and stem"""
+    return [
+        stem(token)
+        for token in _TOKEN_RE.findall((text or "").lower())
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Case- and punctuation-insensitive form of an item name ("Pad Thai!" -> "pad thai")"""
+    return " ".join(_TOKEN_RE.findall((name or "").lower()))
+
+
+def parse_query(query: str) -> Tuple[List[str], Set[str]]:
+    """
+    Split a query into scoring terms and excluded terms.
+    "cheesecake no chocolate" -> (["cheesecake"], {"chocolate"})
+    """
+    terms: List[str] = []
+    excluded: Set[str] = set()
+    negate = False
+    for raw in _TOKEN_RE.findall((query or "").lower()):
+        if raw in NEGATIONS:
+            negate = True
+            continue
+        if raw in STOPWORDS or len(raw) <= 1:
+            continue
+        token = stem(raw)
+        if negate:
+            excluded.add(token)
+            negate = False
+        else:
+            terms.append(token)
+    return terms, excluded
+
+
+class MenuCatalog:
+    """
+    Process-local snapshot of restaurants, sections and menu items.
+    Rows can be replaced one at a time (upsert_* / remove_item), which keeps
+    the inverted index in step without rebuilding it.
+    """
+
+    def __init__(self) -> None:
+        self.restaurants: Dict[str, Dict[str, Any]] = {}
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        # table -> newest updated_at seen, the watermark for incremental sync
+        self.watermarks: Dict[str, datetime] = {}
+        # term -> {item_id: weighted term frequency}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # Phonetic keys / trigram signatures of every indexed term, for STT near-misses
+        self.vocabulary = FuzzyIndex()
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._total_len = 0.0
+        self._items_by_restaurant: Dict[str, Set[str]] = defaultdict(set)
+        self._items_by_section: Dict[str, Set[str]] = defaultdict(set)
+        # Normalized item name -> item ids, plus a fuzzy index of those names,
+        # for resolving spoken cart items to priced catalog rows
+        self._items_by_name: Dict[str, Set[str]] = defaultdict(set)
+        self.item_names = FuzzyIndex()
+        # Word -> normalized item names containing it, for partial names ("tea" -> "iced tea"),
+        # and its keys sorted for prefix lookups ("marg" -> "margherita") by bisection
+        self._names_by_word: Dict[str, Set[str]] = defaultdict(set)
+        self._name_words: List[str] = []
+
+    # ------------------------------------------------------------------
+    # Loading and incremental updates
+    # ------------------------------------------------------------------
+
+    def load(
+        self,
+        restaurants: Iterable[Dict[str, Any]],
+        sections: Iterable[Dict[str, Any]],
+        items: Iterable[Dict[str, Any]],
+    ) -> None:
+        """Replace the snapshot with raw fc_restaurants / fc_menu_sections / fc_menu_items rows"""
+        self.__init__()
+        self.restaurants = {row["id"]: row for row in restaurants}
+        self.sections = {row["id"]: row for row in sections}
+        for row in items:
+            self._store_item(row)
+        for table, rows in (
+            ("fc_restaurants", self.restaurants.values()),
+            ("fc_menu_sections", self.sections.values()),
+            ("fc_menu_items", self.items.values()),
+        ):
+            for row in rows:
+                self._advance_watermark(table, row.get("updated_at"))
+        self.loaded = True
+
+    def apply_changes(self, table: str, rows: Iterable[Dict[str, Any]]) -> Set[str]:
+        """
+        Patch changed rows from a change feed into the snapshot.
+        Rows whose updated_at matches the stored copy are skipped, so replaying
+        an overlapping window is cheap. Returns ids of restaurants whose data
+        changed. Soft deletes (is_available / is_active = false) arrive as
+        ordinary updates and are filtered at search time.
+        """
+        stores = {
+            "fc_restaurants": self.restaurants,
+            "fc_menu_sections": self.sections,
+            "fc_menu_items": self.items,
+        }
+        store = stores[table]
+        touched: Set[str] = set()
+        for row in rows:
+            current = store.get(row["id"])
+            if current is not None and current.get("updated_at") == row.get("updated_at"):
+                continue
+            if table == "fc_restaurants":
+                self.upsert_restaurant(row)
+                touched.add(row["id"])
+            elif table == "fc_menu_sections":
+                self.upsert_section(row)
+                touched.add(row.get("restaurant_id"))
+            else:
+                if current is not None:
+                    touched.add(current.get("restaurant_id"))
+                self.upsert_item(row)
+                touched.add(row.get("restaurant_id"))
+            self._advance_watermark(table, row.get("updated_at"))
+        touched.discard(None)
+        return touched
+
+    def _advance_watermark(self, table: str, updated_at: Optional[str]) -> None:
+        stamp = parse_timestamp(updated_at)
+        if stamp is not None and (table not in self.watermarks or stamp > self.watermarks[table]):
+            self.watermarks[table] = stamp
+
+    def upsert_restaurant(self, row: Dict[str, Any]) -> None:
+        """Insert or replace a restaurant row and re-index its items"""
+        self.restaurants[row["id"]] = row
+        for item_id in list(self._items_by_restaurant.get(row["id"], ())):
+            self._index_item(item_id)
+
+    def upsert_section(self, row: Dict[str, Any]) -> None:
+        """Insert or replace a menu section row and re-index its items"""
+        self.sections[row["id"]] = row
+        for item_id in list(self._items_by_section.get(row["id"], ())):
+            self._index_item(item_id)
+
+    def upsert_item(self, row: Dict[str, Any]) -> None:
+        """Insert or replace a menu item row"""
+        self._store_item(row)
+
+    def remove_item(self, item_id: str) -> None:
+        """Drop a menu item from the snapshot"""
+        row = self.items.pop(item_id, None)
+        if row is None:
+            return
+        self._unindex_item(item_id)
+        self._items_by_restaurant[row.get("restaurant_id")].discard(item_id)
+        self._items_by_section[row.get("section_id")].discard(item_id)
+        self._unindex_name(item_id, row)
+
+    def set_image(self, item_id: str, image_url: str) -> None:
+        """Record an image fetched for an item after the snapshot was taken"""
+        row = self.items.get(item_id)
+        if row is not None:
+            row["image"] = image_url
+
+    def _store_item(self, row: Dict[str, Any]) -> None:
+        previous = self.items.get(row["id"])
+        if previous is not None:
+            self._items_by_restaurant[previous.get("restaurant_id")].discard(row["id"])
+            self._items_by_section[previous.get("section_id")].discard(row["id"])
+            self._unindex_name(row["id"], previous)
+        self.items[row["id"]] = row
+        self._items_by_restaurant[row.get("restaurant_id")].add(row["id"])
+        self._items_by_section[row.get("section_id")].add(row["id"])
+        name = normalize_name(row.get("name"))
+        if name:
+            if name not in self._items_by_name:
+                self.item_names.add(name)
+                for word in name.split():
+                    if word not in self._names_by_word:
+                        bisect.insort(self._name_words, word)
+                    self._names_by_word[word].add(name)
+            self._items_by_name[name].add(row["id"])
+        self._index_item(row["id"])
+
+    def _unindex_name(self, item_id: str, row: Dict[str, Any]) -> None:
+        name = normalize_name(row.get("name"))
+        ids = self._items_by_name.get(name)
+        if ids is None:
+            return
+        ids.discard(item_id)
+        if not ids:
+            del self._items_by_name[name]
+            self.item_names.discard(name)
+            for word in name.split():
+                self._names_by_word[word].discard(name)
+                if not self._names_by_word[word]:
+                    del self._names_by_word[word]
+                    del self._name_words[bisect.bisect_left(self._name_words, word)]
+
+    def _index_item(self, item_id: str) -> None:
+        self._unindex_item(item_id)
+        row = self.items[item_id]
+        section = self.sections.get(row.get("section_id")) or {}
+        restaurant = self.restaurants.get(row.get("restaurant_id")) or {}
+        fields = {
+            "name": row.get("name"),
+            "description": row.get("description"),
+            "section": section.get("name"),
+            "restaurant": f"{restaurant.get('name') or ''} {restaurant.get('cuisine') or ''}",
+        }
+        terms: Dict[str, float] = defaultdict(float)
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                terms[token] += weight
+        for term, tf in terms.items():
+            if term not in self._postings:
+                self.vocabulary.add(term)
+            self._postings[term][item_id] = tf
+        self._doc_terms[item_id] = terms
+        length = sum(terms.values())
+        self._doc_len[item_id] = length
+        self._total_len += length
+
+    def _unindex_item(self, item_id: str) -> None:
+        terms = self._doc_terms.pop(item_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(item_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self.vocabulary.discard(term)
+        self._total_len -= self._doc_len.pop(item_id, 0.0)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def is_searchable(self, item_id: str) -> bool:
+        """Available item whose restaurant is active"""
+        row = self.items[item_id]
+        if row.get("is_available") is False:
+            return False
+        restaurant = self.restaurants.get(row.get("restaurant_id"))
+        return restaurant is None or restaurant.get("is_active") is not False
+
+    def correct_term(self, term: str, context: Iterable[str] = ()) -> str:
+        """
+        Map a word missing from the index to the closest-sounding indexed term.
+        Sound alone is often ambiguous ("tie" is as close to "tea" as to "thai"),
+        so a candidate that appears in items alongside the context terms (the
+        rest of the query) wins over a slightly closer one that never does:
+        "pad tie" -> "thai".
+        """
+        if term in self._postings:
+            return term
+        matches = self.vocabulary.lookup(term, limit=FUZZY_CANDIDATES, min_score=FUZZY_MIN_SCORE)
+        if not matches:
+            return term
+        context_postings = [self._postings[word] for word in context if word in self._postings]
+        if not context_postings:
+            return matches[0][0]
+        for candidate, _ in matches:
+            if any(item_id in postings for item_id in self._postings[candidate] for postings in context_postings):
+                return candidate
+        return matches[0][0]
+
+    def search(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """Rank available items for a free-text query; returns rows in search_menu_items shape"""
+        terms, excluded = parse_query(query)
+        if not terms or not self._doc_len:
+            return []
+        # Correct unknown words in the context of the known ones (and of earlier corrections)
+        context = [term for term in terms if term in self._postings]
+        for position, term in enumerate(terms):
+            if term not in self._postings:
+                terms[position] = self.correct_term(term, context)
+                context.append(terms[position])
+        excluded = {self.correct_term(term, terms) for term in excluded}
+
+        doc_count = len(self._doc_len)
+        avg_len = self._total_len / doc_count if doc_count else 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for item_id, tf in postings.items():
+                norm = 1 - BM25_B + BM25_B * self._doc_len[item_id] / avg_len
+                scores[item_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        excluded_ids: Set[str] = set()
+        for term in excluded:
+            excluded_ids.update(self._postings.get(term, {}))
+
+        ranked = sorted(
+            (item_id for item_id in scores if item_id not in excluded_ids and self.is_searchable(item_id)),
+            key=lambda item_id: (-scores[item_id], self.items[item_id].get("name") or ""),
+        )
+        return [self.to_result(item_id) for item_id in ranked[:max_results]]
+
+    def to_result(self, item_id: str) -> Dict[str, Any]:
+        """Shape an item like the rows returned by database.search_menu_items"""
+        row = self.items[item_id]
+        section = self.sections.get(row.get("section_id")) or {}
+        restaurant = self.restaurants.get(row.get("restaurant_id")) or {}
+        return {
+            "id": row["id"],
+            "slug": row.get("slug"),
+            "name": row.get("name"),
+            "description": row.get("description"),
+            "price": row.get("base_price", 0),
+            "tags": row.get("dietary_tags") or [],
+            "calories": row.get("calories"),
+            "sectionTitle": section.get("name"),
+            "restaurantId": restaurant.get("id"),
+            "restaurantSlug": restaurant.get("slug"),
+            "restaurantName": restaurant.get("name"),
+            "image": row.get("image"),
+        }
+
+    # ------------------------------------------------------------------
+    # Price lookup
+    # ------------------------------------------------------------------
+
+    def price_lookup(
+        self,
+        name: str,
+        restaurant_ids: Iterable[str] = (),
+        min_score: float = FUZZY_MIN_SCORE,
+    ) -> Optional[Dict[str, Any]]:
+        """The priced item a spoken name resolves to, or None if no item or several equally good ones match"""
+        candidates = self.price_candidates(name, restaurant_ids, min_score)
+        return candidates[0] if len(candidates) == 1 else None
+
+    def price_candidates(
+        self,
+        name: str,
+        restaurant_ids: Iterable[str] = (),
+        min_score: float = FUZZY_MIN_SCORE,
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolve a spoken item name to priced, orderable items (see price_entry).
+        An exact name match wins, then names containing every spoken word
+        ("tea" -> "Iced Tea"), then a fuzzy match ("pad tie" -> "Pad Thai").
+        One entry means the name resolved; several (at most PRICE_CANDIDATES)
+        mean different items match equally well ("chicken") and the user should
+        be asked which. Among those, and when several restaurants sell the
+        item, restaurant_ids (e.g. the restaurants already in the cart) are
+        preferred.
+        """
+        normalized = normalize_name(name)
+        if not normalized:
+            return []
+        if normalized in self._items_by_name:
+            ranked = [[normalized]]
+        else:
+            ranked = self._names_containing(normalized) or [
+                [match] for match, _ in self.item_names.lookup(normalized, limit=3, min_score=min_score)
+            ]
+        preferred = set(restaurant_ids)
+        for tied in ranked:
+            entries = [entry for entry in (self._orderable_entry(candidate, preferred) for candidate in tied) if entry]
+            if entries:
+                in_cart = [entry for entry in entries if entry["restaurantId"] in preferred]
+                return (in_cart if len(in_cart) == 1 else entries)[:PRICE_CANDIDATES]
+        return []
+
+    def _orderable_entry(self, name: str, preferred: Set[str]) -> Optional[Dict[str, Any]]:
+        """price_entry of an available item with this normalized name, from a preferred restaurant if possible"""
+        item_ids = sorted(item_id for item_id in self._items_by_name.get(name, ()) if self.is_searchable(item_id))
+        if not item_ids:
+            return None
+        chosen = next(
+            (item_id for item_id in item_ids if self.items[item_id].get("restaurant_id") in preferred),
+            item_ids[0],
+        )
+        return self.price_entry(chosen)
+
+    def _names_containing(self, normalized: str) -> List[List[str]]:
+        """
+        Item names containing every word of a partial name, the last word also
+        as a prefix ("marg" -> "margherita pizza"), grouped by how well they
+        match: whole-word matches before prefix matches, then fewest extra
+        words. Prefixes are found by bisecting the sorted word list, so the
+        cost tracks the number of matching words, not the vocabulary.
+        """
+        *words, last = normalized.split()
+        whole = set(self._names_by_word.get(last, ()))
+        prefixed: Set[str] = set()
+        if len(last) >= NAME_PREFIX_MIN_LENGTH:
+            index = bisect.bisect_right(self._name_words, last)
+            while index < len(self._name_words) and self._name_words[index].startswith(last):
+                prefixed |= self._names_by_word[self._name_words[index]]
+                index += 1
+        for word in words:
+            names = self._names_by_word.get(word, set())
+            whole &= names
+            prefixed &= names
+        groups: Dict[Tuple[bool, int], List[str]] = defaultdict(list)
+        for match in whole:
+            groups[(False, len(match.split()))].append(match)
+        for match in prefixed - whole:
+            groups[(True, len(match.split()))].append(match)
+        return [sorted(groups[rank]) for rank in sorted(groups)]
+
+    def price_entry(self, item_id: str) -> Dict[str, Any]:
+        """Current price and delivery fee of an item, read from the live rows"""
+        row = self.items[item_id]
+        restaurant = self.restaurants.get(row.get("restaurant_id")) or {}
+        return {
+            "menuItemId": row["id"],
+            "name": row.get("name"),
+            "basePrice": float(row.get("base_price") or 0),
+            "restaurantId": restaurant.get("id"),
+            "restaurantSlug": restaurant.get("slug"),
+            "restaurantName": restaurant.get("name"),
+            "deliveryFee": float(restaurant.get("delivery_fee") or 0),
+        }
+
+    def __len__(self) -> int:
+        return len(self.items)
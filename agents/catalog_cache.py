@@ -0,0 +1,116 @@
+"""
+In-process TTL/LRU cache for catalog query results
+Restaurant and menu data change rarely, so database.py keeps recent results of
+search_menu_items, search_restaurants_by_cuisine and get_restaurant_menu here
+instead of round-tripping to Supabase for every repeated query.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def normalize_query(text: Optional[str]) -> str:
+    """Normalize a free-text argument for use in a cache key ("  Pad  THAI " -> "pad thai")"""
+    return " ".join((text or "").lower().split())
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a JSON-like value in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a TTLCache"""
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class TTLCache:
+    """
+    Bounded, size-aware LRU cache with a per-entry time to live.
+    Entries are evicted least-recently-used first once either max_entries or
+    max_bytes is exceeded; expired entries are dropped when looked up.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting least recently used entries if over budget"""
+        if self.max_entries <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + (ttl if ttl is not None else self.ttl), size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop every entry whose key matches predicate (all entries if None); returns the count"""
+        keys = [key for key in self._entries if predicate is None or predicate(key)]
+        for key in keys:
+            self._remove(key)
+        self.stats.invalidations += len(keys)
+        return len(keys)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and occupancy for logging or metrics"""
+        return {
+            **asdict(self.stats),
+            "hitRate": round(self.stats.hit_rate, 3),
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,176 @@
+"""
+Batched data-channel publisher for frontend events
+Tools and transcript handlers used to call local_participant.publish_data()
+directly (the transcript handlers spawning an untracked task per message).
+DataPublisher gives each session one outbound queue drained by a single pump
+task: messages published within a short window are coalesced into one
+{"type": "batch", "messages": [...]} packet, at most max_in_flight packets are
+sent at once, failed sends back off and retry, and aclose() flushes what is
+left at session end. Once the frontend negotiates it (see wire_format.py),
+large packets are deflate-compressed. Messages published with flush=True
+(streamed menu chunks) end the window early so they are not held back for
+the rest of the batch.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from metrics import PUBLISH_DURATION, timed
+from tracing import span
+from wire_format import compress_packet
+
+logger = logging.getLogger("food-concierge-agentserver")
+
+# Coalescing window (seconds) after the first queued message
+DATA_BATCH_WINDOW = float(os.getenv("DATA_BATCH_WINDOW_SECONDS", "0.02"))
+# Keep packets under LiveKit's recommended reliable-packet size; larger single
+# messages are still sent, just on their own
+DATA_BATCH_MAX_BYTES = int(os.getenv("DATA_BATCH_MAX_BYTES", "14000"))
+# Concurrent publish_data calls; 1 keeps packets in order
+DATA_MAX_IN_FLIGHT = int(os.getenv("DATA_MAX_IN_FLIGHT", "1"))
+DATA_MAX_RETRIES = int(os.getenv("DATA_MAX_RETRIES", "3"))
+DATA_RETRY_BACKOFF = float(os.getenv("DATA_RETRY_BACKOFF_SECONDS", "0.1"))
+
+
+class DataPublisher:
+    """
+    Per-session outbound queue for JSON events sent over the data channel.
+    publish() is synchronous and never spawns a task; the pump is started on
+    first use and owned by the publisher.
+    """
+
+    def __init__(
+        self,
+        room: Any,
+        *,
+        window: float = DATA_BATCH_WINDOW,
+        max_batch_bytes: int = DATA_BATCH_MAX_BYTES,
+        max_in_flight: int = DATA_MAX_IN_FLIGHT,
+        max_retries: int = DATA_MAX_RETRIES,
+        retry_backoff: float = DATA_RETRY_BACKOFF,
+    ) -> None:
+        self._room = room
+        self.window = window
+        self.max_batch_bytes = max_batch_bytes
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "asyncio.Queue[bytes]" = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._pump: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()
+        self._closed = False
+        # Set when the frontend's client_hello accepts deflate-json
+        self.compress = False
+        # Consecutive failed sends; widens the coalescing window under congestion
+        self._congestion = 0
+        # Messages published but not yet sent or dropped
+        self._unsent = 0
+        # Set by publish(flush=True): send what is queued without waiting out the window
+        self._flush_now = asyncio.Event()
+        self.stats = {"messages": 0, "packets": 0, "bytes": 0, "retries": 0, "dropped": 0}
+
+    def publish(self, message: Dict[str, Any], flush: bool = False) -> None:
+        """Queue one JSON-serializable event for the frontend; flush sends it without waiting out the coalescing window"""
+        if self._closed:
+            logger.warning(f"   ⚠️ Publisher closed, dropping {message.get('type')} event")
+            self.stats["dropped"] += 1
+            return
+        self._queue.put_nowait(json.dumps(message).encode())
+        self._unsent += 1
+        self.stats["messages"] += 1
+        if flush:
+            self._flush_now.set()
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            # Collect whatever else arrives within the window (longer while congested)
+            if not self._flush_now.is_set():
+                try:
+                    await asyncio.wait_for(self._flush_now.wait(), self.window * (2 ** min(self._congestion, 4)))
+                except asyncio.TimeoutError:
+                    pass
+            self._flush_now.clear()
+            for packet, count in self._pack([first] + self._drain()):
+                await self._slots.acquire()
+                task = asyncio.create_task(self._send(packet, count))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+
+    def _drain(self) -> List[bytes]:
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        return pending
+
+    def _pack(self, messages: List[bytes]) -> List[Tuple[bytes, int]]:
+        """Group encoded messages into (packet, message count) of at most max_batch_bytes"""
+        packets: List[Tuple[bytes, int]] = []
+        group: List[bytes] = []
+        size = 0
+        for message in messages:
+            if group and size + len(message) + 1 > self.max_batch_bytes:
+                packets.append((self._encode(group), len(group)))
+                group, size = [], 0
+            group.append(message)
+            size += len(message) + 1
+        if group:
+            packets.append((self._encode(group), len(group)))
+        return packets
+
+    @staticmethod
+    def _encode(group: List[bytes]) -> bytes:
+        if len(group) == 1:
+            return group[0]
+        return b'{"type":"batch","messages":[' + b",".join(group) + b"]}"
+
+    async def _send(self, packet: bytes, count: int) -> None:
+        if self.compress:
+            packet = compress_packet(packet)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with timed(PUBLISH_DURATION), span("publish_data", bytes=len(packet), messages=count, attempt=attempt):
+                        await self._room.local_participant.publish_data(packet, reliable=True)
+                    self.stats["packets"] += 1
+                    self.stats["bytes"] += len(packet)
+                    self._congestion = 0
+                    return
+                except Exception as e:
+                    self._congestion += 1
+                    if attempt == self.max_retries:
+                        logger.error(f"   ⚠️ Dropping data packet after {attempt + 1} attempts: {e}")
+                        self.stats["dropped"] += count
+                        return
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        finally:
+            self._unsent -= count
+            self._slots.release()
+
+    async def aclose(self, timeout: float = 2.0) -> None:
+        """Flush queued events (bounded by timeout), then stop the pump"""
+        self._closed = True
+        if self._pump is None:
+            return
+        try:
+            await asyncio.wait_for(self._flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"   ⚠️ Data publisher flush timed out, {self._unsent} events unsent")
+        self._pump.cancel()
+        for task in list(self._sends):
+            task.cancel()
+        await asyncio.gather(self._pump, *self._sends, return_exceptions=True)
+        logger.info(f"📤 Data publisher closed: {self.stats}")
+
+    async def _flush(self) -> None:
+        while self._unsent > 0:
+            if self._sends:
+                await asyncio.gather(*list(self._sends), return_exceptions=True)
+            else:
+                await asyncio.sleep(self.window)
@@ -6,12 +6,29 @@ Mirrors: /app/api/voice-chat/tools.ts
 
 import os
 import json
-from typing import Dict, List, Any, Optional
+import copy
+import time
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import os.path
 import httpx
 
+from catalog import CATALOG_TABLES, MenuCatalog, normalize_name
+from catalog_cache import TTLCache, normalize_query
+from fuzzy import best_match
+from singleflight import SingleFlight
+from metrics import DB_QUERY_DURATION, PEXELS_DURATION, query_labels, timed
+from order_queue import OrderQueue
+from tracing import span
+from voice_cart import UNPRICED_ITEM_PRICE, CartLine, VoiceCart
+from write_behind import WriteBehindQueue
+
 # Load environment variables from root .env.local
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env.local')
 load_dotenv(env_path)
@@ -26,6 +43,8 @@ if not supabase_url or not supabase_service_key:
 supabase: Client = create_client(supabase_url, supabase_service_key)
 DEMO_PROFILE_ID = os.getenv("DEMO_PROFILE_ID", "00000000-0000-0000-0000-0000000000fc")
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY", "")
+# Overridable so load tests can point image lookups at a local stand-in
+PEXELS_SEARCH_URL = os.getenv("PEXELS_SEARCH_URL", "https://api.pexels.com/v1/search")
 
 print(f"✅ Database client initialized")
 supabase_type = 'Cloud' if 'supabase.co' in supabase_url else 'Local'
@@ -33,28 +52,444 @@ print(f"   Supabase: {supabase_type}")
 print(f"   Demo Profile: {DEMO_PROFILE_ID}")
 print(f"   Pexels API: {'✓ Configured' if PEXELS_API_KEY else '✗ Not configured'}")
 
+# The supabase-py client is synchronous, so every .execute() is a blocking HTTP
+# round trip. Run them on a dedicated thread pool so one slow query never stalls
+# the event loop that also drives STT, VAD, TTS and avatar streaming.
+SUPABASE_EXECUTOR_WORKERS = int(os.getenv("SUPABASE_EXECUTOR_WORKERS", "16"))
+_db_executor = ThreadPoolExecutor(
+    max_workers=SUPABASE_EXECUTOR_WORKERS,
+    thread_name_prefix="supabase-query"
+)
+
+
+async def _execute(query) -> Any:
+    """
+    Await a PostgREST query builder without blocking the event loop.
+    Equivalent to query.execute(), but runs on the Supabase executor.
+    """
+    loop = asyncio.get_running_loop()
+    labels = query_labels(query)
+    with timed(DB_QUERY_DURATION, **labels), span(f"supabase {labels['target']}", **labels):
+        return await loop.run_in_executor(_db_executor, query.execute)
+
+
+# Catalog query cache: restaurant and menu data change rarely, so repeated
+# searches and menu views are answered from process memory for CATALOG_CACHE_TTL.
+CATALOG_CACHE_ENABLED = os.getenv("CATALOG_CACHE_ENABLED", "true").lower() == "true"
+catalog_cache = TTLCache(
+    max_entries=int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1000")) if CATALOG_CACHE_ENABLED else 0,
+    max_bytes=int(os.getenv("CATALOG_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+)
+
+
+def invalidate_catalog_cache(restaurant_slug: Optional[str] = None) -> int:
+    """
+    Drop cached catalog results; returns how many entries were removed.
+    With a restaurant slug, only that restaurant's menus are dropped along with
+    every cached search (any search may include the restaurant's rows).
+    """
+    if restaurant_slug is None:
+        return catalog_cache.invalidate()
+    slug = normalize_query(restaurant_slug)
+    return catalog_cache.invalidate(
+        lambda key: key[0] != "get_restaurant_menu" or key[1] == slug
+    )
+
+
+def catalog_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and occupancy of the catalog cache"""
+    return catalog_cache.snapshot()
+
+
+# Concurrent identical lookups (same search, menu or image row) share one fetch
+lookup_flights = SingleFlight(max_tracked_keys=int(os.getenv("SINGLE_FLIGHT_MAX_TRACKED_KEYS", "1000")))
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    """How many lookups were coalesced onto an in-flight fetch, overall and per key"""
+    return lookup_flights.snapshot()
+
+
+async def _cached_lookup(cache_key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Return the cached result for cache_key, or run fetch once for all concurrent
+    callers and cache it. The result is shared: callers must copy before mutating.
+    """
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    async def fetch_and_cache() -> Any:
+        result = await fetch()
+        catalog_cache.set(cache_key, result)
+        return result
+    
+    return await lookup_flights.do(cache_key, fetch_and_cache)
+
+
+# Optional in-memory catalog snapshot: with CATALOG_SEARCH_ENGINE=memory the
+# whole menu is loaded once per worker and search_menu_items is answered from an
+# inverted index instead of PostgREST ilike filters.
+CATALOG_SEARCH_ENGINE = os.getenv("CATALOG_SEARCH_ENGINE", "postgrest").lower()
+# Use the fc_search_menu_items RPC (migration 003) for ranked, index-backed
+# search; a failed call falls back to the ilike path, and a database without
+# the function (migration not applied) is not asked again by this process
+MENU_SEARCH_RPC = os.getenv("MENU_SEARCH_RPC", "true").lower() == "true"
+# PostgREST error code for a function missing from its schema cache
+_RPC_NOT_FOUND = "PGRST202"
+_menu_search_rpc_missing = False
+# With the postgrest engine, retry empty searches against the catalog's fuzzy index
+FUZZY_SEARCH_FALLBACK = os.getenv("FUZZY_SEARCH_FALLBACK", "true").lower() == "true"
+# Price voice cart lines from the catalog snapshot (fc_menu_items.base_price,
+# fc_restaurants.delivery_fee) instead of the flat demo prices; the snapshot is
+# kept current by the incremental sync, so adds never query the database.
+PRICED_CART_ENABLED = os.getenv("PRICED_CART_ENABLED", "true").lower() == "true"
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "1000"))
+CATALOG_RESTAURANT_COLUMNS = "id, slug, name, cuisine, cuisine_group, delivery_fee, is_active, updated_at"
+CATALOG_SECTION_COLUMNS = "id, restaurant_id, name, description, display_order, is_active, updated_at"
+CATALOG_ITEM_COLUMNS = (
+    "id, slug, name, description, base_price, calories, dietary_tags, image, "
+    "section_id, restaurant_id, is_available, display_order, updated_at"
+)
+
+# Incremental refresh: every CATALOG_SYNC_INTERVAL seconds, rows whose
+# updated_at is newer than the snapshot's watermark (minus a small overlap for
+# late-committing transactions) are patched in, so cost tracks change volume.
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL_SECONDS", "30"))
+CATALOG_SYNC_OVERLAP = float(os.getenv("CATALOG_SYNC_OVERLAP_SECONDS", "5"))
+# After a failed catalog load, callers get False without another attempt for
+# this long, so a database outage does not add a load timeout to every cart add
+CATALOG_RETRY_INTERVAL = float(os.getenv("CATALOG_RETRY_SECONDS", "10"))
+CATALOG_TABLE_COLUMNS = {
+    "fc_restaurants": CATALOG_RESTAURANT_COLUMNS,
+    "fc_menu_sections": CATALOG_SECTION_COLUMNS,
+    "fc_menu_items": CATALOG_ITEM_COLUMNS,
+}
+
+menu_catalog = MenuCatalog()
+_catalog_load_lock = asyncio.Lock()
+_catalog_sync_task: Optional[asyncio.Task] = None
+_catalog_retry_at = 0.0
+
 
 # In-memory cart storage (matches voice-chat/tools.ts voiceCart)
-voice_cart: Optional[Dict[str, Any]] = None
+# Carts are keyed by session (the LiveKit room name) so concurrent rooms hosted
+# by one worker process never see each other's items.
+DEFAULT_CART_SESSION = "default"
+VOICE_CART_MAX_SESSIONS = int(os.getenv("VOICE_CART_MAX_SESSIONS", "500"))
+VOICE_CART_IDLE_TTL = float(os.getenv("VOICE_CART_IDLE_TTL_SECONDS", "3600"))
+
+
+class VoiceCartStore:
+    """
+    Session-keyed voice carts with bounded memory.
+    Least recently used sessions are evicted once max_sessions is reached, and
+    carts idle for longer than idle_ttl seconds are dropped on the next access.
+    """
+
+    def __init__(self, max_sessions: int = VOICE_CART_MAX_SESSIONS, idle_ttl: float = VOICE_CART_IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._carts: "OrderedDict[str, Tuple[VoiceCart, float]]" = OrderedDict()
+
+    def get(self, session_id: str) -> Optional[VoiceCart]:
+        """Return the cart for a session (or None), marking the session as active"""
+        self.evict_idle()
+        entry = self._carts.get(session_id)
+        if entry is None:
+            return None
+        self._carts[session_id] = (entry[0], time.monotonic())
+        self._carts.move_to_end(session_id)
+        return entry[0]
+
+    def set(self, session_id: str, cart: Optional[VoiceCart]) -> None:
+        """Store the cart for a session; storing None clears it"""
+        if cart is None:
+            self.clear(session_id)
+            return
+        self._carts[session_id] = (cart, time.monotonic())
+        self._carts.move_to_end(session_id)
+        self.evict_idle()
+        while len(self._carts) > self.max_sessions:
+            evicted_id, _ = self._carts.popitem(last=False)
+            print(f"🧹 Voice cart evicted (store full): {evicted_id}")
+
+    def clear(self, session_id: str) -> Optional[VoiceCart]:
+        """Remove and return the cart for a session"""
+        entry = self._carts.pop(session_id, None)
+        return entry[0] if entry else None
+
+    def evict_idle(self) -> int:
+        """Drop carts that have not been touched within idle_ttl; returns the count"""
+        cutoff = time.monotonic() - self.idle_ttl
+        evicted = 0
+        # OrderedDict is kept in access order, so idle carts sit at the front
+        while self._carts:
+            session_id, (_, last_access) = next(iter(self._carts.items()))
+            if last_access > cutoff:
+                break
+            self._carts.popitem(last=False)
+            evicted += 1
+            print(f"🧹 Voice cart evicted (idle): {session_id}")
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._carts)
 
 
-def reset_voice_cart() -> None:
-    """Reset the voice cart to None - useful for debugging and between sessions"""
-    global voice_cart
-    old_cart_items = len(voice_cart.get("items", [])) if voice_cart else 0
-    old_cart_total = voice_cart.get("total", 0) if voice_cart else 0
-    voice_cart = None
+voice_carts = VoiceCartStore()
+
+
+def reset_voice_cart(session_id: str = DEFAULT_CART_SESSION) -> None:
+    """Reset a session's voice cart to None - useful for debugging and between sessions"""
+    voice_cart = voice_carts.clear(session_id)
+    old_cart_items = len(voice_cart) if voice_cart else 0
+    old_cart_total = voice_cart.total if voice_cart else 0
     if old_cart_items > 0:
         print(f"🔄 Voice cart reset: cleared {old_cart_items} items (${old_cart_total:.2f})")
     else:
         print("🔄 Voice cart reset: was already empty")
 
 
+# Cart persistence: carts are mutated in memory on the hot path and written
+# behind to fc_carts / fc_cart_items (migration 004), keyed by session, so a
+# worker restart or job migration can restore the in-progress order.
+CART_PERSISTENCE_ENABLED = os.getenv("CART_PERSISTENCE_ENABLED", "true").lower() == "true"
+
+
+def _as_uuid(value: Any) -> Optional[str]:
+    """value if it is a UUID (a real catalog id), else None"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _persist_carts(batch: Dict[Any, Tuple[Optional[VoiceCart], str]]) -> None:
+    """
+    Write a batch from cart_writer. Keys are session ids (the session's
+    current cart) or (session id, order id) for a checked-out cart. Ordered
+    carts are written first, one at a time, each detaching its row from the
+    session, so the session's next cart always lands in a new row.
+    """
+    for key, entry in batch.items():
+        if isinstance(key, tuple):
+            await _write_carts({key[0]: entry})
+    current = {key: entry for key, entry in batch.items() if not isinstance(key, tuple)}
+    if current:
+        await _write_carts(current)
+
+
+async def _write_carts(batch: Dict[str, Tuple[Optional[VoiceCart], str]]) -> None:
+    """
+    Write carts of distinct sessions: one upsert of the cart rows, then their
+    lines replaced with one delete and one insert. Ordered carts are detached
+    from their session afterwards.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    # Serialized at write time, so a coalesced burst of changes is shaped once
+    carts = {session_id: (cart.to_dict() if cart else {}) for session_id, (cart, _) in batch.items()}
+    cart_rows = []
+    for session_id, (_, status) in batch.items():
+        cart = carts[session_id]
+        cart_rows.append({
+            "session_key": session_id,
+            "profile_id": DEMO_PROFILE_ID,
+            "restaurant_id": _as_uuid(cart.get("restaurantId")),
+            "restaurant_name": cart.get("restaurantName"),
+            "status": status,
+            "subtotal": round(cart.get("subtotal") or 0, 2),
+            "delivery_fee": round(cart.get("deliveryFee") or 0, 2),
+            "total": round(cart.get("total") or 0, 2),
+            "updated_at": now,
+        })
+    response = await _execute(supabase.table("fc_carts").upsert(cart_rows, on_conflict="session_key"))
+    cart_ids = {row["session_key"]: row["id"] for row in (response.data or [])}
+    
+    line_rows = []
+    for session_id, cart in carts.items():
+        for position, item in enumerate(cart.get("items") or []):
+            line_rows.append({
+                "cart_id": cart_ids[session_id],
+                "line_key": item.get("id"),
+                "position": position,
+                "menu_item_id": _as_uuid(item.get("menuItemId")),
+                "name": item.get("name"),
+                "quantity": item.get("quantity", 1),
+                "base_price": round(item.get("basePrice") or 0, 2),
+                "total_price": round(item.get("totalPrice") or 0, 2),
+            })
+    await _execute(supabase.table("fc_cart_items").delete().in_("cart_id", list(cart_ids.values())))
+    if line_rows:
+        await _execute(supabase.table("fc_cart_items").insert(line_rows))
+    
+    ordered = [session_id for session_id, (_, status) in batch.items() if status == "ordered"]
+    if ordered:
+        await _execute(supabase.table("fc_carts").update({"session_key": None}).in_("session_key", ordered))
+
+
+cart_writer = WriteBehindQueue(_persist_carts)
+
+
+def _mark_cart_dirty(session_id: str, cart: Optional[VoiceCart], status: str = "active") -> None:
+    """Queue a session's cart for persistence (no I/O; coalesced with later changes)"""
+    if CART_PERSISTENCE_ENABLED:
+        cart_writer.put(session_id, (cart, status if cart else "empty"))
+
+
+def _mark_cart_ordered(session_id: str, cart: VoiceCart, order_id: str) -> None:
+    """
+    Queue a checked-out cart under its own key, so the session's next cart
+    (queued under the session id) can never replace it before it is written.
+    It supersedes the session's unwritten changes to the same cart.
+    """
+    if CART_PERSISTENCE_ENABLED:
+        cart_writer.discard(session_id)
+        cart_writer.put((session_id, order_id), (cart, "ordered"))
+
+
+def _cart_writer_keys(session_ids: Tuple[str, ...]) -> List[Any]:
+    """Pending cart_writer keys (current and ordered carts) of the given sessions"""
+    return [
+        key for key in cart_writer.pending()
+        if (key[0] if isinstance(key, tuple) else key) in session_ids
+    ]
+
+
+async def flush_voice_carts(*session_ids: str) -> bool:
+    """Persist pending cart changes now (given sessions, or all); False if the write failed"""
+    if not CART_PERSISTENCE_ENABLED:
+        return True
+    if not session_ids:
+        return await cart_writer.flush()
+    keys = _cart_writer_keys(session_ids)
+    return await cart_writer.flush(*keys) if keys else True
+
+
+def flush_voice_carts_soon(*session_ids: str) -> None:
+    """flush_voice_carts without waiting for it (e.g. at checkout); a failed write is logged and retried"""
+    if not CART_PERSISTENCE_ENABLED:
+        return
+
+    async def flush() -> None:
+        if not await flush_voice_carts(*session_ids):
+            print(f"⚠️ Cart write failed for {', '.join(session_ids) or 'all sessions'}; retrying in the background")
+
+    spawn_background(flush())
+
+
+async def restore_voice_cart(session_id: str) -> Optional[VoiceCart]:
+    """Load a session's persisted active cart into memory (after a restart or job migration)"""
+    if not CART_PERSISTENCE_ENABLED:
+        return None
+    try:
+        response = await _execute(supabase.table("fc_carts").select(
+            "id, restaurant_id, restaurant_name, subtotal, delivery_fee, total, "
+            "items:fc_cart_items(line_key, position, menu_item_id, name, quantity, base_price, total_price)"
+        ).eq("session_key", session_id).eq("status", "active").limit(1))
+    except Exception as error:
+        print(f"⚠️ Cart restore failed for {session_id}: {error}")
+        return None
+    
+    if not response.data or not response.data[0].get("items"):
+        return None
+    row = response.data[0]
+    voice_cart = VoiceCart(
+        restaurant_name=row.get("restaurant_name") or "Restaurant",
+        restaurant_id=row.get("restaurant_id") or "mock-restaurant-id",
+        base_delivery_fee=float(row.get("delivery_fee") or 0),
+    )
+    lines = sorted(row["items"], key=lambda line: line.get("position") or 0)
+    for line in lines:
+        # Lines of catalog items get their restaurant (and delivery fee) back from the snapshot
+        menu_item_id = line.get("menu_item_id")
+        priced = menu_catalog.price_entry(menu_item_id) if menu_item_id in menu_catalog.items else {}
+        voice_cart.add(
+            line["name"],
+            line["quantity"],
+            float(line["base_price"]),
+            menu_item_id=menu_item_id,
+            restaurant_id=priced.get("restaurantId"),
+            restaurant_slug=priced.get("restaurantSlug"),
+            restaurant_name=priced.get("restaurantName"),
+            delivery_fee=priced.get("deliveryFee"),
+            line_id=line.get("line_key"),
+        )
+    voice_carts.set(session_id, voice_cart)
+    print(f"♻️ Voice cart restored for {session_id}: {len(lines)} items (${voice_cart.total:.2f})")
+    return voice_cart
+
+
 def format_currency(amount: float) -> str:
     """Format number as USD currency"""
     return f"${amount:.2f}"
 
 
+# Process-wide pooled HTTP client for Pexels so DNS, TCP and TLS setup happen
+# once per connection instead of once per image lookup.
+PEXELS_MAX_CONNECTIONS = int(os.getenv("PEXELS_MAX_CONNECTIONS", "20"))
+PEXELS_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PEXELS_MAX_KEEPALIVE_CONNECTIONS", "10"))
+PEXELS_KEEPALIVE_EXPIRY = float(os.getenv("PEXELS_KEEPALIVE_EXPIRY_SECONDS", "60"))
+PEXELS_HTTP2 = os.getenv("PEXELS_HTTP2", "true").lower() == "true"
+
+# Per-host timeouts for requests made through the shared client
+HTTP_HOST_TIMEOUTS: Dict[str, httpx.Timeout] = {
+    "api.pexels.com": httpx.Timeout(
+        float(os.getenv("PEXELS_TIMEOUT_SECONDS", "10.0")),
+        connect=float(os.getenv("PEXELS_CONNECT_TIMEOUT_SECONDS", "3.0"))
+    ),
+}
+DEFAULT_HTTP_TIMEOUT = httpx.Timeout(10.0)
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install 'httpx[http2]')"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared pooled AsyncClient, creating it on first use.
+    The client is bound to the running event loop and recreated if the loop changes.
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        http2 = PEXELS_HTTP2 and _http2_available()
+        if PEXELS_HTTP2 and not http2:
+            print("ℹ️ HTTP/2 requested but h2 is not installed, using HTTP/1.1 keep-alive")
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=PEXELS_MAX_CONNECTIONS,
+                max_keepalive_connections=PEXELS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=PEXELS_KEEPALIVE_EXPIRY
+            ),
+            timeout=DEFAULT_HTTP_TIMEOUT
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (worker shutdown / last session ended)"""
+    global _http_client, _http_client_loop
+    client = _http_client
+    _http_client = None
+    _http_client_loop = None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        print("🔌 Shared HTTP client closed")
+
+
 async def fetch_image_from_pexels(query: str) -> Optional[str]:
     """
     Fetch an image URL from Pexels API
@@ -64,30 +499,31 @@ async def fetch_image_from_pexels(query: str) -> Optional[str]:
         return None
     
     try:
-        async with httpx.AsyncClient() as client:
+        client = get_http_client()
+        with timed(PEXELS_DURATION), span("pexels search", query=query):
             response = await client.get(
-                "https://api.pexels.com/v1/search",
+                PEXELS_SEARCH_URL,
                 params={
                     "query": query,
                     "per_page": "1",
                     "orientation": "landscape"
                 },
                 headers={"Authorization": PEXELS_API_KEY},
-                timeout=10.0
+                timeout=HTTP_HOST_TIMEOUTS.get("api.pexels.com", DEFAULT_HTTP_TIMEOUT)
             )
-            
-            if response.status_code != 200:
-                print(f"⚠️ Pexels request failed: {response.status_code}")
-                return None
-            
-            data = response.json()
-            photos = data.get("photos", [])
-            if not photos:
-                return None
-            
-            photo = photos[0]
-            src = photo.get("src", {})
-            return src.get("large") or src.get("medium") or src.get("original")
+        
+        if response.status_code != 200:
+            print(f"⚠️ Pexels request failed: {response.status_code}")
+            return None
+        
+        data = response.json()
+        photos = data.get("photos", [])
+        if not photos:
+            return None
+        
+        photo = photos[0]
+        src = photo.get("src", {})
+        return src.get("large") or src.get("medium") or src.get("original")
     
     except Exception as e:
         print(f"⚠️ Pexels fetch error: {e}")
@@ -102,8 +538,21 @@ async def ensure_menu_item_image(
 ) -> Optional[str]:
     """
     Ensure menu item has an image - fetch from Pexels if needed
+    Concurrent calls for the same row share one fetch-and-update
     Mirrors: food-chat/tools.ts -> ensureMenuItemImage
     """
+    key = ("ensure_menu_item_image", item_id or item_slug or item_name, restaurant_name)
+    return await lookup_flights.do(key, lambda: _ensure_menu_item_image(
+        item_id, item_slug, item_name, restaurant_name
+    ))
+
+
+async def _ensure_menu_item_image(
+    item_id: Optional[str],
+    item_slug: Optional[str],
+    item_name: Optional[str],
+    restaurant_name: Optional[str]
+) -> Optional[str]:
     slug = item_slug or (item_name.lower().replace(" ", "-") if item_name else None)
     
     if item_id or slug:
@@ -115,7 +564,7 @@ async def ensure_menu_item_image(
             else:
                 query = query.eq("slug", slug)
             
-            response = query.limit(1).execute()
+            response = await _execute(query.limit(1))
             
             if response.data:
                 existing = response.data[0]
@@ -128,9 +577,10 @@ async def ensure_menu_item_image(
                 fetched = await fetch_image_from_pexels(search_query)
                 
                 if fetched and existing.get("id"):
-                    supabase.table("fc_menu_items").update({
+                    await _execute(supabase.table("fc_menu_items").update({
                         "image": fetched
-                    }).eq("id", existing["id"]).execute()
+                    }).eq("id", existing["id"]))
+                    menu_catalog.set_image(existing["id"], fetched)
                 
                 return fetched
         
@@ -150,7 +600,19 @@ async def ensure_restaurant_image(
 ) -> Optional[str]:
     """
     Ensure restaurant has a hero image - fetch from Pexels if needed
+    Concurrent calls for the same row share one fetch-and-update
     """
+    key = ("ensure_restaurant_image", restaurant_id or restaurant_slug or restaurant_name)
+    return await lookup_flights.do(key, lambda: _ensure_restaurant_image(
+        restaurant_id, restaurant_slug, restaurant_name
+    ))
+
+
+async def _ensure_restaurant_image(
+    restaurant_id: Optional[str],
+    restaurant_slug: Optional[str],
+    restaurant_name: Optional[str]
+) -> Optional[str]:
     if restaurant_id or restaurant_slug:
         try:
             query = supabase.table("fc_restaurants").select("id, hero_image, name")
@@ -159,7 +621,7 @@ async def ensure_restaurant_image(
             else:
                 query = query.eq("slug", restaurant_slug)
             
-            response = query.limit(1).execute()
+            response = await _execute(query.limit(1))
             
             if response.data:
                 existing = response.data[0]
@@ -172,9 +634,9 @@ async def ensure_restaurant_image(
                 fetched = await fetch_image_from_pexels(search_query)
                 
                 if fetched and existing.get("id"):
-                    supabase.table("fc_restaurants").update({
+                    await _execute(supabase.table("fc_restaurants").update({
                         "hero_image": fetched
-                    }).eq("id", existing["id"]).execute()
+                    }).eq("id", existing["id"]))
                 
                 return fetched
         
@@ -187,6 +649,237 @@ async def ensure_restaurant_image(
     return await fetch_image_from_pexels(search_query)
 
 
+# Image backfill for search results: how many Pexels/DB lookups may run at
+# once, and the total time a search waits before answering without images.
+IMAGE_BACKFILL_CONCURRENCY = int(os.getenv("IMAGE_BACKFILL_CONCURRENCY", "4"))
+IMAGE_BACKFILL_DEADLINE = float(os.getenv("IMAGE_BACKFILL_DEADLINE_SECONDS", "3.0"))
+# Deferred enrichment: searches answer immediately and images are pushed to the
+# caller as they resolve, with a longer deadline since nobody is waiting on them.
+DEFER_IMAGE_ENRICHMENT = os.getenv("DEFER_IMAGE_ENRICHMENT", "true").lower() == "true"
+IMAGE_ENRICHMENT_DEADLINE = float(os.getenv("IMAGE_ENRICHMENT_DEADLINE_SECONDS", "15.0"))
+
+ImageCallback = Callable[[str, Optional[str]], Awaitable[None]]
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: set = set()
+
+
+def spawn_background(coro: Awaitable[Any]) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def backfill_images(
+    fetchers: Dict[str, Callable[[], Awaitable[Optional[str]]]],
+    concurrency: int = None,
+    deadline: float = None,
+    on_ready: Optional[ImageCallback] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Run image lookups concurrently, keyed by row id.
+    At most `concurrency` lookups run at once; anything still pending when
+    `deadline` seconds have passed is cancelled and left out of the result.
+    If `on_ready` is given it is awaited with (key, url) as each lookup finishes.
+    """
+    if not fetchers:
+        return {}
+    
+    semaphore = asyncio.Semaphore(concurrency or IMAGE_BACKFILL_CONCURRENCY)
+    
+    async def run(key: str, fetch: Callable[[], Awaitable[Optional[str]]]):
+        async with semaphore:
+            url = await fetch()
+        if on_ready is not None:
+            try:
+                await on_ready(key, url)
+            except Exception as e:
+                print(f"⚠️ Image callback error for {key}: {e}")
+        return key, url
+    
+    tasks = [asyncio.create_task(run(key, fetch)) for key, fetch in fetchers.items()]
+    done, pending = await asyncio.wait(
+        tasks,
+        timeout=deadline if deadline is not None else IMAGE_BACKFILL_DEADLINE
+    )
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"⏱️ Image backfill deadline hit: {len(pending)} of {len(tasks)} still pending")
+    
+    images = {}
+    for task in done:
+        if task.cancelled() or task.exception():
+            continue
+        key, url = task.result()
+        images[key] = url
+    return images
+
+
+async def _attach_images(
+    rows: List[Dict[str, Any]],
+    field: str,
+    fetch_image: Callable[[Dict[str, Any]], Awaitable[Optional[str]]],
+    on_image: Optional[ImageCallback] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fill in rows missing `field` via fetch_image(row) and return a copy for the caller.
+    The rows passed in may be shared with the catalog cache, so resolved images
+    are written back to them and later cache hits no longer need a lookup.
+    With on_image, the copy is returned immediately and images follow in the background.
+    """
+    rows_by_id = {row["id"]: row for row in rows}
+    fetchers = {
+        row["id"]: (lambda r=row: fetch_image(r))
+        for row in rows if not row.get(field)
+    }
+    
+    if on_image is not None:
+        results = copy.deepcopy(rows)
+        if fetchers:
+            async def store_and_forward(row_id: str, url: Optional[str]) -> None:
+                if url:
+                    rows_by_id[row_id][field] = url
+                await on_image(row_id, url)
+            
+            spawn_background(backfill_images(fetchers, deadline=IMAGE_ENRICHMENT_DEADLINE, on_ready=store_and_forward))
+        return results
+    
+    images = await backfill_images(fetchers)
+    for row_id, url in images.items():
+        if url:
+            rows_by_id[row_id][field] = url
+    return copy.deepcopy(rows)
+
+
+async def _fetch_all_rows(table: str, columns: str) -> List[Dict[str, Any]]:
+    """Read every row of a table, paging past PostgREST's max-rows limit"""
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        response = await _execute(
+            supabase.table(table).select(columns).order("id").range(start, start + CATALOG_PAGE_SIZE - 1)
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < CATALOG_PAGE_SIZE:
+            return rows
+        start += CATALOG_PAGE_SIZE
+
+
+async def load_menu_catalog() -> None:
+    """Load (or reload) the full restaurant / section / menu item snapshot into menu_catalog"""
+    restaurants, sections, items = await asyncio.gather(
+        _fetch_all_rows("fc_restaurants", CATALOG_RESTAURANT_COLUMNS),
+        _fetch_all_rows("fc_menu_sections", CATALOG_SECTION_COLUMNS),
+        _fetch_all_rows("fc_menu_items", CATALOG_ITEM_COLUMNS),
+    )
+    menu_catalog.load(restaurants, sections, items)
+    print(f"📚 Menu catalog loaded: {len(restaurants)} restaurants, {len(sections)} sections, {len(items)} items")
+
+
+async def ensure_menu_catalog() -> bool:
+    """
+    Load the catalog snapshot once per process and start its incremental sync.
+    Returns False if it could not be loaded; a failed load is retried on the
+    first call after CATALOG_RETRY_INTERVAL.
+    """
+    global _catalog_sync_task, _catalog_retry_at
+    if not menu_catalog.loaded:
+        if time.monotonic() < _catalog_retry_at:
+            return False
+        async with _catalog_load_lock:
+            if not menu_catalog.loaded:
+                try:
+                    await load_menu_catalog()
+                except Exception as error:
+                    _catalog_retry_at = time.monotonic() + CATALOG_RETRY_INTERVAL
+                    print(f"⚠️ Menu catalog load failed, using PostgREST search: {error}")
+                    return False
+    # Also covers a snapshot loaded by prewarm_worker() before any session loop existed
+    if CATALOG_SYNC_INTERVAL > 0 and (_catalog_sync_task is None or _catalog_sync_task.done()):
+        _catalog_sync_task = spawn_background(run_catalog_sync())
+    return True
+
+
+async def ensure_price_index() -> bool:
+    """Make sure cart pricing can be answered from memory (loads the catalog once per process)"""
+    return PRICED_CART_ENABLED and await ensure_menu_catalog()
+
+
+async def prepare_voice_cart(session_id: str) -> None:
+    """
+    Session start-up for the cart: load the price index, then restore the
+    session's persisted cart (restored lines look up their restaurant in the
+    catalog). Both log and swallow their own failures.
+    """
+    await ensure_price_index()
+    await restore_voice_cart(session_id)
+
+
+def apply_catalog_changes(table: str, rows: List[Dict[str, Any]]) -> int:
+    """
+    Patch changed catalog rows into process-local data (snapshot, search index
+    and cached results). Entry point for any change feed: the updated_at poller
+    below, or a realtime / replication subscriber pushing row images.
+    Returns the number of restaurants affected.
+    """
+    touched = menu_catalog.apply_changes(table, rows)
+    if touched:
+        slugs = {
+            normalize_query(menu_catalog.restaurants.get(restaurant_id, {}).get("slug"))
+            for restaurant_id in touched
+        }
+        catalog_cache.invalidate(
+            lambda key: key[0] != "get_restaurant_menu" or key[1] in slugs
+        )
+    return len(touched)
+
+
+async def _fetch_changed_rows(table: str, columns: str, since: str) -> List[Dict[str, Any]]:
+    """Read rows of a table updated after `since`, oldest first, paging as needed"""
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        response = await _execute(
+            supabase.table(table).select(columns).gt("updated_at", since)
+            .order("updated_at").range(start, start + CATALOG_PAGE_SIZE - 1)
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < CATALOG_PAGE_SIZE:
+            return rows
+        start += CATALOG_PAGE_SIZE
+
+
+async def sync_menu_catalog() -> int:
+    """Pull rows changed since the snapshot's watermarks; returns how many rows were read"""
+    changed = 0
+    for table in CATALOG_TABLES:
+        watermark = menu_catalog.watermarks.get(table)
+        since = (watermark - timedelta(seconds=CATALOG_SYNC_OVERLAP)).isoformat() if watermark else "epoch"
+        rows = await _fetch_changed_rows(table, CATALOG_TABLE_COLUMNS[table], since)
+        if rows:
+            affected = apply_catalog_changes(table, rows)
+            if affected:
+                print(f"🔁 Catalog sync: {table} patched, {affected} restaurant(s) affected")
+        changed += len(rows)
+    return changed
+
+
+async def run_catalog_sync(interval: float = None) -> None:
+    """Background loop keeping menu_catalog fresh without full reloads"""
+    interval = interval or CATALOG_SYNC_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_menu_catalog()
+        except Exception as error:
+            print(f"⚠️ Catalog sync failed: {error}")
+
+
 async def get_user_profile(profile_id: str = None) -> Dict[str, Any]:
     """
     Get user profile and preferences from Supabase
@@ -196,7 +889,7 @@ async def get_user_profile(profile_id: str = None) -> Dict[str, Any]:
         pid = profile_id or DEMO_PROFILE_ID
         
         # Query fc_preferences table (same as TypeScript)
-        response = supabase.table("fc_preferences").select("*").eq("id", pid).single().execute()
+        response = await _execute(supabase.table("fc_preferences").select("*").eq("id", pid).single())
         
         if response.data:
             prefs = response.data
@@ -245,278 +938,381 @@ async def get_user_profile(profile_id: str = None) -> Dict[str, Any]:
         }
 
 
-async def search_menu_items(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+async def search_menu_items(query: str, max_results: int = 5, on_image: Optional[ImageCallback] = None) -> List[Dict[str, Any]]:
     """
     Search for menu items across all restaurants using improved multi-word matching.
     - Searches in both name and description fields
     - Handles multi-word queries by searching for ANY word match
     - Example: "New York style cheesecake" will find "Classic New York Cheesecake"
+    - If on_image is given, returns without waiting for missing images; each one
+      is resolved in the background and delivered as on_image(item_id, url)
+    - Results are served from the catalog cache when the same query repeats, and
+      concurrent identical searches share one in-flight query
     
     Mirrors: voice-chat/tools.ts -> findFoodItem
     """
     try:
-        # Split query into individual words for better matching
-        # "New York style cheesecake" → ["New", "York", "style", "cheesecake"]
-        words = query.strip().split()
+        cache_key = ("search_menu_items", normalize_query(query), max_results)
+        results = await _cached_lookup(cache_key, lambda: _query_menu_items(query, max_results))
         
-        # Build OR conditions for each word (search in both name and description)
-        # This allows finding items that contain ANY of the query words
-        search_filters = []
-        for word in words:
-            if len(word) >= 3:  # Skip very short words like "a", "of", etc.
-                # Escape single quotes for SQL
-                safe_word = word.replace("'", "''")
-                search_filters.append(f"name.ilike.%{safe_word}%,description.ilike.%{safe_word}%")
+        # Fetch images from Pexels for returned items missing one in the database
+        return await _attach_images(results, "image", lambda r: ensure_menu_item_image(
+            item_id=r["id"],
+            item_slug=r["slug"],
+            item_name=r["name"],
+            restaurant_name=r["restaurantName"]
+        ), on_image)
         
-        if not search_filters:
-            # Fallback to original simple search if no valid words
-            response = supabase.table("fc_menu_items").select(
-                "id, slug, name, description, base_price, calories, dietary_tags, image, "
-                "section:section_id(id, name), "
-                "restaurant:restaurant_id(id, slug, name)"
-            ).eq("is_available", True).ilike("name", f"%{query}%").order("name").limit(max_results * 2).execute()
+    except Exception as error:
+        print(f"Error in search_menu_items: {error}")
+        return []
+
+
+async def _query_menu_items(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """Run the menu item search and shape the rows (no images fetched)"""
+    if CATALOG_SEARCH_ENGINE == "memory" and await ensure_menu_catalog():
+        # Answer from the in-memory inverted index - no network round trip
+        results = menu_catalog.search(query, max_results * 2)
+    else:
+        results = None
+        if MENU_SEARCH_RPC and not _menu_search_rpc_missing:
+            results = await _query_menu_items_rpc(query, max_results)
+        if results is None:
+            results = await _query_menu_items_postgrest(query, max_results)
+        if not results and FUZZY_SEARCH_FALLBACK and await ensure_menu_catalog():
+            # ilike found nothing - likely a misheard word ("pad tie"), retry phonetically
+            results = menu_catalog.search(query, max_results * 2)
+            print(f"🔤 Fuzzy fallback for '{query}': {len(results)} results")
+    
+    # Filter chocolate if requested (same as TypeScript)
+    if "no chocolate" in query.lower() or "without chocolate" in query.lower():
+        results = [r for r in results if "chocolate" not in f"{r['name']} {r.get('description', '')}".lower()]
+    
+    return results[:max_results]
+
+
+async def _query_menu_items_rpc(query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ranked search in one round trip via the fc_search_menu_items RPC.
+    Returns None if the RPC failed or is unavailable (migration not applied) so the caller can fall back.
+    """
+    global _menu_search_rpc_missing
+    try:
+        response = await _execute(supabase.rpc("fc_search_menu_items", {
+            "search_query": query,
+            "max_results": max_results * 2,
+        }))
+    except Exception as e:
+        if getattr(e, "code", None) == _RPC_NOT_FOUND:
+            _menu_search_rpc_missing = True
+            print("⚠️ fc_search_menu_items not found (apply migration 003); using ilike search")
         else:
-            # Use first word as primary filter, then rank results by how many words match
-            primary_word = words[0].replace("'", "''")
-            response = supabase.table("fc_menu_items").select(
-                "id, slug, name, description, base_price, calories, dietary_tags, image, "
-                "section:section_id(id, name), "
-                "restaurant:restaurant_id(id, slug, name)"
-            ).eq("is_available", True).or_(f"name.ilike.%{primary_word}%,description.ilike.%{primary_word}%").order("name").limit(max_results * 5).execute()
-            
-            # Rank results by how many query words they contain
-            if response.data:
-                def score_item(item):
-                    text = f"{item.get('name', '')} {item.get('description', '')}".lower()
-                    return sum(1 for word in words if word.lower() in text)
-                
-                # Sort by score (descending) and take top results
-                response.data.sort(key=score_item, reverse=True)
-                response.data = response.data[:max_results * 2]
-        
-        if not response.data:
-            return []
+            print(f"⚠️ fc_search_menu_items RPC failed, using ilike search: {e}")
+        return None
+    
+    return [
+        {
+            "id": item["id"],
+            "slug": item["slug"],
+            "name": item["name"],
+            "description": item.get("description"),
+            "price": item.get("base_price", 0),
+            "tags": item.get("dietary_tags") or [],
+            "calories": item.get("calories"),
+            "sectionTitle": item.get("section_name"),
+            "restaurantId": item.get("restaurant_id"),
+            "restaurantSlug": item.get("restaurant_slug"),
+            "restaurantName": item.get("restaurant_name"),
+            "image": item.get("image")
+        }
+        for item in response.data or []
+    ]
+
+
+async def _query_menu_items_postgrest(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """Search menu items through PostgREST ilike filters, re-ranked in Python"""
+    # Split query into individual words for better matching
+    # "New York style cheesecake" → ["New", "York", "style", "cheesecake"]
+    words = query.strip().split()
+    
+    # Build OR conditions for each word (search in both name and description)
+    # This allows finding items that contain ANY of the query words
+    search_filters = []
+    for word in words:
+        if len(word) >= 3:  # Skip very short words like "a", "of", etc.
+            # Escape single quotes for SQL
+            safe_word = word.replace("'", "''")
+            search_filters.append(f"name.ilike.%{safe_word}%,description.ilike.%{safe_word}%")
+    
+    if not search_filters:
+        # Fallback to original simple search if no valid words
+        response = await _execute(supabase.table("fc_menu_items").select(
+            "id, slug, name, description, base_price, calories, dietary_tags, image, "
+            "section:section_id(id, name), "
+            "restaurant:restaurant_id(id, slug, name)"
+        ).eq("is_available", True).ilike("name", f"%{query}%").order("name").limit(max_results * 2))
+    else:
+        # Use first word as primary filter, then rank results by how many words match
+        primary_word = words[0].replace("'", "''")
+        response = await _execute(supabase.table("fc_menu_items").select(
+            "id, slug, name, description, base_price, calories, dietary_tags, image, "
+            "section:section_id(id, name), "
+            "restaurant:restaurant_id(id, slug, name)"
+        ).eq("is_available", True).or_(f"name.ilike.%{primary_word}%,description.ilike.%{primary_word}%").order("name").limit(max_results * 5))
         
-        results = []
-        for item in response.data:
-            # Handle relations (same logic as TypeScript)
-            section_rel = item.get("section")
-            if isinstance(section_rel, list):
-                section_rel = section_rel[0] if section_rel else None
-            
-            restaurant_rel = item.get("restaurant")
-            if isinstance(restaurant_rel, list):
-                restaurant_rel = restaurant_rel[0] if restaurant_rel else None
-            
-            # Fetch image from Pexels if not in database
-            image_url = item.get("image")
-            if not image_url:
-                image_url = await ensure_menu_item_image(
-                    item_id=item["id"],
-                    item_slug=item["slug"],
-                    item_name=item["name"],
-                    restaurant_name=restaurant_rel.get("name") if restaurant_rel else None
-                )
+        # Rank results by how many query words they contain
+        if response.data:
+            def score_item(item):
+                text = f"{item.get('name', '')} {item.get('description', '')}".lower()
+                return sum(1 for word in words if word.lower() in text)
             
-            results.append({
-                "id": item["id"],
-                "slug": item["slug"],
-                "name": item["name"],
-                "description": item.get("description"),
-                "price": item.get("base_price", 0),
-                "tags": item.get("dietary_tags", []),
-                "calories": item.get("calories"),
-                "sectionTitle": section_rel.get("name") if section_rel else None,
-                "restaurantId": restaurant_rel.get("id") if restaurant_rel else None,
-                "restaurantSlug": restaurant_rel.get("slug") if restaurant_rel else None,
-                "restaurantName": restaurant_rel.get("name") if restaurant_rel else None,
-                "image": image_url
-            })
-        
-        # Filter chocolate if requested (same as TypeScript)
-        if "no chocolate" in query.lower() or "without chocolate" in query.lower():
-            results = [r for r in results if "chocolate" not in f"{r['name']} {r.get('description', '')}".lower()]
+            # Sort by score (descending) and take top results
+            response.data.sort(key=score_item, reverse=True)
+            response.data = response.data[:max_results * 2]
+    
+    if not response.data:
+        return []
+    
+    results = []
+    for item in response.data:
+        # Handle relations (same logic as TypeScript)
+        section_rel = item.get("section")
+        if isinstance(section_rel, list):
+            section_rel = section_rel[0] if section_rel else None
         
-        return results[:max_results]
+        restaurant_rel = item.get("restaurant")
+        if isinstance(restaurant_rel, list):
+            restaurant_rel = restaurant_rel[0] if restaurant_rel else None
         
-    except Exception as error:
-        print(f"Error in search_menu_items: {error}")
-        return []
+        results.append({
+            "id": item["id"],
+            "slug": item["slug"],
+            "name": item["name"],
+            "description": item.get("description"),
+            "price": item.get("base_price", 0),
+            "tags": item.get("dietary_tags", []),
+            "calories": item.get("calories"),
+            "sectionTitle": section_rel.get("name") if section_rel else None,
+            "restaurantId": restaurant_rel.get("id") if restaurant_rel else None,
+            "restaurantSlug": restaurant_rel.get("slug") if restaurant_rel else None,
+            "restaurantName": restaurant_rel.get("name") if restaurant_rel else None,
+            "image": item.get("image")
+        })
+    
+    return results
 
 
-async def search_restaurants_by_cuisine(cuisine_type: str, max_results: int = 3) -> List[Dict[str, Any]]:
+async def search_restaurants_by_cuisine(cuisine_type: str, max_results: int = 3, on_image: Optional[ImageCallback] = None) -> List[Dict[str, Any]]:
     """
     Find restaurants by cuisine type OR name
     Mirrors: voice-chat/tools.ts -> findRestaurantsByType
     Enhanced to search by restaurant name as fallback
+    If on_image is given, missing hero images are delivered later as
+    on_image(restaurant_id, url) instead of delaying the results
     """
     try:
-        # Query Supabase fc_restaurants table - search cuisine, cuisine_group, AND name
-        response = supabase.table("fc_restaurants").select(
-            "id, slug, name, cuisine, cuisine_group, dietary_tags, price_tier, "
-            "rating, eta_minutes, delivery_fee, standout_dish, promo, hero_image"
-        ).eq("is_active", True).or_(f"cuisine.ilike.%{cuisine_type}%,cuisine_group.ilike.%{cuisine_type}%,name.ilike.%{cuisine_type}%").order("name").limit(5).execute()
-        
-        if not response.data:
-            return []
-        
-        results = []
-        for restaurant in response.data:
-            # Fetch image from Pexels if not in database
-            hero_image = restaurant.get("hero_image")
-            if not hero_image:
-                hero_image = await ensure_restaurant_image(
-                    restaurant_id=restaurant["id"],
-                    restaurant_slug=restaurant["slug"],
-                    restaurant_name=restaurant["name"]
-                )
-            
-            results.append({
-                "id": restaurant["id"],
-                "slug": restaurant["slug"],
-                "name": restaurant["name"],
-                "cuisine": restaurant.get("cuisine"),
-                "cuisineGroup": restaurant.get("cuisine_group"),
-                "dietaryTags": restaurant.get("dietary_tags", []),
-                "priceTier": restaurant.get("price_tier"),
-                "rating": restaurant.get("rating"),
-                "etaMinutes": restaurant.get("eta_minutes"),
-                "deliveryFee": restaurant.get("delivery_fee"),
-                "standoutDish": restaurant.get("standout_dish"),
-                "promo": restaurant.get("promo"),
-                "heroImage": hero_image
-            })
+        cache_key = ("search_restaurants_by_cuisine", normalize_query(cuisine_type))
+        results = await _cached_lookup(cache_key, lambda: _query_restaurants_by_cuisine(cuisine_type))
         
-        return results
+        # Fetch hero images from Pexels for restaurants missing one in the database
+        return await _attach_images(results, "heroImage", lambda r: ensure_restaurant_image(
+            restaurant_id=r["id"],
+            restaurant_slug=r["slug"],
+            restaurant_name=r["name"]
+        ), on_image)
         
     except Exception as error:
         print(f"Error in search_restaurants_by_cuisine: {error}")
         return []
 
 
+async def _query_restaurants_by_cuisine(cuisine_type: str) -> List[Dict[str, Any]]:
+    """Run the restaurant search against Supabase and shape the rows (no images fetched)"""
+    # Query Supabase fc_restaurants table - search cuisine, cuisine_group, AND name
+    response = await _execute(supabase.table("fc_restaurants").select(
+        "id, slug, name, cuisine, cuisine_group, dietary_tags, price_tier, "
+        "rating, eta_minutes, delivery_fee, standout_dish, promo, hero_image"
+    ).eq("is_active", True).or_(f"cuisine.ilike.%{cuisine_type}%,cuisine_group.ilike.%{cuisine_type}%,name.ilike.%{cuisine_type}%").order("name").limit(5))
+    
+    if not response.data:
+        return []
+    
+    results = []
+    for restaurant in response.data:
+        results.append({
+            "id": restaurant["id"],
+            "slug": restaurant["slug"],
+            "name": restaurant["name"],
+            "cuisine": restaurant.get("cuisine"),
+            "cuisineGroup": restaurant.get("cuisine_group"),
+            "dietaryTags": restaurant.get("dietary_tags", []),
+            "priceTier": restaurant.get("price_tier"),
+            "rating": restaurant.get("rating"),
+            "etaMinutes": restaurant.get("eta_minutes"),
+            "deliveryFee": restaurant.get("delivery_fee"),
+            "standoutDish": restaurant.get("standout_dish"),
+            "promo": restaurant.get("promo"),
+            "heroImage": restaurant.get("hero_image")
+        })
+    
+    return results
+
+
+MENU_RESTAURANT_COLUMNS = "id, slug, name, cuisine, hero_image"
+
+
+def _shape_menu_item(item: Dict[str, Any], section_title: Optional[str]) -> Dict[str, Any]:
+    """Shape a menu item row for get_restaurant_menu (same keys for every fetch path)"""
+    tags = item.get("tags", item.get("dietary_tags"))
+    return {
+        "id": item["id"],
+        "slug": item.get("slug"),
+        "name": item["name"],
+        "description": item.get("description"),
+        "price": float(item["base_price"]) if item.get("base_price") else 0,
+        "tags": tags if isinstance(tags, list) else [],
+        "calories": item.get("calories"),
+        "rating": float(item["rating"]) if item.get("rating") else None,
+        "image": item.get("image"),
+        "sectionTitle": section_title
+    }
+
+
+async def _fetch_restaurant_menu_embedded(restaurant_slug: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Fetch a restaurant with its sections and items in a single PostgREST request
+    (fc_restaurants -> fc_menu_sections -> fc_menu_items embedding), then filter
+    and order in memory. Returns None if the restaurant does not exist.
+    """
+    response = await _execute(supabase.table("fc_restaurants").select(
+        f"{MENU_RESTAURANT_COLUMNS}, "
+        "sections:fc_menu_sections(id, name, description, display_order, is_active, "
+        "items:fc_menu_items(id, slug, name, description, base_price, dietary_tags, calories, image, is_available, display_order))"
+    ).eq("slug", restaurant_slug).eq("is_active", True).limit(1))
+    
+    if not response.data:
+        return None
+    
+    restaurant = response.data[0]
+    section_rows = [section for section in (restaurant.pop("sections", None) or []) if section.get("is_active") is not False]
+    section_rows.sort(key=lambda section: section.get("display_order") or 0)
+    
+    sections = []
+    for section in section_rows:
+        item_rows = [item for item in (section.get("items") or []) if item.get("is_available") is not False]
+        item_rows.sort(key=lambda item: item.get("display_order") or 0)
+        sections.append({
+            "id": section["id"],
+            "slug": section.get("name"),
+            "title": section.get("name"),
+            "description": section.get("description"),
+            "position": section.get("display_order", 0),
+            "items": [_shape_menu_item(item, section.get("name")) for item in item_rows]
+        })
+    return restaurant, sections
+
+
+async def _fetch_restaurant_menu_view(restaurant_slug: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Fetch a restaurant, then its sections from the fc_menu_sections_with_items view"""
+    restaurant_response = await _execute(supabase.table("fc_restaurants").select(
+        MENU_RESTAURANT_COLUMNS
+    ).eq("slug", restaurant_slug).eq("is_active", True).limit(1))
+    
+    if not restaurant_response.data:
+        return None
+    
+    restaurant = restaurant_response.data[0]
+    menu_response = await _execute(supabase.table("fc_menu_sections_with_items").select(
+        "*"
+    ).eq("restaurant_id", restaurant["id"]).order("section_position"))
+    
+    sections = []
+    for section_data in (menu_response.data or []):
+        sections.append({
+            "id": section_data["section_id"],
+            "slug": section_data.get("section_slug"),
+            "title": section_data["section_title"],
+            "description": section_data.get("section_description"),
+            "position": section_data.get("section_position", 0),
+            "items": [_shape_menu_item(item, section_data["section_title"]) for item in (section_data.get("items") or [])]
+        })
+    return restaurant, sections
+
+
+def _menu_header(restaurant: Dict[str, Any], section_count: int, first_section: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Menu without its sections: restaurant card fields and the speech summary (led by the first section)"""
+    if first_section and first_section.get("items"):
+        lead_item = first_section["items"][0]
+        speech_summary = f"Here are {section_count} menu section{'s' if section_count != 1 else ''} at {restaurant['name']}. {lead_item['name']} is available for {format_currency(lead_item['price'])}."
+    else:
+        speech_summary = f"I could not find menu details for {restaurant['name']} right now."
+    return {
+        "success": True,
+        "restaurant": {
+            "id": restaurant["id"],
+            "slug": restaurant["slug"],
+            "name": restaurant["name"],
+            "cuisine": restaurant.get("cuisine"),
+            "heroImage": restaurant.get("hero_image")
+        },
+        "speechSummary": speech_summary
+    }
+
+
 async def get_restaurant_menu(restaurant_slug: str, limitSections: int = None, limitItemsPerSection: int = None) -> Dict[str, Any]:
     """
     Get full menu (sections and items) for a restaurant
     Mirrors: food-chat/tools.ts -> getRestaurantMenu
     """
+    cache_key = ("get_restaurant_menu", normalize_query(restaurant_slug), limitSections, limitItemsPerSection)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    
+    # Rooms asking for the same menu at once share one fetch
+    menu = await lookup_flights.do(cache_key, lambda: _load_restaurant_menu(
+        cache_key, restaurant_slug, limitSections, limitItemsPerSection
+    ))
+    return copy.deepcopy(menu)
+
+
+async def _load_restaurant_menu(
+    cache_key: Tuple,
+    restaurant_slug: str,
+    limitSections: Optional[int],
+    limitItemsPerSection: Optional[int]
+) -> Dict[str, Any]:
+    """Fetch and shape a restaurant menu; successful results are stored in the catalog cache"""
     try:
-        # First get restaurant details
-        restaurant_response = supabase.table("fc_restaurants").select(
-            "id, slug, name, cuisine, hero_image"
-        ).eq("slug", restaurant_slug).eq("is_active", True).limit(1).execute()
+        # Restaurant, sections and items in one round trip (embedded resources)
+        try:
+            fetched = await _fetch_restaurant_menu_embedded(restaurant_slug)
+        except Exception as embed_error:
+            # Fallback: restaurant lookup + fc_menu_sections_with_items view (two round trips)
+            print(f"Embedded menu query failed, using sections view: {embed_error}")
+            fetched = await _fetch_restaurant_menu_view(restaurant_slug)
         
-        if not restaurant_response.data:
+        if fetched is None:
             return {
                 "success": False,
                 "message": f"Could not find restaurant: {restaurant_slug}",
                 "sections": []
             }
         
-        restaurant = restaurant_response.data[0]
-        restaurant_id = restaurant["id"]
+        restaurant, sections = fetched
         
-        # Query menu sections with items (using the view if available, or manual join)
-        try:
-            # Try using the view first
-            menu_response = supabase.table("fc_menu_sections_with_items").select(
-                "*"
-            ).eq("restaurant_id", restaurant_id).order("section_position").execute()
-            
-            sections = []
-            for section_data in (menu_response.data or []):
-                items = []
-                if section_data.get("items"):
-                    for item in section_data["items"]:
-                        items.append({
-                            "id": item["id"],
-                            "slug": item.get("slug"),
-                            "name": item["name"],
-                            "description": item.get("description"),
-                            "price": float(item["base_price"]) if item.get("base_price") else 0,
-                            "tags": item.get("tags", []) if isinstance(item.get("tags"), list) else [],
-                            "calories": item.get("calories"),
-                            "rating": float(item["rating"]) if item.get("rating") else None,
-                            "image": item.get("image"),
-                            "sectionTitle": section_data["section_title"]
-                        })
-                
-                # Apply item limit if specified
-                if limitItemsPerSection:
-                    items = items[:limitItemsPerSection]
-                
-                sections.append({
-                    "id": section_data["section_id"],
-                    "slug": section_data.get("section_slug"),
-                    "title": section_data["section_title"],
-                    "description": section_data.get("section_description"),
-                    "position": section_data.get("section_position", 0),
-                    "items": items
-                })
-        
-        except Exception as view_error:
-            # Fallback: manual join if view doesn't exist
-            print(f"View query failed, using manual join: {view_error}")
-            sections_response = supabase.table("fc_menu_sections").select(
-                "id, slug, title, description, position"
-            ).eq("restaurant_id", restaurant_id).order("position").execute()
-            
-            sections = []
-            for section in (sections_response.data or []):
-                items_response = supabase.table("fc_menu_items").select(
-                    "id, slug, name, description, base_price, tags, calories, rating, image"
-                ).eq("section_id", section["id"]).eq("is_available", True).order("position").execute()
-                
-                items = []
-                for item in (items_response.data or []):
-                    items.append({
-                        "id": item["id"],
-                        "slug": item.get("slug"),
-                        "name": item["name"],
-                        "description": item.get("description"),
-                        "price": float(item["base_price"]) if item.get("base_price") else 0,
-                        "tags": item.get("tags", []) if isinstance(item.get("tags"), list) else [],
-                        "calories": item.get("calories"),
-                        "rating": float(item["rating"]) if item.get("rating") else None,
-                        "image": item.get("image"),
-                        "sectionTitle": section["title"]
-                    })
-                
-                # Apply item limit if specified
-                if limitItemsPerSection:
-                    items = items[:limitItemsPerSection]
-                
-                sections.append({
-                    "id": section["id"],
-                    "slug": section.get("slug"),
-                    "title": section["title"],
-                    "description": section.get("description"),
-                    "position": section.get("position", 0),
-                    "items": items
-                })
+        # Apply item limit if specified
+        if limitItemsPerSection:
+            for section in sections:
+                section["items"] = section["items"][:limitItemsPerSection]
         
         # Apply section limit if specified
         if limitSections:
             sections = sections[:limitSections]
         
-        # Generate speech summary
-        if sections and sections[0].get("items"):
-            lead_item = sections[0]["items"][0]
-            speech_summary = f"Here are {len(sections)} menu section{'s' if len(sections) != 1 else ''} at {restaurant['name']}. {lead_item['name']} is available for {format_currency(lead_item['price'])}."
-        else:
-            speech_summary = f"I could not find menu details for {restaurant['name']} right now."
-        
-        return {
-            "success": True,
-            "restaurant": {
-                "id": restaurant["id"],
-                "slug": restaurant["slug"],
-                "name": restaurant["name"],
-                "cuisine": restaurant.get("cuisine"),
-                "heroImage": restaurant.get("hero_image")
-            },
-            "sections": sections,
-            "speechSummary": speech_summary
-        }
+        menu = {**_menu_header(restaurant, len(sections), sections[0] if sections else None), "sections": sections}
+        catalog_cache.set(cache_key, menu)
+        return menu
         
     except Exception as error:
         print(f"Error in get_restaurant_menu: {error}")
@@ -527,10 +1323,237 @@ async def get_restaurant_menu(restaurant_slug: str, limitSections: int = None, l
         }
 
 
-def get_voice_cart() -> Dict[str, Any]:
-    """Get current voice cart"""
-    global voice_cart
-    if not voice_cart or not voice_cart.get("items"):
+# Streamed menus fetch items this many sections per round trip, so the first
+# section is sent before the rest of the menu has been read
+MENU_STREAM_PAGE_SECTIONS = int(os.getenv("MENU_STREAM_PAGE_SECTIONS", "2"))
+
+
+async def _fetch_menu_outline(restaurant_slug: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """A restaurant and its active sections in display order, without items (None if it does not exist)"""
+    response = await _execute(supabase.table("fc_restaurants").select(
+        f"{MENU_RESTAURANT_COLUMNS}, sections:fc_menu_sections(id, name, description, display_order, is_active)"
+    ).eq("slug", restaurant_slug).eq("is_active", True).limit(1))
+    
+    if not response.data:
+        return None
+    
+    restaurant = response.data[0]
+    sections = [section for section in (restaurant.pop("sections", None) or []) if section.get("is_active") is not False]
+    sections.sort(key=lambda section: section.get("display_order") or 0)
+    return restaurant, sections
+
+
+async def _fetch_section_items(section_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Available items of a page of sections (fc_menu_items_section_id_idx), grouped by section id in display order"""
+    response = await _execute(supabase.table("fc_menu_items").select(
+        "id, slug, name, description, base_price, dietary_tags, calories, image, section_id, display_order"
+    ).in_("section_id", section_ids).eq("is_available", True).order("display_order"))
+    
+    items: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in response.data or []:
+        items[row["section_id"]].append(row)
+    return items
+
+
+async def stream_restaurant_menu(
+    restaurant_slug: str,
+    limitSections: int = None,
+    limitItemsPerSection: int = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield a restaurant menu piece by piece for progressive delivery:
+    ("header", menu-without-sections) first, then ("section", section) in order.
+    A cached menu is replayed as is. Otherwise the restaurant and its section
+    outline are read first and items are fetched MENU_STREAM_PAGE_SECTIONS
+    sections at a time, the next page in flight while the current one is
+    yielded, so the header and first section go out after two round trips
+    whatever the menu size. The assembled menu is then cached for
+    get_restaurant_menu. A failed lookup yields only a header with success=False.
+    """
+    cache_key = ("get_restaurant_menu", normalize_query(restaurant_slug), limitSections, limitItemsPerSection)
+    cached = catalog_cache.get(cache_key)
+    try:
+        outline = None if cached is not None else await _fetch_menu_outline(restaurant_slug)
+    except Exception as error:
+        print(f"Menu outline query failed, streaming the full menu: {error}")
+        cached = await get_restaurant_menu(restaurant_slug, limitSections, limitItemsPerSection)
+    
+    if cached is not None:
+        menu = copy.deepcopy(cached)
+        sections = menu.pop("sections", None) or []
+        menu["sectionCount"] = len(sections)
+        yield "header", menu
+        for section in sections:
+            await asyncio.sleep(0)
+            yield "section", section
+        return
+    
+    if outline is None:
+        yield "header", {"success": False, "message": f"Could not find restaurant: {restaurant_slug}", "sectionCount": 0}
+        return
+    
+    restaurant, outline_sections = outline
+    if limitSections:
+        outline_sections = outline_sections[:limitSections]
+    size = max(1, MENU_STREAM_PAGE_SECTIONS)
+    pages = [outline_sections[start:start + size] for start in range(0, len(outline_sections), size)]
+    
+    def fetch(page: List[Dict[str, Any]]) -> "asyncio.Task[Dict[str, List[Dict[str, Any]]]]":
+        return asyncio.create_task(_fetch_section_items([section["id"] for section in page]))
+    
+    def shape(section: Dict[str, Any], items: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        rows = items.get(section["id"], [])
+        if limitItemsPerSection:
+            rows = rows[:limitItemsPerSection]
+        return {
+            "id": section["id"],
+            "slug": section.get("name"),
+            "title": section.get("name"),
+            "description": section.get("description"),
+            "position": section.get("display_order", 0),
+            "items": [_shape_menu_item(item, section.get("name")) for item in rows]
+        }
+    
+    sections: List[Dict[str, Any]] = []
+    next_page = fetch(pages[0]) if pages else None
+    try:
+        for index, page in enumerate(pages):
+            items = await next_page
+            next_page = fetch(pages[index + 1]) if index + 1 < len(pages) else None
+            shaped = [shape(section, items) for section in page]
+            if index == 0:
+                header = _menu_header(restaurant, len(outline_sections), shaped[0])
+                yield "header", {**copy.deepcopy(header), "sectionCount": len(outline_sections)}
+            for section in shaped:
+                sections.append(section)
+                yield "section", copy.deepcopy(section)
+        if not pages:
+            header = _menu_header(restaurant, 0, None)
+            yield "header", {**copy.deepcopy(header), "sectionCount": 0}
+    except Exception as error:
+        # Sections already sent stay on the card; the partial menu is not cached
+        print(f"Error streaming menu for {restaurant_slug}: {error}")
+        if not sections:
+            yield "header", {"success": False, "message": f"Error fetching menu: {str(error)}", "sectionCount": 0}
+        return
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+    catalog_cache.set(cache_key, {**header, "sections": sections})
+
+
+# Worker prewarm: hot lookups to run once per process before the first room
+# joins (comma-separated; restaurant searches by cuisine, menus by slug)
+PREWARM_CUISINES = [c.strip() for c in os.getenv("PREWARM_CUISINES", "").split(",") if c.strip()]
+PREWARM_RESTAURANT_SLUGS = [s.strip() for s in os.getenv("PREWARM_RESTAURANT_SLUGS", "").split(",") if s.strip()]
+
+
+def prewarm_worker(profile_id: str = None) -> Dict[str, Any]:
+    """
+    Warm process-level state for the AgentServer setup hook (synchronous).
+    Opens the Supabase connection, preloads the profile, loads the catalog
+    snapshot (memory engine or priced carts) and fills catalog_cache with hot lookups, so the
+    first session's tool calls are not cold. Runs on a private event loop in a
+    helper thread; nothing loop-bound (locks, HTTP clients) is left behind.
+    Returns {"profile": ...} for the process userdata.
+    """
+    async def warm() -> Dict[str, Any]:
+        started = time.monotonic()
+        profile = await get_user_profile(profile_id)
+        if CATALOG_SEARCH_ENGINE == "memory" or PRICED_CART_ENABLED:
+            try:
+                await load_menu_catalog()
+            except Exception as error:
+                print(f"⚠️ Prewarm catalog load failed: {error}")
+        await asyncio.gather(
+            *(_cached_lookup(("search_restaurants_by_cuisine", normalize_query(cuisine)),
+                             lambda cuisine=cuisine: _query_restaurants_by_cuisine(cuisine))
+              for cuisine in PREWARM_CUISINES),
+            *(get_restaurant_menu(slug) for slug in PREWARM_RESTAURANT_SLUGS),
+            return_exceptions=True,
+        )
+        print(f"🔥 Worker prewarmed in {time.monotonic() - started:.2f}s "
+              f"(catalog items: {len(menu_catalog)}, cached lookups: {len(catalog_cache)})")
+        return {"profile": profile}
+    
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prewarm") as pool:
+        return pool.submit(asyncio.run, warm()).result()
+
+
+# Order submission: checkout journals the order and answers immediately; the
+# order queue writes it to fc_orders / fc_order_items / fc_order_events with
+# the fc_submit_order RPC (migration 005) in the background, retrying until
+# it lands. Orders journaled by a crashed worker are adopted on next start.
+ORDER_SUBMISSION_ENABLED = os.getenv("ORDER_SUBMISSION_ENABLED", "true").lower() == "true"
+
+
+async def _submit_order(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Write one order, its lines and its events in one transaction (idempotent on order id)"""
+    response = await _execute(supabase.rpc("fc_submit_order", {"p_order": order}))
+    return response.data or {}
+
+
+order_queue = OrderQueue(_submit_order)
+
+
+def start_order_submission() -> int:
+    """Open this process's order journal and resubmit orders left by crashed workers; returns how many are pending"""
+    if not ORDER_SUBMISSION_ENABLED:
+        return 0
+    # open() also adopts orders from crashed workers' journals
+    order_queue.open()
+    return len(order_queue)
+
+
+async def sync_orders() -> None:
+    """Make journaled orders crash-safe on disk (ORDER_JOURNAL_FSYNC) before confirming them"""
+    if ORDER_SUBMISSION_ENABLED:
+        await order_queue.sync()
+
+
+async def flush_orders() -> bool:
+    """Submit pending orders now; False if some are still waiting for a retry"""
+    if not ORDER_SUBMISSION_ENABLED:
+        return True
+    return await order_queue.flush()
+
+
+def _build_order(order_id: str, order_number: str, session_id: str, cart: Dict[str, Any]) -> Dict[str, Any]:
+    """fc_submit_order payload for a checked-out cart"""
+    placed_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": order_id,
+        "order_number": order_number,
+        "profile_id": DEMO_PROFILE_ID,
+        "restaurant_id": _as_uuid(cart["restaurantId"]),
+        "restaurant_name": cart["restaurantName"],
+        "status": "pending",
+        "subtotal": round(cart["subtotal"], 2),
+        "delivery_fee": round(cart["deliveryFee"], 2),
+        "total": round(cart["total"], 2),
+        "placed_at": placed_at,
+        "items": [
+            {
+                "menu_item_id": _as_uuid(item["menuItemId"]),
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "unit_price": round(item["basePrice"], 2),
+                "total_price": round(item["totalPrice"], 2),
+            }
+            for item in cart["items"]
+        ],
+        "events": [{
+            "event_type": "order_placed",
+            "event_data": {"source": "voice", "session": session_id, "itemCount": len(cart["items"])},
+            "created_at": placed_at,
+        }],
+    }
+
+
+def get_voice_cart(session_id: str = DEFAULT_CART_SESSION) -> Dict[str, Any]:
+    """Get current voice cart for a session"""
+    voice_cart = voice_carts.get(session_id)
+    if not voice_cart:
         return {
             "success": True,
             "cart": {
@@ -546,147 +1569,181 @@ def get_voice_cart() -> Dict[str, Any]:
         }
     return {
         "success": True,
-        "cart": voice_cart
+        "cart": voice_cart.to_dict()
     }
 
 
-def add_to_voice_cart(item_name: str, restaurant_name: str = None, quantity: int = 1, additional_items: List[Dict] = None) -> Dict[str, Any]:
+def _price_cart_item(item_name: str, restaurant_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Catalog prices a spoken item name resolves to: one entry, several equally
+    good ones to ask about, or none (pricing off, catalog not loaded, no match)
+    """
+    if not PRICED_CART_ENABLED or not menu_catalog.loaded:
+        return []
+    return menu_catalog.price_candidates(item_name, restaurant_ids, min_score=CART_FUZZY_MIN_SCORE)
+
+
+def _which_one(item_name: str, options: List[str]) -> str:
+    """Question for the user when a spoken name matches several menu items"""
+    return f"'{item_name}' could be {', '.join(options[:-1])} or {options[-1]}. Which one?"
+
+
+def _prices_unavailable() -> bool:
+    """Priced carts are on but the catalog snapshot has not loaded (e.g. the database was down)"""
+    return PRICED_CART_ENABLED and not menu_catalog.loaded
+
+
+def _estimated_price_note(item_names: List[str]) -> str:
+    """Tool-reply note for lines added at the demo price because menu prices could not be loaded"""
+    names = ", ".join(item_names)
+    return f"Menu prices are unavailable right now, so {names} was added at an estimated ${UNPRICED_ITEM_PRICE:.2f} each."
+
+
+def _add_cart_item(voice_cart: VoiceCart, item_name: str, quantity: int, restaurant_ids: List[str]) -> Tuple[Optional[CartLine], List[str]]:
+    """
+    Add one item at its catalog price; restaurant_ids gains its restaurant.
+    Returns (line, []) once added. Nothing is added if no menu item matches
+    (None, []): an invented price would end up in the submitted order; or if
+    several items match equally well (None, their names), so the user can be
+    asked which one. With PRICED_CART_ENABLED off, or while the catalog is
+    not loaded, the item gets the flat demo price instead (callers say so
+    when _prices_unavailable()).
+    """
+    candidates = _price_cart_item(item_name, restaurant_ids)
+    if len(candidates) > 1:
+        return None, [candidate["name"] for candidate in candidates]
+    if not candidates:
+        if PRICED_CART_ENABLED and menu_catalog.loaded:
+            return None, []
+        return voice_cart.add(item_name, quantity, UNPRICED_ITEM_PRICE), []
+    priced = candidates[0]
+    restaurant_ids.append(priced["restaurantId"])
+    # Use the menu's spelling so "pad tie" and "Pad Thai" merge into one line
+    return voice_cart.add(
+        priced["name"],
+        quantity,
+        priced["basePrice"],
+        menu_item_id=priced["menuItemId"],
+        restaurant_id=priced["restaurantId"],
+        restaurant_slug=priced["restaurantSlug"],
+        restaurant_name=priced["restaurantName"],
+        delivery_fee=priced["deliveryFee"],
+    ), []
+
+
+def add_to_voice_cart(item_name: str, restaurant_name: str = None, quantity: int = 1, additional_items: List[Dict] = None, session_id: str = DEFAULT_CART_SESSION) -> Dict[str, Any]:
     """
-    Add items to voice cart (in-memory)
+    Add items to a session's voice cart (in-memory)
     Merges items with the same name, otherwise appends
+    Prices come from the in-memory catalog (no database round trip per add)
     Mirrors: voice-chat/tools.ts -> quickAddToCart
     """
-    global voice_cart
+    voice_cart = voice_carts.get(session_id)
+    if voice_cart is None:
+        voice_cart = VoiceCart(restaurant_name=restaurant_name or "Restaurant")
+    elif restaurant_name:
+        voice_cart.restaurant_name = restaurant_name
     
     # Combine main item with additional items
     new_items_to_add = [{"itemName": item_name, "quantity": quantity}]
     if additional_items:
         new_items_to_add.extend(additional_items)
     
-    base_price = 8.99
-    delivery_fee = 2.99
-    
-    # Check if we have an existing cart with items
-    existing_items = []
-    if voice_cart and voice_cart.get("items"):
-        # Extract existing items 
-        existing_items = voice_cart["items"].copy()
+    # Prefer restaurants already in the cart (or named by the user) when an item is on several menus
+    restaurant_ids = voice_cart.restaurant_ids()
+    if restaurant_name and menu_catalog.loaded:
+        restaurant_ids.extend(
+            restaurant_id for restaurant_id, restaurant in menu_catalog.restaurants.items()
+            if normalize_name(restaurant.get("name")) == normalize_name(restaurant_name)
+        )
     
-    # Process new items - merge if same name exists
+    # Merge into the line with the same name, otherwise append
+    not_found: List[str] = []
+    ambiguous: Dict[str, List[str]] = {}
     for new_item in new_items_to_add:
-        item_name_to_add = new_item["itemName"]
-        qty_to_add = new_item["quantity"]
-        
-        # Look for existing item with same name (case-insensitive)
-        found = False
-        for existing_item in existing_items:
-            if existing_item["name"].lower() == item_name_to_add.lower():
-                # Merge quantities
-                existing_item["quantity"] += qty_to_add
-                existing_item["totalPrice"] = existing_item["basePrice"] * existing_item["quantity"]
-                found = True
-                break
-        
-        # If not found, add as new item
-        if not found:
-            item_id = f"item-{len(existing_items)}"
-            line_price = base_price * qty_to_add
-            
-            existing_items.append({
-                "id": item_id,
-                "menuItemId": f"menu-{len(existing_items)}",
-                "name": item_name_to_add,
-                "quantity": qty_to_add,
-                "basePrice": base_price,
-                "totalPrice": line_price,
-                "options": [],
-                "restaurant": {
-                    "name": restaurant_name or (voice_cart.get("restaurantName") if voice_cart else "Restaurant")
-                }
-            })
+        line, options = _add_cart_item(voice_cart, new_item["itemName"], new_item["quantity"], restaurant_ids)
+        if options:
+            ambiguous[new_item["itemName"]] = options
+        elif line is None:
+            not_found.append(new_item["itemName"])
+    missing = ", ".join(f"'{name}'" for name in not_found)
+    questions = [_which_one(name, options) for name, options in ambiguous.items()]
+    if len(not_found) + len(ambiguous) == len(new_items_to_add):
+        messages = [f"Couldn't find {missing} on any menu, so nothing was added."] if not_found else []
+        result = {"success": False, "message": " ".join(messages + questions)}
+        if not_found:
+            result["notFound"] = not_found
+        if ambiguous:
+            result["ambiguous"] = ambiguous
+        return result
     
-    # Recalculate totals for all items
-    subtotal = sum(item["totalPrice"] for item in existing_items)
-    total = subtotal + delivery_fee
-    total_quantity = sum(item["quantity"] for item in existing_items)
-    
-    # DEBUG: Log cart calculation
-    print(f"\n🔍 DEBUG add_to_voice_cart():")
-    print(f"   Items in cart: {len(existing_items)}")
-    for item in existing_items:
-        print(f"     - {item['name']}: qty={item['quantity']}, basePrice=${item['basePrice']}, totalPrice=${item['totalPrice']}")
-    print(f"   Subtotal: ${subtotal:.2f}")
-    print(f"   Delivery Fee: ${delivery_fee:.2f}")
-    print(f"   TOTAL: ${total:.2f}\n")
-    
-    # Update or create cart with all items
-    voice_cart = {
-        "id": "cart-voice",
-        "restaurantId": "mock-restaurant-id",
-        "restaurantSlug": "mock-restaurant",
-        "restaurantName": restaurant_name or (voice_cart.get("restaurantName") if voice_cart else "Restaurant"),
-        "status": "active",
-        "subtotal": subtotal,
-        "deliveryFee": delivery_fee,
-        "total": total,
-        "items": existing_items
-    }
+    voice_carts.set(session_id, voice_cart)
+    _mark_cart_dirty(session_id, voice_cart)
     
-    return {
+    result = {
         "success": True,
-        "cart": voice_cart,
-        "subtotal": subtotal,
-        "total": total,
-        "itemCount": total_quantity
+        "cart": voice_cart.to_dict(),
+        "subtotal": voice_cart.subtotal,
+        "total": voice_cart.total,
+        "itemCount": voice_cart.quantity
     }
+    notes = []
+    if not_found:
+        notes.append(f"Couldn't find {missing} on any menu, so it was not added.")
+        result["notFound"] = not_found
+    if ambiguous:
+        notes.extend(questions)
+        result["ambiguous"] = ambiguous
+    if _prices_unavailable():
+        notes.append(_estimated_price_note([new_item["itemName"] for new_item in new_items_to_add]))
+        result["pricesUnavailable"] = True
+    if notes:
+        result["message"] = " ".join(notes)
+    return result
 
 
-def checkout_cart() -> Dict[str, Any]:
+def checkout_cart(session_id: str = DEFAULT_CART_SESSION) -> Dict[str, Any]:
     """
-    Checkout current cart
+    Checkout a session's current cart
     Mirrors: voice-chat/tools.ts -> quickCheckout
     """
-    global voice_cart
+    voice_cart = voice_carts.get(session_id)
     
-    if not voice_cart or not voice_cart.get("items"):
+    if not voice_cart:
         return {
             "success": False,
             "message": "Your cart is empty. Add some items first."
         }
     
-    # Generate order number
-    import time
-    order_number = f"VO{str(int(time.time()))[-6:]}"
-    
-    # DEBUG: Log cart state before checkout
-    print(f"\n🔍 DEBUG checkout_cart():")
-    print(f"   Cart subtotal: ${voice_cart.get('subtotal')}")
-    print(f"   Cart deliveryFee: ${voice_cart.get('deliveryFee')}")
-    print(f"   Cart total: ${voice_cart.get('total')}")
-    print(f"   Cart items: {len(voice_cart.get('items', []))}")
-    for item in voice_cart.get('items', []):
-        print(f"     - {item['name']}: qty={item['quantity']}, basePrice=${item['basePrice']}, totalPrice=${item['totalPrice']}")
+    # Order id from a random UUID (no collisions across rooms or workers);
+    # the spoken order number is derived from it
+    order_id = str(uuid.uuid4())
+    order_number = f"VO{order_id.replace('-', '')[:10].upper()}"
+    cart = voice_cart.to_dict()
     
     # Create order summary
     order_summary = {
         "orderNumber": order_number,
         "success": True,
         "restaurant": {
-            "id": voice_cart.get("restaurantId"),
-            "name": voice_cart.get("restaurantName"),
+            "id": cart["restaurantId"],
+            "name": cart["restaurantName"],
             "cuisine": "american"
         },
-        "items": voice_cart.get("items"),
-        "subtotal": voice_cart.get("subtotal"),
-        "deliveryFee": voice_cart.get("deliveryFee"),
-        "total": voice_cart.get("total"),
-        "itemCount": len(voice_cart.get("items", []))
+        "items": cart["items"],
+        "subtotal": cart["subtotal"],
+        "deliveryFee": cart["deliveryFee"],
+        "total": cart["total"],
+        "itemCount": len(cart["items"])
     }
     
-    print(f"   Order summary total: ${order_summary['total']}\n")
+    # Journal the order before confirming it; it is written to the database in the background
+    if ORDER_SUBMISSION_ENABLED:
+        order_queue.put(_build_order(order_id, order_number, session_id, cart))
     
-    # Clear cart after checkout
-    voice_cart = None
+    # Clear cart after checkout; the ordered cart is persisted (callers flush it)
+    voice_carts.clear(session_id)
+    _mark_cart_ordered(session_id, voice_cart, order_id)
     
     return {
         "success": True,
@@ -698,151 +1755,214 @@ def checkout_cart() -> Dict[str, Any]:
     }
 
 
-def update_cart_item_quantity(item_name: str, new_quantity: int) -> Dict[str, Any]:
+# Cart-line matching drives removals and quantity changes (and pricing of
+# adds), so it is stricter than search: a same-sounding one-word swap ("coke"
+# vs "cake", 0.7) must not change a different line, while "pad tie" ->
+# "Pad Thai" (0.79) still resolves.
+CART_FUZZY_MIN_SCORE = float(os.getenv("CART_FUZZY_MIN_SCORE", "0.75"))
+
+
+def resolve_cart_line(voice_cart: VoiceCart, item_name: str) -> Optional[CartLine]:
+    """
+    Map a spoken item name onto a line already in the cart.
+    Exact (case- and punctuation-insensitive) matches win; otherwise the closest
+    phonetic/trigram match is used, so "pad tie" resolves to "Pad Thai".
     """
-    Update the quantity of an item in the cart by name.
+    line = voice_cart.find(item_name)
+    if line is not None:
+        return line
+    match = best_match(item_name, voice_cart.names(), min_score=CART_FUZZY_MIN_SCORE)
+    if match:
+        print(f"🔤 Resolved cart item '{item_name}' -> '{match}'")
+        return voice_cart.find(match)
+    return None
+
+
+def _heard_as(item_name: str, line: CartLine) -> str:
+    """Note for tool replies when a spoken name was fuzzily matched, so the change is read back"""
+    if normalize_name(item_name) == normalize_name(line.name):
+        return ""
+    return f" (matched '{item_name}' to {line.name})"
+
+
+def _cart_mutation_result(session_id: str, voice_cart: VoiceCart, message: str, empty_message: str) -> Dict[str, Any]:
+    """Persist a changed cart and shape the tool result (dropping the cart once it is empty)"""
+    if len(voice_cart):
+        _mark_cart_dirty(session_id, voice_cart)
+        return {
+            "success": True,
+            "message": message,
+            "cart": voice_cart.to_dict(),
+            "subtotal": voice_cart.subtotal,
+            "total": voice_cart.total,
+            "itemCount": voice_cart.quantity
+        }
+    # Cart is now empty
+    voice_carts.clear(session_id)
+    _mark_cart_dirty(session_id, None)
+    return {
+        "success": True,
+        "message": empty_message,
+        "cart": None,
+        "subtotal": 0,
+        "total": 0,
+        "itemCount": 0
+    }
+
+
+def update_cart_item_quantity(item_name: str, new_quantity: int, session_id: str = DEFAULT_CART_SESSION) -> Dict[str, Any]:
+    """
+    Update the quantity of an item in a session's cart by name.
     If new_quantity is 0, removes the item.
     If item doesn't exist, returns error.
     """
-    global voice_cart
+    voice_cart = voice_carts.get(session_id)
     
-    if not voice_cart or not voice_cart.get("items"):
+    if not voice_cart:
         return {
             "success": False,
             "message": "Your cart is empty."
         }
     
-    # Find the item by name (case-insensitive)
-    item_name_lower = item_name.lower()
-    item_found = False
-    updated_items = []
-    
-    for item in voice_cart["items"]:
-        if item["name"].lower() == item_name_lower:
-            item_found = True
-            if new_quantity > 0:
-                # Update quantity
-                item["quantity"] = new_quantity
-                item["totalPrice"] = item["basePrice"] * new_quantity
-                updated_items.append(item)
-            # If new_quantity is 0, don't add to updated_items (remove it)
-        else:
-            updated_items.append(item)
-    
-    if not item_found:
+    # Find the item by name (tolerating STT near-misses)
+    line = resolve_cart_line(voice_cart, item_name)
+    if line is None:
         return {
             "success": False,
             "message": f"Item '{item_name}' not found in cart."
         }
     
-    # Update cart with new items list
-    voice_cart["items"] = updated_items
-    
-    # Recalculate totals
-    if updated_items:
-        subtotal = sum(item["totalPrice"] for item in updated_items)
-        total = subtotal + voice_cart["deliveryFee"]
-        total_quantity = sum(item["quantity"] for item in updated_items)
-        
-        voice_cart["subtotal"] = subtotal
-        voice_cart["total"] = total
-        
-        action = "updated" if new_quantity > 0 else "removed"
-        return {
-            "success": True,
-            "message": f"{item_name} {action} successfully.",
-            "cart": voice_cart,
-            "subtotal": subtotal,
-            "total": total,
-            "itemCount": total_quantity
-        }
-    else:
-        # Cart is now empty
-        voice_cart = None
-        return {
-            "success": True,
-            "message": f"{item_name} removed. Your cart is now empty.",
-            "cart": None,
-            "subtotal": 0,
-            "total": 0,
-            "itemCount": 0
-        }
+    voice_cart.set_quantity(line, new_quantity)
+    action = "updated" if new_quantity > 0 else "removed"
+    heard = _heard_as(item_name, line)
+    return _cart_mutation_result(
+        session_id, voice_cart,
+        f"{line.name} {action} successfully{heard}.",
+        f"{line.name} removed{heard}. Your cart is now empty.",
+    )
 
 
-def remove_from_cart(item_name: str, quantity_to_remove: int = None) -> Dict[str, Any]:
+def remove_from_cart(item_name: str, quantity_to_remove: int = None, session_id: str = DEFAULT_CART_SESSION) -> Dict[str, Any]:
     """
-    Remove items from cart by name.
+    Remove items from a session's cart by name.
     If quantity_to_remove is specified, reduces quantity by that amount.
     If quantity_to_remove is None or >= current quantity, removes item entirely.
     """
-    global voice_cart
+    voice_cart = voice_carts.get(session_id)
     
-    if not voice_cart or not voice_cart.get("items"):
+    if not voice_cart:
         return {
             "success": False,
             "message": "Your cart is empty."
         }
     
-    # Find the item by name (case-insensitive)
-    item_name_lower = item_name.lower()
-    item_found = False
-    updated_items = []
-    removed_count = 0
+    # Find the item by name (tolerating STT near-misses)
+    line = resolve_cart_line(voice_cart, item_name)
+    if line is None:
+        return {
+            "success": False,
+            "message": f"Item '{item_name}' not found in cart."
+        }
     
-    for item in voice_cart["items"]:
-        if item["name"].lower() == item_name_lower:
-            item_found = True
-            current_qty = item["quantity"]
-            
-            if quantity_to_remove is None or quantity_to_remove >= current_qty:
-                # Remove entire item
-                removed_count = current_qty
-                # Don't add to updated_items
-            else:
-                # Reduce quantity
-                new_qty = current_qty - quantity_to_remove
-                removed_count = quantity_to_remove
-                item["quantity"] = new_qty
-                item["totalPrice"] = item["basePrice"] * new_qty
-                updated_items.append(item)
-        else:
-            updated_items.append(item)
+    if quantity_to_remove is None or quantity_to_remove >= line.quantity:
+        # Remove entire item
+        removed_count = line.quantity
+        voice_cart.remove(line)
+    else:
+        # Reduce quantity
+        removed_count = quantity_to_remove
+        voice_cart.set_quantity(line, line.quantity - quantity_to_remove)
     
-    if not item_found:
+    qty_msg = f"{removed_count} " if removed_count > 1 else ""
+    heard = _heard_as(item_name, line)
+    return _cart_mutation_result(
+        session_id, voice_cart,
+        f"Removed {qty_msg}{line.name} from cart{heard}.",
+        f"Removed {line.name}{heard}. Your cart is now empty.",
+    )
+
+
+CART_OPERATION_ACTIONS = ("add", "remove", "set")
+
+
+def apply_cart_operations(operations: List[Dict[str, Any]], session_id: str = DEFAULT_CART_SESSION) -> Dict[str, Any]:
+    """
+    Apply several cart changes from one utterance, all or nothing.
+    Each operation is {"action": "add" | "remove" | "set", "itemName": str,
+    "quantity": int | None}: add defaults to 1, remove without a quantity
+    removes the whole line, set to 0 removes it. Operations run in order on a
+    copy of the cart, so "add pad thai, make it 3" works; if any of them fails
+    the cart is left untouched. Totals, persistence and the returned cart are
+    produced once for the whole batch.
+    """
+    if not operations:
         return {
             "success": False,
-            "message": f"Item '{item_name}' not found in cart."
+            "message": "No cart changes given."
         }
     
-    # Update cart with new items list
-    voice_cart["items"] = updated_items
+    current = voice_carts.get(session_id)
+    voice_cart = current.copy() if current else VoiceCart()
+    restaurant_ids = voice_cart.restaurant_ids()
+    applied: List[str] = []
+    errors: List[str] = []
+    estimated: List[str] = []
     
-    # Recalculate totals
-    if updated_items:
-        subtotal = sum(item["totalPrice"] for item in updated_items)
-        total = subtotal + voice_cart["deliveryFee"]
-        total_quantity = sum(item["quantity"] for item in updated_items)
+    for operation in operations:
+        action = str(operation.get("action", "")).lower()
+        item_name = str(operation.get("itemName") or "").strip()
+        quantity = operation.get("quantity")
+        if action not in CART_OPERATION_ACTIONS or not item_name:
+            errors.append(f"Unsupported change: {operation}")
+            continue
+        if quantity is not None and (not isinstance(quantity, int) or quantity < 0):
+            errors.append(f"Invalid quantity for {item_name}: {quantity}")
+            continue
         
-        voice_cart["subtotal"] = subtotal
-        voice_cart["total"] = total
+        if action == "add":
+            quantity = quantity or 1
+            line, options = _add_cart_item(voice_cart, item_name, quantity, restaurant_ids)
+            if options:
+                errors.append(_which_one(item_name, options))
+            elif line is None:
+                errors.append(f"Couldn't find '{item_name}' on any menu.")
+            else:
+                applied.append(f"Added {quantity}x {line.name}")
+                if _prices_unavailable():
+                    estimated.append(line.name)
+            continue
         
-        qty_msg = f"{removed_count} " if removed_count > 1 else ""
-        return {
-            "success": True,
-            "message": f"Removed {qty_msg}{item_name} from cart.",
-            "cart": voice_cart,
-            "subtotal": subtotal,
-            "total": total,
-            "itemCount": total_quantity
-        }
-    else:
-        # Cart is now empty
-        voice_cart = None
+        line = resolve_cart_line(voice_cart, item_name)
+        if line is None:
+            errors.append(f"Item '{item_name}' not found in cart.")
+        elif action == "set":
+            if quantity is None:
+                errors.append(f"No quantity given for {line.name}")
+                continue
+            voice_cart.set_quantity(line, quantity)
+            applied.append((f"Set {line.name} to {quantity}" if quantity else f"Removed {line.name}") + _heard_as(item_name, line))
+        elif quantity is None or quantity >= line.quantity:
+            voice_cart.remove(line)
+            applied.append(f"Removed {line.name}{_heard_as(item_name, line)}")
+        else:
+            voice_cart.set_quantity(line, line.quantity - quantity)
+            applied.append(f"Removed {quantity}x {line.name}{_heard_as(item_name, line)}")
+    
+    if errors:
         return {
-            "success": True,
-            "message": f"Removed {item_name}. Your cart is now empty.",
-            "cart": None,
-            "subtotal": 0,
-            "total": 0,
-            "itemCount": 0
+            "success": False,
+            "message": " ".join(errors) + " No changes were made.",
+            "errors": errors
         }
+    
+    print(f"🛒 Cart batch for {session_id}: {'; '.join(applied)} (total ${voice_cart.total:.2f})")
+    if len(voice_cart):
+        voice_carts.set(session_id, voice_cart)
+    message = ". ".join(applied) + "."
+    if estimated:
+        message += " " + _estimated_price_note(estimated)
+    result = _cart_mutation_result(session_id, voice_cart, message, message + " Your cart is now empty.")
+    result["applied"] = applied
+    if estimated:
+        result["pricesUnavailable"] = True
+    return result
@@ -23,6 +23,7 @@ Tools (9 total, matching TypeScript):
 7. remove_from_cart - Remove items from cart
 8. update_cart_quantity - Update item quantity
 9. quick_checkout - Complete order
+10. update_cart - Several adds/removes/quantity changes in one call
 
 Usage:
   python food_concierge_agentserver.py dev
@@ -32,20 +33,23 @@ Token endpoint: /api/livekit-agentserver/token
 """
 
 import asyncio
+import copy
 import json
 import logging
 import os
+import uuid
 from dataclasses import dataclass
 from typing import Annotated, Literal
 
 from dotenv import load_dotenv
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from livekit.agents import (
     Agent,
     AgentServer,
     AgentSession,
     JobContext,
+    JobProcess,
     RunContext,
     ToolError,
     cli,
@@ -56,18 +60,34 @@ from livekit.plugins import openai, silero, lemonslice
 # from livekit.plugins.turn_detector.multilingual import MultilingualModel  # Not available in current env
 
 # Import our database functions
+from data_publisher import DataPublisher
+from metrics import current_room, record_session_metrics, start_metrics_server, timed_tool
+from tracing import add_turn_event, end_turn, record_pipeline_spans, setup_tracing, start_turn, traced_tool
+from watchdog import start_watchdog, stop_watchdog
+from wire_format import CartDeltaEncoder, menu_chunk, menu_complete, negotiate, server_hello
 from database import (
     get_user_profile,
     search_menu_items,
     search_restaurants_by_cuisine,
     get_restaurant_menu,
+    stream_restaurant_menu,
     add_to_voice_cart,
     get_voice_cart,
     remove_from_cart,
     update_cart_item_quantity,
+    apply_cart_operations,  # Batch cart changes (one utterance, one update)
     checkout_cart,  # Note: it's checkout_cart, not checkout_voice_cart
     reset_voice_cart,  # Reset cart between sessions
-    # get_restaurant_menu,  # Not available in database.py
+    flush_voice_carts,  # Write-behind cart persistence
+    flush_voice_carts_soon,
+    prepare_voice_cart,  # Catalog prices + persisted cart, off the greeting path
+    ensure_price_index,  # In-memory catalog prices for cart adds
+    start_order_submission,  # Journaled background order writes
+    sync_orders,
+    flush_orders,
+    close_http_client,  # Shared pooled HTTP client
+    prewarm_worker,  # Process-level warm-up (profile, catalog, connections)
+    DEFER_IMAGE_ENRICHMENT,
 )
 
 # Load environment variables
@@ -86,10 +106,25 @@ logger.setLevel(logging.INFO)
 class UserState:
     """User session state with cart and profile info"""
     user_id: str | None = None
+    session_id: str | None = None  # Room name; keys this session's voice cart
     cart_id: str | None = None
     profile: dict | None = None
     order_count: int = 0
     local_participant: any = None  # Store room participant for data channel publishing
+    publisher: DataPublisher | None = None  # Batched outbound data-channel queue
+    cart_encoder: CartDeltaEncoder | None = None  # Set when the frontend accepts cart deltas
+    menu_chunks: bool = False  # Frontend renders menus streamed one section per message
+    cart_ready: asyncio.Task | None = None  # Catalog load + cart restore started at session start
+
+
+async def wait_for_cart(userdata: UserState) -> None:
+    """
+    Wait for the session's catalog load and cart restore before touching the
+    cart. They start alongside the session so the greeting never waits on
+    them; shielded so an interrupted tool call does not cancel them.
+    """
+    if userdata.cart_ready is not None and not userdata.cart_ready.done():
+        await asyncio.shield(userdata.cart_ready)
 
 
 async def new_userdata() -> UserState:
@@ -97,6 +132,88 @@ async def new_userdata() -> UserState:
     return UserState()
 
 
+def image_update_publisher(userdata: UserState, tool_name: str, field: str):
+    """
+    Build an on_image callback for deferred image enrichment.
+    Each late-arriving image is sent as an image_update event so the frontend
+    can patch the card rendered for `tool_name` (row id -> `field`); images
+    resolving together share one data packet via the session publisher.
+    """
+    
+    async def send_image_update(row_id: str, image_url: str | None) -> None:
+        if not image_url or not userdata.local_participant:
+            return
+        data = {
+            "type": "image_update",
+            "tool_name": tool_name,
+            "id": row_id,
+            "field": field,
+            "image": image_url
+        }
+        userdata.publisher.publish(data)
+    
+    return send_image_update
+
+
+def publish_tool_result(userdata: UserState, tool_name: str, result: dict) -> None:
+    """
+    Send a tool result to the frontend for card rendering, as a cart delta
+    when the frontend negotiated cart_delta via client_hello.
+    """
+    if userdata.cart_encoder and "cart" in result:
+        userdata.publisher.publish(userdata.cart_encoder.encode(tool_name, result))
+    else:
+        userdata.publisher.publish({
+            "type": "tool_call",
+            "tool_name": tool_name,
+            "result": result
+        })
+
+
+async def stream_menu_to_frontend(userdata: UserState, tool_name: str, restaurant_slug: str) -> dict:
+    """
+    Publish a restaurant menu as it is assembled: a header chunk, one chunk per
+    section (with a sequence number) and a menu_complete marker, so the card can
+    render the first section while the rest are in flight. Chunks are flushed
+    as they are published rather than held for the batching window. Returns
+    the full menu for the tool's voice response.
+    """
+    stream_id = uuid.uuid4().hex[:12]
+    menu: dict = {}
+    sections: list = []
+    async for kind, payload in stream_restaurant_menu(restaurant_slug):
+        if kind == "header":
+            menu = payload
+            userdata.publisher.publish(menu_chunk(tool_name, stream_id, 0, header=payload), flush=True)
+        else:
+            sections.append(payload)
+            userdata.publisher.publish(menu_chunk(tool_name, stream_id, len(sections), section=payload), flush=True)
+    userdata.publisher.publish(menu_complete(tool_name, stream_id, len(sections)), flush=True)
+    menu.pop("sectionCount", None)
+    return {**menu, "sections": sections}
+
+
+def handle_client_message(userdata: UserState, message: dict) -> None:
+    """Apply frontend control messages (wire-format negotiation, cart resync)"""
+    if message.get("type") == "client_hello":
+        options = negotiate(message)
+        userdata.publisher.compress = options["compress"]
+        userdata.cart_encoder = CartDeltaEncoder() if options["cart_delta"] else None
+        userdata.menu_chunks = options["menu_chunks"]
+        logger.info(f"🤝 Wire format negotiated: {options}")
+    elif message.get("type") == "cart_resync" and userdata.cart_encoder:
+        # Frontend missed a cart version: send a full snapshot
+        userdata.cart_encoder.reset()
+        publish_tool_result(userdata, "quick_view_cart", get_voice_cart(userdata.session_id))
+
+
+class CartChange(BaseModel):
+    """One change in an update_cart call"""
+    action: Literal["add", "remove", "set"] = Field(description="add more, remove, or set the quantity")
+    item_name: str = Field(description="Name of the food item")
+    quantity: str = Field(description="How many to add/remove, or the new quantity for set; 'all' removes the whole item")
+
+
 # ============================================================================
 # SYSTEM INSTRUCTIONS
 # ============================================================================
@@ -123,6 +240,7 @@ Available Tools:
 - quick_add_to_cart: Add items to cart
 - remove_from_cart: Remove items from cart (e.g., "remove 2 cheesecakes")
 - update_cart_quantity: Change quantity of an item (e.g., set cheesecake to 1)
+- update_cart: Apply several cart changes at once (use whenever the user asks for more than one change)
 - quick_checkout: Complete the order
 
 Examples:
@@ -134,6 +252,7 @@ Examples:
 - User: "Remove 2 cheesecakes" → remove_from_cart(item_name="Tropical Cheesecake", quantity_to_remove="2")
 - User: "Remove all butter chicken" → remove_from_cart(item_name="Butter Chicken")
 - User: "Change cheesecake to 1" → update_cart_quantity(item_name="Tropical Cheesecake", new_quantity="1")
+- User: "Two pad thai, a mango lassi and remove the cheesecake" → update_cart(changes=[{action="add", item_name="Pad Thai", quantity="2"}, {action="add", item_name="Mango Lassi", quantity="1"}, {action="remove", item_name="Tropical Cheesecake", quantity="all"}])
 - User: "What's in my cart?" → quick_view_cart()
 - User: "Checkout" → quick_checkout()
 
@@ -161,6 +280,7 @@ class FoodConciergeAgent(Agent):
                 self.build_add_to_cart_tool(),
                 self.build_remove_from_cart_tool(),
                 self.build_update_cart_quantity_tool(),
+                self.build_update_cart_tool(),
                 self.build_checkout_tool(),
             ],
         )
@@ -173,6 +293,8 @@ class FoodConciergeAgent(Agent):
         """Get user profile - no parameters (always use default)"""
         
         @function_tool
+        @timed_tool("get_user_profile")
+        @traced_tool("get_user_profile")
         async def get_user_profile_tool(
             ctx: RunContext[UserState],
         ) -> str:
@@ -186,7 +308,8 @@ class FoodConciergeAgent(Agent):
             logger.info("🔧 Tool: get_user_profile()")
             
             try:
-                result = await get_user_profile(None)  # Always use demo profile
+                # Preloaded at session start from the prewarmed worker; fetch if missing
+                result = ctx.userdata.profile or await get_user_profile(None)  # Always use demo profile
                 
                 # Store in context for future use
                 ctx.userdata.profile = result
@@ -203,6 +326,8 @@ class FoodConciergeAgent(Agent):
         """Search for food items - query required, max_results hardcoded"""
         
         @function_tool
+        @timed_tool("find_food_item")
+        @traced_tool("find_food_item")
         async def find_food_item_tool(
             ctx: RunContext[UserState],
             query: Annotated[
@@ -223,7 +348,9 @@ class FoodConciergeAgent(Agent):
             logger.info(f"🔧 Tool: find_food_item(query='{query}')")
             
             try:
-                results = await search_menu_items(query, max_results)
+                # Answer first; missing images follow as image_update events
+                on_image = image_update_publisher(ctx.userdata, "find_food_item", "image") if DEFER_IMAGE_ENRICHMENT else None
+                results = await search_menu_items(query, max_results, on_image=on_image)
                 logger.info(f"   ✅ Found {len(results)} items")
                 
                 # Send results to frontend for card rendering
@@ -238,10 +365,7 @@ class FoodConciergeAgent(Agent):
                                 "query": query
                             }
                         }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        ctx.userdata.publisher.publish(tool_data)
                         logger.info(f"   📤 Sent {len(results)} results to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -271,6 +395,8 @@ class FoodConciergeAgent(Agent):
         """Search restaurants by cuisine type or name"""
         
         @function_tool
+        @timed_tool("find_restaurants_by_type")
+        @traced_tool("find_restaurants_by_type")
         async def find_restaurants_by_type_tool(
             ctx: RunContext[UserState],
             cuisine_type: Annotated[
@@ -291,7 +417,9 @@ class FoodConciergeAgent(Agent):
             logger.info(f"🔧 Tool: find_restaurants_by_type(cuisine_type='{cuisine_type}')")
             
             try:
-                results = await search_restaurants_by_cuisine(cuisine_type, max_results)
+                # Answer first; missing hero images follow as image_update events
+                on_image = image_update_publisher(ctx.userdata, "find_restaurants_by_type", "heroImage") if DEFER_IMAGE_ENRICHMENT else None
+                results = await search_restaurants_by_cuisine(cuisine_type, max_results, on_image=on_image)
                 logger.info(f"   ✅ Found {len(results)} restaurants")
                 
                 # Send results to frontend for card rendering
@@ -306,10 +434,7 @@ class FoodConciergeAgent(Agent):
                                 "cuisine": cuisine_type
                             }
                         }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        ctx.userdata.publisher.publish(tool_data)
                         logger.info(f"   📤 Sent {len(results)} restaurants to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -336,6 +461,8 @@ class FoodConciergeAgent(Agent):
         """Get full menu for a specific restaurant"""
         
         @function_tool
+        @timed_tool("get_restaurant_menu")
+        @traced_tool("get_restaurant_menu")
         async def get_restaurant_menu_tool(
             ctx: RunContext[UserState],
             restaurant_slug: Annotated[
@@ -358,22 +485,21 @@ class FoodConciergeAgent(Agent):
             logger.info(f"🔧 Tool: get_restaurant_menu(restaurant_slug='{restaurant_slug}')")
             
             try:
-                result = await get_restaurant_menu(restaurant_slug)
+                # Stream sections to the card as they are assembled when the frontend supports it
+                streamed = bool(ctx.userdata.menu_chunks and ctx.userdata.local_participant)
+                if streamed:
+                    result = await stream_menu_to_frontend(ctx.userdata, "get_restaurant_menu", restaurant_slug)
+                else:
+                    result = await get_restaurant_menu(restaurant_slug)
                 logger.info(f"   ✅ Fetched menu: {len(result.get('sections', []))} sections")
                 
                 # Send results to frontend for card rendering
-                if ctx.userdata.local_participant:
+                if streamed:
+                    logger.info(f"   📤 Streamed menu to frontend")
+                elif ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "get_restaurant_menu",
-                            "result": result
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "get_restaurant_menu", result)
                         logger.info(f"   📤 Sent menu to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -419,6 +545,8 @@ class FoodConciergeAgent(Agent):
         """Fetch a photo of a menu item"""
         
         @function_tool
+        @timed_tool("fetch_menu_item_image")
+        @traced_tool("fetch_menu_item_image")
         async def fetch_menu_item_image_tool(
             ctx: RunContext[UserState],
             item_name: Annotated[
@@ -475,15 +603,7 @@ class FoodConciergeAgent(Agent):
                 if ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "fetch_menu_item_image",
-                            "result": result
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "fetch_menu_item_image", result)
                         logger.info(f"   📤 Sent image to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -503,6 +623,8 @@ class FoodConciergeAgent(Agent):
         """View current cart contents"""
         
         @function_tool
+        @timed_tool("quick_view_cart")
+        @traced_tool("quick_view_cart")
         async def quick_view_cart_tool(
             ctx: RunContext[UserState],
         ) -> str:
@@ -516,7 +638,8 @@ class FoodConciergeAgent(Agent):
             logger.info("🔧 Tool: quick_view_cart()")
             
             try:
-                result = get_voice_cart()  # Sync function, no await
+                await wait_for_cart(ctx.userdata)
+                result = get_voice_cart(ctx.userdata.session_id)  # Sync function, no await
                 cart = result.get('cart', {})
                 
                 if not cart or not cart.get('items'):
@@ -539,15 +662,7 @@ class FoodConciergeAgent(Agent):
                 if ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "quick_view_cart",
-                            "result": {"cart": cart}
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "quick_view_cart", {"cart": cart})
                         logger.info(f"   📤 Sent cart view to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -566,6 +681,8 @@ class FoodConciergeAgent(Agent):
         """Add items to cart - use Literal for quantity, no optional params"""
         
         @function_tool
+        @timed_tool("quick_add_to_cart")
+        @traced_tool("quick_add_to_cart")
         async def quick_add_to_cart_tool(
             ctx: RunContext[UserState],
             item_name: Annotated[
@@ -591,28 +708,25 @@ class FoodConciergeAgent(Agent):
             logger.info(f"🔧 Tool: quick_add_to_cart(item_name='{item_name}', quantity={quantity_int})")
             
             try:
-                result = add_to_voice_cart(item_name, None, quantity_int, None)  # Sync function, no await
-                logger.info(f"   ✅ Added to cart")
+                await wait_for_cart(ctx.userdata)
+                # Retries a catalog load that failed earlier; without it the item gets an estimated price
+                await ensure_price_index()
+                result = add_to_voice_cart(item_name, None, quantity_int, None, session_id=ctx.userdata.session_id)  # Sync function, no await
+                logger.info(f"   ✅ Added to cart" if result.get('success') else f"   ⚠️ {result.get('message')}")
                 
                 # Send result to frontend for card rendering
                 if ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "quick_add_to_cart",
-                            "result": result
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "quick_add_to_cart", result)
                         logger.info(f"   📤 Sent cart update to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
                 else:
                     logger.warning(f"   ⚠️ No local_participant available, skipping data publish")
                 
+                if not result.get('success'):
+                    return result.get('message', f"Couldn't add {item_name} to the cart.")
                 return f"Added {quantity_int}x {item_name} to cart. {result.get('message', '')}"
             except Exception as e:
                 logger.error(f"   ❌ Error: {e}")
@@ -624,6 +738,8 @@ class FoodConciergeAgent(Agent):
         """Complete the order"""
         
         @function_tool
+        @timed_tool("quick_checkout")
+        @traced_tool("quick_checkout")
         async def quick_checkout_tool(
             ctx: RunContext[UserState],
         ) -> str:
@@ -639,21 +755,19 @@ class FoodConciergeAgent(Agent):
             logger.info("🔧 Tool: quick_checkout()")
             
             try:
-                result = checkout_cart()  # Sync function, not async
+                await wait_for_cart(ctx.userdata)
+                result = checkout_cart(ctx.userdata.session_id)  # Sync function, not async
+                if result.get('success'):
+                    # The order must be on disk before it is confirmed (no-op unless ORDER_JOURNAL_FSYNC)
+                    await sync_orders()
+                # Persist the ordered cart without holding up the confirmation
+                flush_voice_carts_soon(ctx.userdata.session_id)
                 
                 # Send result to frontend for card rendering
                 if ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "quick_checkout",
-                            "result": result
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "quick_checkout", result)
                         logger.info(f"   📤 Sent checkout result to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -664,9 +778,7 @@ class FoodConciergeAgent(Agent):
                     order_id = result.get('orderId', 'unknown')
                     total = result.get('total', 0)
                     
-                    # DEBUG: Log the total being announced
-                    logger.info(f"   🔍 DEBUG: result['total'] = {total} (type: {type(total)})")
-                    logger.info(f"   🔍 DEBUG: Full result = {result}")
+                    logger.debug("   Checkout result: %s", result)  # Formatted only when debug logging is on
                     
                     # Track in userdata
                     ctx.userdata.order_count += 1
@@ -685,6 +797,8 @@ class FoodConciergeAgent(Agent):
         """Remove items from cart by name"""
         
         @function_tool
+        @timed_tool("remove_from_cart")
+        @traced_tool("remove_from_cart")
         async def remove_from_cart_tool(
             ctx: RunContext[UserState],
             item_name: Annotated[str, Field(description="Name of the item to remove from cart")],
@@ -713,21 +827,14 @@ class FoodConciergeAgent(Agent):
                     except ValueError:
                         qty = None
                 
-                result = remove_from_cart(item_name, quantity_to_remove=qty)
+                await wait_for_cart(ctx.userdata)
+                result = remove_from_cart(item_name, quantity_to_remove=qty, session_id=ctx.userdata.session_id)
                 
                 # Send result to frontend for cart update
                 if ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "remove_from_cart",
-                            "result": result
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "remove_from_cart", result)
                         logger.info(f"   📤 Sent cart update to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -748,6 +855,8 @@ class FoodConciergeAgent(Agent):
         """Update quantity of an item in cart"""
         
         @function_tool
+        @timed_tool("update_cart_quantity")
+        @traced_tool("update_cart_quantity")
         async def update_cart_quantity_tool(
             ctx: RunContext[UserState],
             item_name: Annotated[str, Field(description="Name of the item to update")],
@@ -773,21 +882,14 @@ class FoodConciergeAgent(Agent):
                 except ValueError:
                     return f"Invalid quantity: {new_quantity}. Please use a number."
                 
-                result = update_cart_item_quantity(item_name, new_quantity=qty)
+                await wait_for_cart(ctx.userdata)
+                result = update_cart_item_quantity(item_name, new_quantity=qty, session_id=ctx.userdata.session_id)
                 
                 # Send result to frontend for cart update
                 if ctx.userdata.local_participant:
                     try:
                         import json
-                        tool_data = {
-                            "type": "tool_call",
-                            "tool_name": "update_cart_quantity",
-                            "result": result
-                        }
-                        await ctx.userdata.local_participant.publish_data(
-                            json.dumps(tool_data).encode(),
-                            reliable=True
-                        )
+                        publish_tool_result(ctx.userdata, "update_cart_quantity", result)
                         logger.info(f"   📤 Sent cart update to frontend")
                     except Exception as e:
                         logger.error(f"   ⚠️ Failed to send to frontend: {e}")
@@ -803,6 +905,63 @@ class FoodConciergeAgent(Agent):
                 raise ToolError(f"Failed to update quantity: {str(e)}")
         
         return update_cart_quantity_tool
+    
+    def build_update_cart_tool(self):
+        """Apply several cart changes from one request in a single call"""
+        
+        @function_tool
+        @timed_tool("update_cart")
+        @traced_tool("update_cart")
+        async def update_cart_tool(
+            ctx: RunContext[UserState],
+            changes: Annotated[list[CartChange], Field(description="Cart changes to apply, in the order the user said them")],
+        ) -> str:
+            """
+            Apply several cart changes at once: adds, removals and quantity changes.
+            Use this instead of separate add/remove/update calls whenever the user
+            asks for more than one change, e.g.:
+            - "Two pad thai, a mango lassi and remove the cheesecake"
+            - "Add a burger and fries"
+            
+            All changes are applied together; if one item cannot be found nothing changes.
+            """
+            logger.info(f"🔧 Tool: update_cart(changes={[change.model_dump() for change in changes]})")
+            
+            operations = []
+            for change in changes:
+                if change.quantity.lower() == "all":
+                    qty = None
+                else:
+                    try:
+                        qty = int(change.quantity)
+                    except ValueError:
+                        return f"Invalid quantity for {change.item_name}: {change.quantity}. Please use a number."
+                operations.append({"action": change.action, "itemName": change.item_name, "quantity": qty})
+            
+            try:
+                await wait_for_cart(ctx.userdata)
+                await ensure_price_index()
+                result = apply_cart_operations(operations, session_id=ctx.userdata.session_id)
+                
+                # One frontend update for the whole batch
+                if ctx.userdata.local_participant:
+                    try:
+                        publish_tool_result(ctx.userdata, "update_cart", result)
+                        logger.info(f"   📤 Sent cart update to frontend")
+                    except Exception as e:
+                        logger.error(f"   ⚠️ Failed to send to frontend: {e}")
+                else:
+                    logger.warning(f"   ⚠️ No local_participant, skipping data publish")
+                
+                if result.get('success'):
+                    return f"{result['message']} Cart total: ${result['total']:.2f}."
+                else:
+                    return result.get('message', "Could not update the cart.")
+            except Exception as e:
+                logger.error(f"   ❌ Error: {e}")
+                raise ToolError(f"Failed to update cart: {str(e)}")
+        
+        return update_cart_tool
 
 
 # ============================================================================
@@ -812,9 +971,55 @@ class FoodConciergeAgent(Agent):
 server = AgentServer()
 
 
+def prewarm(proc: JobProcess) -> None:
+    """
+    Runs once per worker process before it accepts jobs.
+    Loads the VAD model and warms the database layer (Supabase connection,
+    profile, hot catalog lookups) so sessions start without cold loads.
+    """
+    logger.info("🔥 Prewarming worker process...")
+    start_metrics_server()
+    setup_tracing()
+    proc.userdata["vad"] = silero.VAD.load()
+    try:
+        proc.userdata.update(prewarm_worker())
+    except Exception as e:
+        # Sessions fall back to loading on demand
+        logger.warning(f"⚠️ Database prewarm failed: {e}")
+
+
+server.setup_fnc = prewarm
+
+# Rooms currently running in this worker process; shared resources such as the
+# pooled HTTP client are released once the last one ends.
+active_sessions: set[str] = set()
+
+# Per-room data-channel publishers, flushed and closed at session end
+session_publishers: dict[str, DataPublisher] = {}
+
+
 async def on_session_end(ctx: JobContext) -> None:
     """Cleanup callback when session ends"""
     logger.info("🏁 Session ended, generating report...")
+    
+    # Deliver queued frontend events, then stop this room's publisher
+    publisher = session_publishers.pop(ctx.room.name, None)
+    if publisher:
+        await publisher.aclose()
+    
+    end_turn(ctx.room.name)
+    
+    # Persist this room's cart, then free it; other rooms on the worker keep theirs
+    await flush_voice_carts(ctx.room.name)
+    reset_voice_cart(ctx.room.name)
+    
+    active_sessions.discard(ctx.room.name)
+    if not active_sessions:
+        # Orders still unsubmitted stay journaled and are retried (or adopted after a restart)
+        await flush_orders()
+        await close_http_client()
+        stop_watchdog()
+    
     try:
         report = ctx.make_session_report()
         if report:
@@ -839,13 +1044,29 @@ async def food_concierge_agent(ctx: JobContext) -> None:
     3. Start agent with typed userdata
     """
     logger.info(f"🚀 Agent starting for room: {ctx.room.name}")
+    active_sessions.add(ctx.room.name)
+    # Tag metrics from this session (and tasks it spawns) with the room name
+    current_room.set(ctx.room.name)
+    # Report event-loop stalls (blocking calls) with the tool and room involved
+    start_watchdog()
     
-    # Reset voice cart to prevent carryover from previous sessions
-    reset_voice_cart()
+    # Reset this room's voice cart to prevent carryover from previous sessions,
+    # then pick up its persisted cart if the room is resuming on a new worker
+    reset_voice_cart(ctx.room.name)
     logger.info("🔄 Voice cart reset for new session")
+    # Open this worker's order journal and resubmit orders a crashed worker left behind
+    start_order_submission()
     
     # Create user state
     userdata = await new_userdata()
+    userdata.session_id = ctx.room.name
+    # Catalog load (cold worker) and cart restore run while the session starts
+    # and greets; cart tools wait for them (wait_for_cart)
+    userdata.cart_ready = asyncio.create_task(prepare_voice_cart(ctx.room.name))
+    userdata.publisher = DataPublisher(ctx.room)
+    session_publishers[ctx.room.name] = userdata.publisher
+    if ctx.proc.userdata.get("profile"):
+        userdata.profile = copy.deepcopy(ctx.proc.userdata["profile"])
     
     # Create agent session with NATIVE pipeline components
     # Following drive-thru pattern: use inference.STT/LLM/TTS
@@ -867,8 +1088,8 @@ async def food_concierge_agent(ctx: JobContext) -> None:
         # Turn detection: Disabled (module not available)
         # turn_detection=MultilingualModel(),
         
-        # VAD: Voice Activity Detection
-        vad=silero.VAD.load(),
+        # VAD: Voice Activity Detection (loaded once per process in prewarm)
+        vad=ctx.proc.userdata.get("vad") or silero.VAD.load(),
         
         # Max tool steps: Prevent infinite loops
         max_tool_steps=10,
@@ -882,24 +1103,17 @@ async def food_concierge_agent(ctx: JobContext) -> None:
     def on_user_speech(transcript: str):
         """Log what user said (STT output) and send to frontend"""
         logger.info(f"🎤 USER SAID: '{transcript}'")
+        start_turn(ctx.room.name, transcript)
         
         # Send to frontend for display in conversation history
         try:
-            import json
-            import asyncio
             data = {
                 "type": "user_transcript",
                 "text": transcript,
                 "is_final": True
             }
             
-            async def send_data():
-                await ctx.room.local_participant.publish_data(
-                    json.dumps(data).encode(),
-                    reliable=True
-                )
-            
-            asyncio.create_task(send_data())
+            userdata.publisher.publish(data)
             logger.info(f"   📤 Sent user transcript to frontend")
         except Exception as e:
             logger.error(f"   ⚠️ Failed to send transcript: {e}")
@@ -908,33 +1122,33 @@ async def food_concierge_agent(ctx: JobContext) -> None:
     def on_agent_speech(transcript: str):
         """Log what agent is saying (TTS input) and send to frontend"""
         logger.info(f"🤖 AGENT SAYING: '{transcript}'")
+        end_turn(ctx.room.name, transcript)
         
         # Send to frontend for display in conversation history
         try:
-            import json
-            import asyncio
             data = {
                 "type": "agent_response",
                 "text": transcript,
                 "is_final": True
             }
             
-            async def send_data():
-                await ctx.room.local_participant.publish_data(
-                    json.dumps(data).encode(),
-                    reliable=True
-                )
-            
-            asyncio.create_task(send_data())
+            userdata.publisher.publish(data)
             logger.info(f"   📤 Sent agent response to frontend")
         except Exception as e:
             logger.error(f"   ⚠️ Failed to send response: {e}")
     
+    @session.on("metrics_collected")
+    def on_metrics_collected(event):
+        """Feed STT / LLM / TTS / end-of-utterance timings into the phase histograms and turn trace"""
+        record_session_metrics(event.metrics)
+        record_pipeline_spans(event.metrics)
+    
     @session.on("function_calls_collected")
     def on_function_calls(calls: list):
         """Log tool calls requested by LLM"""
         for call in calls:
             logger.info(f"🔧 TOOL CALLED: {call.function_call.name}({call.function_call.arguments})")
+        add_turn_event("function_calls_collected", tools=[call.function_call.name for call in calls])
     
     @session.on("function_calls_finished")
     def on_function_results(results: list):
@@ -953,6 +1167,18 @@ async def food_concierge_agent(ctx: JobContext) -> None:
     userdata.local_participant = ctx.room.local_participant
     logger.info("✅ Agent connected, local participant stored")
     
+    # Offer compact payload encodings; the frontend replies with client_hello
+    @ctx.room.on("data_received")
+    def on_data_received(packet) -> None:
+        try:
+            message = json.loads(packet.data.decode())
+        except (UnicodeDecodeError, ValueError):
+            return
+        if isinstance(message, dict):
+            handle_client_message(userdata, message)
+    
+    userdata.publisher.publish(server_hello())
+    
     # ========================================================================
     # LEMONSLICE AVATAR (Optional) - Start AFTER session is running
     # ========================================================================
@@ -1000,10 +1226,7 @@ async def food_concierge_agent(ctx: JobContext) -> None:
                     "status": "success",
                     "message": "Avatar connected successfully"
                 }
-                await userdata.local_participant.publish_data(
-                    json.dumps(status_data).encode(),
-                    reliable=True
-                )
+                userdata.publisher.publish(status_data)
             except Exception as send_err:
                 logger.warning(f"Failed to send avatar success status: {send_err}")
                 
@@ -1050,10 +1273,7 @@ async def food_concierge_agent(ctx: JobContext) -> None:
                     "message": error_message,
                     "status_code": status_code
                 }
-                await userdata.local_participant.publish_data(
-                    json.dumps(status_data).encode(),
-                    reliable=True
-                )
+                userdata.publisher.publish(status_data)
                 logger.info(f"📤 Sent avatar error status to frontend: {error_type}")
             except Exception as send_err:
                 logger.warning(f"Failed to send avatar error status: {send_err}")
@@ -1066,10 +1286,7 @@ async def food_concierge_agent(ctx: JobContext) -> None:
                 "status": "disabled",
                 "message": "Avatar not configured"
             }
-            await userdata.local_participant.publish_data(
-                json.dumps(status_data).encode(),
-                reliable=True
-            )
+            userdata.publisher.publish(status_data)
         except Exception as send_err:
             logger.warning(f"Failed to send avatar disabled status: {send_err}")
     
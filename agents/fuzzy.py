@@ -0,0 +1,147 @@
+"""
+Fuzzy / phonetic matching for STT-mangled food names
+Deepgram transcripts produce near-misses like "pad tie", "jerk chikin" or
+"tiramisoo". Every indexed name gets a precomputed phonetic key per word and a
+character-trigram signature, so a misheard word can be mapped back to the
+catalog vocabulary (or a cart line) without another LLM/tool round trip.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Ordered rewrites applied before vowels are dropped (simplified Metaphone)
+_PHONETIC_RULES = [
+    (re.compile(r"^(?:kn|gn|pn|wr)"), lambda m: m.group(0)[1]),
+    (re.compile(r"x"), lambda m: "ks"),
+    (re.compile(r"gh(?![aeiou])"), lambda m: ""),
+    (re.compile(r"ph"), lambda m: "f"),
+    (re.compile(r"ck"), lambda m: "k"),
+    (re.compile(r"sch"), lambda m: "sk"),
+    (re.compile(r"tch|ch|sh"), lambda m: "x"),
+    (re.compile(r"th"), lambda m: "t"),
+    (re.compile(r"c(?=[eiy])"), lambda m: "s"),
+    (re.compile(r"[cq]"), lambda m: "k"),
+    (re.compile(r"dg|g(?=[eiy])"), lambda m: "j"),
+    (re.compile(r"z"), lambda m: "s"),
+    (re.compile(r"d"), lambda m: "t"),
+    (re.compile(r"v"), lambda m: "f"),
+    (re.compile(r"b"), lambda m: "p"),
+]
+
+
+def phonetic_key(word: str) -> str:
+    """
+    Phonetic code for one word: consonant skeleton after sound-alike rewrites.
+    "thai" and "tie" -> "T", "chicken" and "chikin" -> "XKN".
+    """
+    word = word.lower()
+    for pattern, replace in _PHONETIC_RULES:
+        word = pattern.sub(replace, word)
+    if not word:
+        return ""
+    first, rest = word[0], word[1:]
+    skeleton = ("A" if first in "aeiouy" else first) + re.sub(r"[aeiouyhw]", "", rest)
+    # Collapse doubled consonants ("tt" -> "t")
+    collapsed: List[str] = []
+    for char in skeleton:
+        if not collapsed or collapsed[-1] != char:
+            collapsed.append(char)
+    return "".join(collapsed).upper()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a padded, normalized string"""
+    padded = f"  {' '.join(_WORD_RE.findall(text.lower()))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(query: str, candidate: str) -> float:
+    """
+    Score in [0, 1] combining trigram overlap (Dice) with per-word phonetic agreement.
+    """
+    query_grams, candidate_grams = trigrams(query), trigrams(candidate)
+    if not query_grams or not candidate_grams:
+        return 0.0
+    dice = 2 * len(query_grams & candidate_grams) / (len(query_grams) + len(candidate_grams))
+    query_keys = [phonetic_key(word) for word in _WORD_RE.findall(query.lower())]
+    candidate_keys = {phonetic_key(word) for word in _WORD_RE.findall(candidate.lower())}
+    phonetic = sum(1 for key in query_keys if key in candidate_keys) / len(query_keys) if query_keys else 0.0
+    return 0.5 * dice + 0.5 * phonetic
+
+
+def best_match(query: str, candidates: Iterable[str], min_score: float = 0.6) -> Optional[str]:
+    """Closest candidate to query, or None if nothing scores at least min_score (for small sets like a cart)"""
+    best, best_score = None, min_score
+    for candidate in candidates:
+        score = similarity(query, candidate)
+        if score >= best_score:
+            best, best_score = candidate, score
+    return best
+
+
+class FuzzyIndex:
+    """
+    Precomputed phonetic keys and trigram signatures for a set of strings.
+    Candidates are gathered from the phonetic-key and trigram posting lists,
+    so a lookup only scores strings that share a sound or a trigram with the query.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Set[str], str]] = {}
+        self._by_key: Dict[str, Set[str]] = defaultdict(set)
+        self._by_gram: Dict[str, Set[str]] = defaultdict(set)
+
+    def add(self, text: str) -> None:
+        if text in self._entries:
+            return
+        grams = trigrams(text)
+        key = " ".join(phonetic_key(word) for word in _WORD_RE.findall(text.lower()))
+        self._entries[text] = (grams, key)
+        self._by_key[key].add(text)
+        for gram in grams:
+            self._by_gram[gram].add(text)
+
+    def discard(self, text: str) -> None:
+        entry = self._entries.pop(text, None)
+        if entry is None:
+            return
+        grams, key = entry
+        self._by_key[key].discard(text)
+        if not self._by_key[key]:
+            del self._by_key[key]
+        for gram in grams:
+            self._by_gram[gram].discard(text)
+            if not self._by_gram[gram]:
+                del self._by_gram[gram]
+
+    def lookup(self, query: str, limit: int = 1, min_score: float = 0.6) -> List[Tuple[str, float]]:
+        """Best (text, score) pairs for query, highest first"""
+        query_grams = trigrams(query)
+        query_key = " ".join(phonetic_key(word) for word in _WORD_RE.findall(query.lower()))
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for text in self._by_gram.get(gram, ()):
+                shared[text] += 1
+        # Strings that sound the same are candidates even with no trigram in common
+        for text in self._by_key.get(query_key, ()):
+            shared.setdefault(text, 0)
+
+        scored = []
+        for text, overlap in shared.items():
+            grams, key = self._entries[text]
+            dice = 2 * overlap / (len(query_grams) + len(grams)) if query_grams else 0.0
+            phonetic = 1.0 if key == query_key else 0.0
+            score = 0.5 * dice + 0.5 * phonetic if phonetic else dice
+            if score >= min_score:
+                scored.append((text, score))
+        scored.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scored[:limit]
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
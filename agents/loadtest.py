@@ -0,0 +1,1248 @@
+"""
+Offline load test for the Food Concierge agent
+Runs N simulated rooms concurrently in one process against local stand-ins,
+so density can be measured before and after a change without LiveKit Cloud,
+Supabase, OpenAI or Pexels:
+
+- STT: each room replays a scripted list of user transcripts
+- LLM: ScriptedLLM maps every transcript onto a fixed tool call, then answers
+  with a short sentence once the tool output is in the chat context
+- TTS: sessions run without audio output (text-only), so no TTS is invoked
+- Supabase: a stdlib HTTP server answering the PostgREST subset database.py
+  uses (select with embedding, eq/ilike/or/in filters, order, ranges, PATCH,
+  upsert and DELETE, plus the fc_submit_order RPC)
+  from a generated catalog
+- Pexels: the same server answers /v1/search with a fixed photo URL
+
+Each room goes through the same setup and cleanup as food_concierge_agent
+(userdata, DataPublisher, negotiated wire format, voice cart, on_session_end),
+and the real FoodConciergeAgent tools, database layer and publisher run
+unmodified. Reported: per-tool and per-query latency percentiles, event-loop
+lag, and memory per session.
+
+Usage (from agents/, requires livekit-agents with AgentSession.run):
+    python loadtest.py --rooms 50 --db-latency-ms 15 --json before.json
+
+Order crash/resume check (no livekit-agents needed): a child worker checks
+out N carts while the database is down and is killed before any order is
+written; a new worker must adopt its journal and write every order exactly
+once, even when some RPC replies are lost after the commit:
+    python loadtest.py --order-recovery 20
+
+Cart microbenchmark (no livekit-agents or Supabase needed): add, update,
+remove and serialize on a catering-size cart, VoiceCart against the old
+list-of-dicts cart:
+    python loadtest.py --cart-bench 500
+
+Pexels client benchmark (no livekit-agents needed): per-lookup latency and
+connections opened with the shared pooled client vs a client per call:
+    python loadtest.py --pexels-bench 200 --pexels-latency-ms 5
+
+Slow backend check (no livekit-agents needed): concurrent queries against a
+slow stand-in must not show up as event-loop lag:
+    python loadtest.py --db-stall-check --db-latency-ms 200
+
+Fuzzy matching benchmark (no livekit-agents or Supabase needed): per-lookup
+cost of misheard-name search, price lookup and cart-line matching:
+    python loadtest.py --fuzzy-bench 50000
+
+Environment overrides (e.g. CATALOG_SEARCH_ENGINE=memory) apply as usual, so
+the same run can be repeated with a feature on and off.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# (cuisine, cuisine_group, dishes)
+CUISINES = [
+    ("thai", "asian", ["Pad Thai", "Green Curry", "Tom Yum Soup", "Mango Sticky Rice", "Drunken Noodles"]),
+    ("caribbean", "caribbean", ["Jerk Chicken", "Curry Goat", "Oxtail Stew", "Plantain Chips", "Rum Cake"]),
+    ("italian", "european", ["Margherita Pizza", "Lasagna", "Chicken Parmesan", "Tiramisu", "Penne Vodka"]),
+    ("indian", "asian", ["Butter Chicken", "Chana Masala", "Garlic Naan", "Lamb Biryani", "Mango Lassi"]),
+    ("mexican", "latin", ["Carne Asada Tacos", "Chicken Burrito", "Elote", "Churros", "Pozole"]),
+    ("american", "american", ["Smash Burger", "Buffalo Wings", "Mac and Cheese", "Cheesecake", "Cobb Salad"]),
+    ("japanese", "asian", ["Salmon Nigiri", "Tonkotsu Ramen", "Chicken Katsu", "Miso Soup", "Matcha Mochi"]),
+    ("mediterranean", "european", ["Chicken Shawarma", "Falafel Wrap", "Hummus Plate", "Baklava", "Greek Salad"]),
+]
+SECTION_NAMES = ["Starters", "Mains", "Sides", "Desserts", "Drinks", "Specials"]
+UPDATED_AT = "2024-01-01T00:00:00+00:00"
+
+
+def _uuid(kind: int, index: int) -> str:
+    return str(uuid.UUID(int=(kind << 64) | index))
+
+
+def build_catalog(restaurants: int, sections: int, items: int, seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Deterministic fc_* rows: restaurants x sections x items per section"""
+    rng = random.Random(seed)
+    tables: Dict[str, List[Dict[str, Any]]] = {
+        "fc_restaurants": [], "fc_menu_sections": [], "fc_menu_items": [], "fc_preferences": [],
+    }
+    for r in range(restaurants):
+        cuisine, group, dishes = CUISINES[r % len(CUISINES)]
+        name = f"{cuisine.title()} House {r // len(CUISINES) + 1}"
+        restaurant_id = _uuid(1, r)
+        tables["fc_restaurants"].append({
+            "id": restaurant_id, "slug": name.lower().replace(" ", "-"), "name": name,
+            "cuisine": cuisine, "cuisine_group": group, "dietary_tags": [], "price_tier": "$$",
+            "rating": round(rng.uniform(3.5, 5.0), 1), "eta_minutes": rng.randint(15, 50),
+            "delivery_fee": round(rng.uniform(0.99, 4.99), 2), "standout_dish": dishes[0], "promo": None,
+            "hero_image": None, "is_active": True, "updated_at": UPDATED_AT,
+        })
+        for s in range(sections):
+            section_id = _uuid(2, r * sections + s)
+            tables["fc_menu_sections"].append({
+                "id": section_id, "restaurant_id": restaurant_id, "name": SECTION_NAMES[s % len(SECTION_NAMES)],
+                "description": None, "display_order": s, "is_active": True, "updated_at": UPDATED_AT,
+            })
+            for i in range(items):
+                index = (r * sections + s) * items + i
+                dish = dishes[(s * items + i) % len(dishes)]
+                name_variant = dish if i < len(dishes) else f"{dish} Special {i}"
+                tables["fc_menu_items"].append({
+                    "id": _uuid(3, index), "slug": f"{name_variant.lower().replace(' ', '-')}-{index}",
+                    "name": name_variant, "description": f"House {dish.lower()} ({cuisine})",
+                    "base_price": round(rng.uniform(5, 30), 2), "calories": rng.randint(200, 1200),
+                    "dietary_tags": [], "image": None, "rating": None, "section_id": section_id,
+                    "restaurant_id": restaurant_id, "is_available": True, "display_order": i,
+                    "updated_at": UPDATED_AT,
+                })
+    tables["fc_preferences"].append({
+        "id": os.environ.get("DEMO_PROFILE_ID", "00000000-0000-0000-0000-0000000000fc"),
+        "favorite_cuisines": ["thai", "caribbean"], "dietary_tags": [], "disliked_cuisines": [],
+        "spice_level": "medium", "budget_range": "standard",
+    })
+    return tables
+
+
+# ============================================================================
+# SUPABASE / PEXELS STAND-IN
+# ============================================================================
+
+# Many-to-one embeds (fk column -> table) and one-to-many embeds (child table -> fk column)
+FOREIGN_KEYS = {"section_id": "fc_menu_sections", "restaurant_id": "fc_restaurants"}
+CHILD_KEYS = {"fc_restaurants": "restaurant_id", "fc_menu_sections": "section_id", "fc_carts": "cart_id"}
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses"""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        depth += (char == "(") - (char == ")")
+        current.append(char)
+    if current:
+        parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def _parse_select(select: str) -> List[Tuple[str, str, Optional[list]]]:
+    """PostgREST select -> [(alias, column or embedded table/fk, nested fields or None)]"""
+    fields = []
+    for part in _split_top_level(select):
+        nested = None
+        if "(" in part:
+            part, inner = part.split("(", 1)
+            nested = _parse_select(inner[:-1])
+        alias, _, target = part.partition(":")
+        fields.append((alias.strip(), (target or alias).strip(), nested))
+    return fields
+
+
+def _like(pattern: str) -> "re.Pattern[str]":
+    regex = ".*".join(re.escape(piece) for piece in re.split(r"[%*]", pattern))
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+def _compare(cell: Any, op: str, value: str) -> bool:
+    if op == "is":
+        return (cell is None) if value == "null" else str(cell).lower() == value
+    if op == "in":
+        return str(cell) in {v.strip('"') for v in value.strip("()").split(",")}
+    if op in ("ilike", "like"):
+        return cell is not None and _like(value).fullmatch(str(cell)) is not None
+    if cell is None:
+        return False
+    if isinstance(cell, bool):
+        cell_value: Any = str(cell).lower()
+    elif isinstance(cell, (int, float)):
+        cell_value, value = cell, float(value)
+    else:
+        cell_value = str(cell)
+        if value in ("epoch", "-infinity"):
+            value = ""
+    return {
+        "eq": cell_value == value, "neq": cell_value != value,
+        "gt": cell_value > value, "gte": cell_value >= value,
+        "lt": cell_value < value, "lte": cell_value <= value,
+    }.get(op, False)
+
+
+def _sort_key(value: Any) -> Tuple[bool, Any]:
+    """Nulls last; numbers numerically, everything else as text"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (value is None, (0, value))
+    return (value is None, (1, "" if value is None else str(value)))
+
+
+def _matches(row: Dict[str, Any], column: str, expression: str) -> bool:
+    if column in ("or", "and"):
+        results = []
+        for condition in _split_top_level(expression.strip("()")):
+            sub_column, _, sub_expression = condition.partition(".")
+            results.append(_matches(row, sub_column, sub_expression))
+        return any(results) if column == "or" else all(results)
+    op, _, value = expression.partition(".")
+    if op == "not":
+        op, _, value = value.partition(".")
+        return not _compare(row.get(column), op, value)
+    return _compare(row.get(column), op, value)
+
+
+class PostgrestStandIn:
+    """In-memory tables plus the query evaluation behind the HTTP handler"""
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]]) -> None:
+        self.tables = tables
+        self.lock = threading.Lock()
+        self._by_id = {name: {row["id"]: row for row in rows} for name, rows in tables.items()}
+        self._children: Dict[Tuple[str, str], Dict[Any, List[Dict[str, Any]]]] = {}
+        self.requests = 0
+        # TCP connections accepted (Pexels and PostgREST), to see connection reuse
+        self.connections = 0
+        # fc_submit_order fault injection: reply 503 without writing (outage),
+        # or write and then reply 503 (reply lost after the commit)
+        self.rpc_outage = False
+        self.lost_replies = 0
+
+    def children(self, table: str, key: str) -> Dict[Any, List[Dict[str, Any]]]:
+        index = self._children.get((table, key))
+        if index is None:
+            index = defaultdict(list)
+            for row in self.tables.get(table, []):
+                index[row.get(key)].append(row)
+            self._children[(table, key)] = index
+        return index
+
+    def project(self, table: str, row: Dict[str, Any], fields: List[Tuple[str, str, Optional[list]]]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for alias, target, nested in fields:
+            if target == "*":
+                out.update(row)
+            elif nested is None:
+                out[alias] = row.get(target)
+            elif target in FOREIGN_KEYS:
+                parent_table = FOREIGN_KEYS[target]
+                parent = self._by_id[parent_table].get(row.get(target))
+                out[alias] = self.project(parent_table, parent, nested) if parent else None
+            else:
+                children = self.children(target, CHILD_KEYS[table]).get(row["id"], [])
+                out[alias] = [self.project(target, child, nested) for child in children]
+        return out
+
+    def query(self, table: str, params: List[Tuple[str, str]], headers: Any) -> List[Dict[str, Any]]:
+        rows = self.tables.get(table, [])
+        select, order, offset, limit = "*", None, 0, None
+        for key, value in params:
+            if key == "select":
+                select = value
+            elif key == "order":
+                order = value
+            elif key == "offset":
+                offset = int(value)
+            elif key == "limit":
+                limit = int(value)
+            else:
+                rows = [row for row in rows if _matches(row, key, value)]
+        if order:
+            for term in reversed(order.split(",")):
+                column, _, direction = term.partition(".")
+                rows = sorted(rows, key=lambda row: _sort_key(row.get(column)), reverse=direction.startswith("desc"))
+        range_header = headers.get("Range")
+        if range_header and "-" in range_header:
+            start, end = range_header.split("-", 1)
+            offset, limit = int(start), int(end) - int(start) + 1
+        rows = rows[offset:offset + limit if limit is not None else None]
+        fields = _parse_select(select)
+        return [self.project(table, row, fields) for row in rows]
+
+    def update(self, table: str, params: List[Tuple[str, str]], changes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = self.tables.get(table, [])
+        for key, value in params:
+            if key != "select":
+                rows = [row for row in rows if _matches(row, key, value)]
+        with self.lock:
+            for row in rows:
+                row.update(changes)
+        return [dict(row) for row in rows]
+
+    def insert(self, table: str, records: Any, on_conflict: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Insert rows; with on_conflict, rows matching on that column are merged (upsert)"""
+        records = records if isinstance(records, list) else [records]
+        stored = []
+        with self.lock:
+            rows = self.tables.setdefault(table, [])
+            existing = {row.get(on_conflict): row for row in rows if row.get(on_conflict) is not None} if on_conflict else {}
+            for record in records:
+                row = existing.get(record.get(on_conflict)) if on_conflict else None
+                if row is not None:
+                    row.update(record)
+                else:
+                    row = dict(record)
+                    row.setdefault("id", str(uuid.uuid4()))
+                    rows.append(row)
+                    self._by_id.setdefault(table, {})[row["id"]] = row
+                stored.append(dict(row))
+            self._children.clear()
+        return stored
+
+    def submit_order(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """fc_submit_order (migration 005): order, lines and events at once, idempotent on order id"""
+        result = {"order_id": order["id"], "order_number": order["order_number"], "duplicate": True}
+        with self.lock:
+            orders = self._by_id.setdefault("fc_orders", {})
+            if order["id"] in orders:
+                return result
+            row = {key: value for key, value in order.items() if key not in ("items", "events", "placed_at")}
+            row.update({"total_amount": order["total"], "created_at": order.get("placed_at")})
+            self.tables.setdefault("fc_orders", []).append(row)
+            orders[order["id"]] = row
+            for item in order.get("items") or []:
+                self.tables.setdefault("fc_order_items", []).append({"id": str(uuid.uuid4()), "order_id": order["id"], **item})
+            for event in order.get("events") or []:
+                self.tables.setdefault("fc_order_events", []).append({"id": str(uuid.uuid4()), "order_id": order["id"], **event})
+            self._children.clear()
+        return {**result, "duplicate": False}
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.tables.get(table, [])
+            doomed = rows
+            for key, value in params:
+                if key != "select":
+                    doomed = [row for row in doomed if _matches(row, key, value)]
+            doomed_ids = {id(row) for row in doomed}
+            self.tables[table] = [row for row in rows if id(row) not in doomed_ids]
+            for row in doomed:
+                self._by_id.get(table, {}).pop(row.get("id"), None)
+            self._children.clear()
+        return doomed
+
+
+def start_stand_in(db: PostgrestStandIn, db_latency: float, pexels_latency: float) -> ThreadingHTTPServer:
+    """Serve /rest/v1 (PostgREST) and /v1/search (Pexels) on an ephemeral local port"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; with Nagle on, keep-alive
+        # clients would wait out a delayed ACK (~40 ms) on every request
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def setup(self) -> None:
+            super().setup()
+            with db.lock:
+                db.connections += 1
+
+        def _reply(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def _route(self, method: str) -> None:
+            url = urlsplit(self.path)
+            params = parse_qsl(url.query, keep_blank_values=True)
+            if url.path.startswith("/v1/search"):
+                time.sleep(pexels_latency)
+                query = dict(params).get("query", "food")
+                photo = f"http://stand-in.local/photos/{zlib.crc32(query.encode()) % 10000}.jpg"
+                return self._reply(200, {"photos": [{"src": {"large": photo, "medium": photo}}]})
+            if not url.path.startswith("/rest/v1/"):
+                return self._reply(404, {"message": "not found"})
+
+            time.sleep(db_latency)
+            with db.lock:
+                db.requests += 1
+            target = url.path[len("/rest/v1/"):]
+            if target == "rpc/fc_submit_order" and method == "POST":
+                # Read the body even when failing, or it is parsed as the next request on this connection
+                order = self._body()["p_order"]
+                if db.rpc_outage:
+                    return self._reply(503, {"message": "stand-in outage"})
+                result = db.submit_order(order)
+                with db.lock:
+                    lost, db.lost_replies = db.lost_replies > 0, max(0, db.lost_replies - 1)
+                if lost:
+                    return self._reply(503, {"message": "stand-in lost the reply"})
+                return self._reply(200, result)
+            if target.startswith("rpc/"):
+                return self._reply(404, {"code": "PGRST202", "message": f"function {target[4:]} not in stand-in"})
+            if method == "GET":
+                rows = db.query(target, params, self.headers)
+                if "vnd.pgrst.object" in (self.headers.get("Accept") or ""):
+                    if len(rows) != 1:
+                        return self._reply(406, {"code": "PGRST116", "message": f"{len(rows)} rows"})
+                    return self._reply(200, rows[0])
+                return self._reply(200, rows)
+            if method == "PATCH":
+                return self._reply(200, db.update(target, params, self._body() or {}))
+            if method == "POST":
+                return self._reply(201, db.insert(target, self._body(), dict(params).get("on_conflict")))
+            if method == "DELETE":
+                return self._reply(200, db.delete(target, params))
+            return self._reply(405, {"message": method})
+
+        def do_GET(self) -> None:
+            self._route("GET")
+
+        def do_PATCH(self) -> None:
+            self._route("PATCH")
+
+        def do_POST(self) -> None:
+            self._route("POST")
+
+        def do_DELETE(self) -> None:
+            self._route("DELETE")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="loadtest-stand-in", daemon=True).start()
+    return server
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+class LatencyRecorder:
+    """Histogram stand-in for metrics.py: keeps raw observations per label"""
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def labels(self, **labels: str) -> "LatencyRecorder._Series":
+        return LatencyRecorder._Series(self.samples[labels.get(self.label, "all")])
+
+    class _Series:
+        def __init__(self, samples: List[float]) -> None:
+            self._samples = samples
+
+        def observe(self, seconds: float, exemplar: Any = None) -> None:
+            self._samples.append(seconds)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no samples)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS)
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+async def sample_loop(interval: float, lags: List[float], rss: List[int], stop: asyncio.Event) -> None:
+    """Record how late each wake-up is (event-loop lag) and the current RSS"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+        rss.append(rss_bytes())
+
+
+# ============================================================================
+# SCRIPTED ROOMS
+# ============================================================================
+
+def build_script(tables: Dict[str, List[Dict[str, Any]]], room_index: int, seed: int) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """One room's conversation: (user transcript, tool name, tool arguments)"""
+    rng = random.Random(seed * 100003 + room_index)
+    restaurant = rng.choice(tables["fc_restaurants"])
+    items = [item for item in tables["fc_menu_items"] if item["restaurant_id"] == restaurant["id"]]
+    first, second = rng.sample(items, 2)
+    return [
+        ("what do I usually like", "get_user_profile", {}),
+        (f"I want {first['name']}", "find_food_item", {"query": first["name"]}),
+        (f"any {restaurant['cuisine']} places", "find_restaurants_by_type", {"cuisine_type": restaurant["cuisine"]}),
+        (f"show me the menu for {restaurant['name']}", "get_restaurant_menu", {"restaurant_slug": restaurant["slug"]}),
+        (f"what does the {second['name']} look like", "fetch_menu_item_image", {"item_name": second["name"]}),
+        (f"add two {first['name']}", "quick_add_to_cart", {"item_name": first["name"], "quantity": "2"}),
+        (f"and one {second['name']}", "quick_add_to_cart", {"item_name": second["name"], "quantity": "1"}),
+        (f"make that one {first['name']}", "update_cart_quantity", {"item_name": first["name"], "new_quantity": "1"}),
+        ("what's in my cart", "quick_view_cart", {}),
+        (f"remove the {second['name']}", "remove_from_cart", {"item_name": second["name"], "quantity_to_remove": "all"}),
+        ("checkout", "quick_checkout", {}),
+    ]
+
+
+def make_scripted_llm(script: Dict[str, Tuple[str, Dict[str, Any]]], delay: float) -> Any:
+    """A deterministic LLM: the tool call scripted for the last user message, then a short reply"""
+    from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, llm
+
+    class ScriptedLLMStream(llm.LLMStream):
+        async def _run(self) -> None:
+            await asyncio.sleep(delay)
+            last = self._chat_ctx.items[-1] if self._chat_ctx.items else None
+            if last is not None and last.type == "message" and last.role == "user":
+                tool_name, arguments = script.get(last.text_content or "", (None, None))
+                if tool_name:
+                    self._event_ch.send_nowait(llm.ChatChunk(
+                        id=uuid.uuid4().hex,
+                        delta=llm.ChoiceDelta(role="assistant", tool_calls=[llm.FunctionToolCall(
+                            name=tool_name, arguments=json.dumps(arguments), call_id=uuid.uuid4().hex,
+                        )]),
+                    ))
+                    return
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=uuid.uuid4().hex,
+                delta=llm.ChoiceDelta(role="assistant", content="Done, anything else?"),
+            ))
+
+    class ScriptedLLM(llm.LLM):
+        def chat(self, *, chat_ctx: Any, tools: Any = None, conn_options: Any = DEFAULT_API_CONNECT_OPTIONS, **kwargs: Any) -> Any:
+            return ScriptedLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+    return ScriptedLLM()
+
+
+class FakeParticipant:
+    """local_participant stand-in: publish_data costs a fixed network delay"""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.packets = 0
+        self.bytes = 0
+
+    async def publish_data(self, payload: bytes, reliable: bool = True, **kwargs: Any) -> None:
+        await asyncio.sleep(self.latency)
+        self.packets += 1
+        self.bytes += len(payload)
+
+
+class FakeRoom:
+    def __init__(self, name: str, latency: float) -> None:
+        self.name = name
+        self.local_participant = FakeParticipant(latency)
+
+
+class FakeJobContext:
+    """Just enough of JobContext for on_session_end"""
+
+    def __init__(self, room: FakeRoom) -> None:
+        self.room = room
+
+    def make_session_report(self) -> None:
+        return None
+
+
+async def run_room(index: int, script: List[Tuple[str, str, Dict[str, Any]]], args: argparse.Namespace, profile: Optional[Dict[str, Any]], results: Dict[str, Any]) -> None:
+    """One simulated room, mirroring food_concierge_agent's setup and cleanup"""
+    import copy
+    from livekit.agents import AgentSession
+    import food_concierge_agentserver as agentserver
+    from metrics import current_room
+    from tracing import end_turn, start_turn
+    from wire_format import SUPPORTED_ENCODINGS, SUPPORTED_FEATURES
+
+    room = FakeRoom(f"loadtest-{index}", args.publish_latency_ms / 1000)
+    current_room.set(room.name)
+    agentserver.active_sessions.add(room.name)
+    agentserver.reset_voice_cart(room.name)
+
+    userdata = await agentserver.new_userdata()
+    userdata.session_id = room.name
+    userdata.cart_ready = asyncio.create_task(agentserver.prepare_voice_cart(room.name))
+    userdata.publisher = agentserver.DataPublisher(room)
+    userdata.local_participant = room.local_participant
+    agentserver.session_publishers[room.name] = userdata.publisher
+    if profile:
+        userdata.profile = copy.deepcopy(profile)
+    if args.negotiate:
+        agentserver.handle_client_message(userdata, {
+            "type": "client_hello", "encodings": SUPPORTED_ENCODINGS, "features": SUPPORTED_FEATURES,
+        })
+
+    # No stt / tts / room: transcripts go in as text and replies stay text
+    session = AgentSession[agentserver.UserState](
+        userdata=userdata,
+        llm=make_scripted_llm({text: (tool, arguments) for text, tool, arguments in script}, args.llm_delay_ms / 1000),
+        max_tool_steps=10,
+    )
+    await session.start(agent=agentserver.FoodConciergeAgent(userdata=userdata))
+    try:
+        for text, _, _ in script:
+            userdata.publisher.publish({"type": "user_transcript", "text": text, "is_final": True})
+            start_turn(room.name, text)
+            started = time.perf_counter()
+            try:
+                await session.run(user_input=text)
+                results["turns"].append(time.perf_counter() - started)
+            except Exception as error:
+                results["errors"].append(f"{room.name}: {text!r}: {error}")
+            end_turn(room.name)
+            userdata.publisher.publish({"type": "agent_response", "text": "Done, anything else?", "is_final": True})
+            await asyncio.sleep(args.think_ms / 1000)
+    finally:
+        await session.aclose()
+        stats = dict(userdata.publisher.stats)
+        await agentserver.on_session_end(FakeJobContext(room))
+        results["publisher"].append(stats)
+
+
+async def run_load(args: argparse.Namespace, tables: Dict[str, List[Dict[str, Any]]], profile: Optional[Dict[str, Any]], recorders: Dict[str, LatencyRecorder]) -> Dict[str, Any]:
+    lags: List[float] = []
+    rss: List[int] = []
+    results: Dict[str, Any] = {"turns": [], "errors": [], "publisher": []}
+    stop = asyncio.Event()
+
+    from watchdog import start_watchdog, watchdog_stats
+
+    start_watchdog()
+    baseline_rss = rss_bytes()
+    sampler = asyncio.create_task(sample_loop(args.sample_interval_ms / 1000, lags, rss, stop))
+    started = time.perf_counter()
+
+    async def delayed(index: int) -> None:
+        await asyncio.sleep(args.ramp_seconds * index / max(1, args.rooms))
+        await run_room(index, build_script(tables, index, args.seed), args, profile, results)
+
+    await asyncio.gather(*(delayed(index) for index in range(args.rooms)), return_exceptions=False)
+    wall = time.perf_counter() - started
+    stop.set()
+    await sampler
+    stalls = watchdog_stats()
+
+    peak_rss = max(rss + [rss_bytes()])
+    tool_samples = recorders["tool"].samples
+    publisher_totals: Dict[str, int] = defaultdict(int)
+    for stats in results["publisher"]:
+        for key, value in stats.items():
+            publisher_totals[key] += value
+    return {
+        "rooms": args.rooms,
+        "turnsPerRoom": len(build_script(tables, 0, args.seed)),
+        "wallSeconds": round(wall, 2),
+        "errors": results["errors"],
+        "turn": summarize(results["turns"]),
+        "tools": {name: summarize(values) for name, values in sorted(tool_samples.items())},
+        "allTools": summarize([value for values in tool_samples.values() for value in values]),
+        "dbQueries": {name: summarize(values) for name, values in sorted(recorders["db"].samples.items())},
+        "pexels": summarize([value for values in recorders["pexels"].samples.values() for value in values]),
+        "publish": summarize([value for values in recorders["publish"].samples.values() for value in values]),
+        "publisher": dict(publisher_totals),
+        "loopLag": summarize(lags),
+        "stalls": stalls,
+        "memory": {
+            "baselineRssMiB": round(baseline_rss / 2**20, 1),
+            "peakRssMiB": round(peak_rss / 2**20, 1),
+            "perSessionKiB": round((peak_rss - baseline_rss) / max(1, args.rooms) / 1024, 1),
+        },
+    }
+
+
+# ============================================================================
+# PEXELS CLIENT BENCHMARK
+# ============================================================================
+
+def run_pexels_bench(args: argparse.Namespace, db: PostgrestStandIn) -> Dict[str, Any]:
+    """
+    Image lookups through the shared pooled client (fetch_image_from_pexels)
+    against a new AsyncClient per call, as fetch_image_from_pexels did before,
+    one at a time and IMAGE_BACKFILL_CONCURRENCY at a time
+    """
+    import httpx
+
+    import database
+
+    requests = args.pexels_bench
+    queries = [f"{dish} food" for _, _, dishes in CUISINES for dish in dishes]
+
+    async def per_call(query: str) -> Optional[str]:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                database.PEXELS_SEARCH_URL,
+                params={"query": query, "per_page": "1", "orientation": "landscape"},
+                headers={"Authorization": database.PEXELS_API_KEY},
+                timeout=10.0,
+            )
+            return response.json()["photos"][0]["src"]["large"]
+
+    async def timed_run(fetch: Callable[[str], Awaitable[Optional[str]]], concurrency: int) -> Dict[str, Any]:
+        latencies: List[float] = []
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(index: int) -> Optional[str]:
+            async with gate:
+                started = time.perf_counter()
+                url = await fetch(queries[index % len(queries)])
+                latencies.append(time.perf_counter() - started)
+                return url
+
+        connections = db.connections
+        started = time.perf_counter()
+        urls = await asyncio.gather(*(one(index) for index in range(requests)))
+        return {
+            **summarize(latencies),
+            "wallSeconds": round(time.perf_counter() - started, 3),
+            "connections": db.connections - connections,
+            "failed": sum(1 for url in urls if not url),
+        }
+
+    async def bench() -> Dict[str, Dict[str, Any]]:
+        runs = {}
+        concurrency = database.IMAGE_BACKFILL_CONCURRENCY
+        for label, fetch in (("per-call client", per_call), ("pooled client", database.fetch_image_from_pexels)):
+            # One untimed lookup, so neither side pays first-use costs in the numbers
+            await fetch(queries[0])
+            runs[f"{label}, sequential"] = await timed_run(fetch, 1)
+            runs[f"{label}, {concurrency} at a time"] = await timed_run(fetch, concurrency)
+        await database.close_http_client()
+        return runs
+
+    return {"requests": requests, "pexelsLatencyMs": args.pexels_latency_ms, "runs": asyncio.run(bench())}
+
+
+def print_pexels_bench(report: Dict[str, Any]) -> None:
+    print(f"\n🖼️ Pexels lookups: {report['requests']} per run, stand-in latency {report['pexelsLatencyMs']:.0f} ms")
+    print(f"  {'':<32}{'p50 ms':>10}{'p95 ms':>10}{'wall s':>10}{'conns':>8}{'failed':>8}")
+    for label, run in report["runs"].items():
+        print(f"  {label:<32}{run['p50_ms']:>10}{run['p95_ms']:>10}{run['wallSeconds']:>10}{run['connections']:>8}{run['failed']:>8}")
+
+
+# ============================================================================
+# SLOW BACKEND CHECK
+# ============================================================================
+
+def run_db_stall_check(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Many coroutines query a slow stand-in at once while the event loop's lag
+    is sampled. Through database._execute the loop must stay responsive and
+    the queries overlap; the same queries run inline (the old blocking
+    .execute()) are the control that shows the check can see a stall.
+    """
+    import database
+
+    latency = args.db_latency_ms / 1000
+    queries = args.rooms
+
+    def query() -> Any:
+        return database.supabase.table("fc_restaurants").select("id, name").limit(5)
+
+    async def measure(run_query: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        lags: List[float] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_loop(args.sample_interval_ms / 1000, lags, [], stop))
+        await asyncio.sleep(args.sample_interval_ms / 1000 * 2)
+        started = time.perf_counter()
+        await asyncio.gather(*(run_query() for _ in range(queries)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await sampler
+        return {"wallSeconds": round(wall, 3), "loopLag": summarize(lags)}
+
+    async def offloaded() -> Any:
+        return await database._execute(query())
+
+    async def inline() -> Any:
+        return query().execute()
+
+    async def check() -> Dict[str, Any]:
+        # Untimed first round: client setup, executor threads and pooled
+        # connections are one-off costs
+        await asyncio.gather(*(offloaded() for _ in range(queries)))
+        return {"offloaded": await measure(offloaded), "inline": await measure(inline)}
+
+    runs = asyncio.run(check())
+    serial = queries * latency
+    # A blocked loop lags by a whole query latency; half of it leaves room for scheduling noise
+    lag_budget = max(latency / 2, args.sample_interval_ms / 1000) * 1000
+    checks = {
+        f"loop lag stays under {lag_budget:.0f} ms while queries wait": runs["offloaded"]["loopLag"]["max_ms"] < lag_budget,
+        "queries overlap (wall time under half of serial)": runs["offloaded"]["wallSeconds"] < serial / 2,
+        "control: inline queries stall the loop for a query's latency": runs["inline"]["loopLag"]["max_ms"] >= latency * 1000 * 0.8,
+    }
+    return {"queries": queries, "dbLatencyMs": args.db_latency_ms, "runs": runs, "checks": checks}
+
+
+def print_db_stall_check(report: Dict[str, Any]) -> None:
+    print(f"\n🐢 Slow backend: {report['queries']} concurrent queries at {report['dbLatencyMs']:.0f} ms each")
+    for name, run in report["runs"].items():
+        lag = run["loopLag"]
+        print(f"  {name:<10} wall {run['wallSeconds']}s, loop lag p50 {lag['p50_ms']} ms, max {lag['max_ms']} ms")
+    for name, passed in report["checks"].items():
+        print(f"  {'✅' if passed else '❌'} {name}")
+
+
+# ============================================================================
+# FUZZY MATCHING BENCHMARK
+# ============================================================================
+
+# (transcript as STT hears it, dish it should resolve to)
+MISHEARD = [
+    ("pad tie", "Pad Thai"),
+    ("jerk chikin", "Jerk Chicken"),
+    ("tiramisoo", "Tiramisu"),
+    ("buter chiken", "Butter Chicken"),
+    ("salmon nigri", "Salmon Nigiri"),
+    ("chana masalla", "Chana Masala"),
+    ("falafel rap", "Falafel Wrap"),
+    ("carne asada tako", "Carne Asada Tacos"),
+]
+
+
+def run_fuzzy_bench(args: argparse.Namespace) -> Dict[str, Any]:
+    """Per-lookup cost of fuzzy search, price lookup and cart-line matching on a large catalog"""
+    from catalog import MenuCatalog
+    from fuzzy import best_match
+
+    per_restaurant = args.sections * args.items
+    restaurants = max(1, math.ceil(args.fuzzy_bench / per_restaurant))
+    tables = build_catalog(restaurants, args.sections, args.items, args.seed)
+    catalog = MenuCatalog()
+    started = time.perf_counter()
+    catalog.load(tables["fc_restaurants"], tables["fc_menu_sections"], tables["fc_menu_items"])
+    load_seconds = time.perf_counter() - started
+
+    # A catering-size cart of distinct names to resolve spoken lines against
+    cart_names = sorted({item["name"] for item in tables["fc_menu_items"]})[:200]
+    timings: Dict[str, List[float]] = defaultdict(list)
+    misses = []
+    for spoken, expected in MISHEARD:
+        for _ in range(args.bench_repeats):
+            started = time.perf_counter()
+            results = catalog.search(spoken, max_results=5)
+            timings["search"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            entry = catalog.price_lookup(spoken)
+            timings["price_lookup"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            line = best_match(spoken, cart_names)
+            timings[f"cart match ({len(cart_names)} lines)"].append(time.perf_counter() - started)
+        if not results or not results[0]["name"].startswith(expected):
+            misses.append(f"search {spoken!r} -> {results[0]['name'] if results else None}")
+        if entry is None or entry["name"] != expected:
+            misses.append(f"price_lookup {spoken!r} -> {entry and entry['name']}")
+        if line is not None and not line.startswith(expected):
+            misses.append(f"cart match {spoken!r} -> {line}")
+    return {
+        "items": len(catalog),
+        "vocabulary": len(catalog.vocabulary),
+        "loadSeconds": round(load_seconds, 2),
+        "lookups": {name: summarize(values) for name, values in timings.items()},
+        "misses": misses,
+    }
+
+
+def print_fuzzy_bench(report: Dict[str, Any]) -> None:
+    print(f"\n🔎 Fuzzy matching: {report['items']} items, {report['vocabulary']} indexed terms, "
+          f"loaded in {report['loadSeconds']}s")
+    print(f"  {'':<32}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in report["lookups"].items():
+        print(f"  {name:<32}{stats['n']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    for miss in report["misses"]:
+        print(f"  ❌ {miss}")
+
+
+# ============================================================================
+# CART MICROBENCHMARK
+# ============================================================================
+
+class ListCartReference:
+    """
+    The list-of-dicts voice cart the agent used before VoiceCart (linear
+    name scans, totals re-summed on every change), kept for comparison
+    """
+
+    def __init__(self) -> None:
+        self.cart: Dict[str, Any] = {"items": [], "subtotal": 0.0, "deliveryFee": 2.99, "total": 2.99}
+
+    def _totals(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        subtotal = sum(item["totalPrice"] for item in items)
+        self.cart = {**self.cart, "items": items, "subtotal": subtotal, "total": subtotal + self.cart["deliveryFee"],
+                     "itemCount": sum(item["quantity"] for item in items)}
+        return self.cart
+
+    def add(self, name: str, quantity: int, price: float) -> Dict[str, Any]:
+        items = self.cart["items"].copy()
+        for item in items:
+            if item["name"].lower() == name.lower():
+                item["quantity"] += quantity
+                item["totalPrice"] = item["basePrice"] * item["quantity"]
+                break
+        else:
+            items.append({"id": f"item-{len(items)}", "menuItemId": f"menu-{len(items)}", "name": name,
+                          "quantity": quantity, "basePrice": price, "totalPrice": price * quantity,
+                          "options": [], "restaurant": {"name": "Restaurant"}})
+        return self._totals(items)
+
+    def set_quantity(self, name: str, quantity: int) -> Dict[str, Any]:
+        items = []
+        for item in self.cart["items"]:
+            if item["name"].lower() == name.lower():
+                if quantity > 0:
+                    item["quantity"] = quantity
+                    item["totalPrice"] = item["basePrice"] * quantity
+                    items.append(item)
+            else:
+                items.append(item)
+        return self._totals(items)
+
+    def remove(self, name: str) -> Dict[str, Any]:
+        return self._totals([item for item in self.cart["items"] if item["name"].lower() != name.lower()])
+
+
+def run_cart_bench(args: argparse.Namespace) -> Dict[str, Any]:
+    """Per-change cost (including the serialized cart a tool publishes) on a catering-size cart"""
+    from voice_cart import VoiceCart
+
+    rng = random.Random(args.seed)
+    names = [f"{dish} Tray {index}" for index, dish in enumerate(
+        dish for _, _, dishes in CUISINES for dish in dishes for _ in range(math.ceil(args.cart_bench / 40))
+    )][:args.cart_bench]
+    prices = {name: round(rng.uniform(5, 30), 2) for name in names}
+
+    def indexed() -> Dict[str, Callable[[str], Any]]:
+        cart = VoiceCart()
+        for name in names:
+            cart.add(name, 1, prices[name])
+        # Each change is published, so the lines are already serialized
+        cart.to_dict()
+
+        def add(name: str) -> Any:
+            cart.add(name, 1, prices.get(name, 8.99))
+            return cart.to_dict()
+
+        def set_quantity(name: str) -> Any:
+            cart.set_quantity(cart.find(name), 3)
+            return cart.to_dict()
+
+        def remove(name: str) -> Any:
+            cart.remove(cart.find(name))
+            return cart.to_dict()
+
+        return {"add line": add, "set quantity": set_quantity, "remove line": remove, "serialize": lambda _: cart.to_dict()}
+
+    def reference() -> Dict[str, Callable[[str], Any]]:
+        cart = ListCartReference()
+        for name in names:
+            cart.add(name, 1, prices[name])
+        return {
+            "add line": lambda name: cart.add(name, 1, prices.get(name, 8.99)),
+            "set quantity": lambda name: cart.set_quantity(name, 3),
+            "remove line": cart.remove,
+            "serialize": lambda _: cart.cart,
+        }
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for label, build in (("list (before)", reference), ("VoiceCart", indexed)):
+        timings: Dict[str, List[float]] = defaultdict(list)
+        for repeat in range(args.bench_repeats):
+            operations = build()
+            # A new line, then changes to lines spread over the cart
+            targets = {"add line": f"Extra Platter {repeat}", "serialize": ""}
+            for operation in ("set quantity", "remove line"):
+                targets[operation] = names[rng.randrange(len(names))]
+            for operation, function in operations.items():
+                started = time.perf_counter()
+                function(targets[operation])
+                timings[operation].append(time.perf_counter() - started)
+        results[label] = {operation: summarize(values) for operation, values in timings.items()}
+    return {"lines": len(names), "results": results}
+
+
+def print_cart_bench(report: Dict[str, Any]) -> None:
+    print(f"\n🛒 Cart changes on a {report['lines']}-line cart (p50 / p95 ms, serialized cart included)")
+    labels = list(report["results"])
+    print(f"  {'':<16}" + "".join(f"{label:>22}" for label in labels))
+    for operation in report["results"][labels[0]]:
+        cells = [report["results"][label][operation] for label in labels]
+        print(f"  {operation:<16}" + "".join(f"{cell['p50_ms']:>12} / {cell['p95_ms']:<7}" for cell in cells))
+
+
+# ============================================================================
+# ORDER CRASH / RESUME
+# ============================================================================
+
+def order_recovery_child(orders: int, confirmed_path: str) -> None:
+    """Crashing worker: check out `orders` carts (database down), then die without flushing"""
+    import database
+
+    async def checkout_and_crash() -> None:
+        await database.ensure_price_index()
+        database.start_order_submission()
+        confirmed = []
+        for index in range(orders):
+            room = f"crash-{index}"
+            _, _, dishes = CUISINES[index % len(CUISINES)]
+            database.add_to_voice_cart(dishes[index % len(dishes)], quantity=1 + index % 3, session_id=room)
+            result = database.checkout_cart(room)
+            await database.sync_orders()
+            confirmed.append({"orderNumber": result["orderId"], "total": result["total"], "lines": result["itemCount"]})
+        with open(confirmed_path, "w") as out:
+            json.dump(confirmed, out)
+        # Let the background submitter hit the outage a few times
+        await asyncio.sleep(0.3)
+        os._exit(17)
+
+    asyncio.run(checkout_and_crash())
+
+
+def run_order_recovery(args: argparse.Namespace, db: PostgrestStandIn) -> Dict[str, Any]:
+    """Crash a worker with journaled, unsubmitted orders; a new worker must write each exactly once"""
+    confirmed_path = os.path.join(os.environ["ORDER_JOURNAL_DIR"], "confirmed.json")
+    db.rpc_outage = True
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--order-recovery-child", str(args.order_recovery), confirmed_path],
+        stdout=None if args.verbose else subprocess.DEVNULL,
+    )
+    with open(confirmed_path) as handle:
+        confirmed = json.load(handle)
+    written_during_outage = len(db.tables.get("fc_orders", []))
+
+    # Database back, but the first replies are lost after their commit, so
+    # those orders are retried and must come back as duplicates
+    lost_replies = min(2, args.order_recovery)
+    db.rpc_outage = False
+    db.lost_replies = lost_replies
+
+    import database
+
+    async def resume() -> Dict[str, Any]:
+        adopted = database.start_order_submission()
+        for _ in range(20):
+            if await database.flush_orders():
+                break
+        return {"adopted": adopted, "pending": len(database.order_queue), **database.order_queue.stats}
+
+    queue = asyncio.run(resume())
+    stored = db.tables.get("fc_orders", [])
+    numbers = [row["order_number"] for row in stored]
+    expected = {order["orderNumber"]: order for order in confirmed}
+    totals_match = all(
+        round(row["total"], 2) == round(expected[row["order_number"]]["total"], 2)
+        for row in stored if row["order_number"] in expected
+    )
+    journals = [name for name in os.listdir(os.environ["ORDER_JOURNAL_DIR"]) if name.endswith(".jsonl")]
+    checks = {
+        "child crashed": child.returncode == 17,
+        "nothing written during outage": written_during_outage == 0,
+        "every confirmed order adopted": queue["adopted"] == len(confirmed),
+        "every order written once": sorted(numbers) == sorted(expected),
+        "totals match confirmations": totals_match,
+        "lines written": len(db.tables.get("fc_order_items", [])) == sum(order["lines"] for order in confirmed),
+        "one event per order": len(db.tables.get("fc_order_events", [])) == len(confirmed),
+        "lost replies resolved as duplicates": queue["duplicates"] == lost_replies,
+        "journal drained": queue["pending"] == 0 and len(journals) == 1,
+    }
+    return {"orders": len(confirmed), "queue": queue, "checks": checks}
+
+
+def print_order_recovery(report: Dict[str, Any]) -> None:
+    print(f"\n🧾 Order crash/resume: {report['orders']} orders, queue {report['queue']}")
+    for name, passed in report["checks"].items():
+        print(f"  {'✅' if passed else '❌'} {name}")
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def row(label: str, stats: Dict[str, float]) -> str:
+        return f"  {label:<32}{stats['n']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}"
+
+    header = f"  {'':<32}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(f"\n📊 Load test: {report['rooms']} rooms x {report['turnsPerRoom']} turns in {report['wallSeconds']}s")
+    print(header)
+    print(row("turn (run to completion)", report["turn"]))
+    for name, stats in report["tools"].items():
+        print(row(f"tool {name}", stats))
+    print(row("tool (all)", report["allTools"]))
+    for name, stats in report["dbQueries"].items():
+        print(row(f"db {name}", stats))
+    print(row("pexels", report["pexels"]))
+    print(row("publish_data", report["publish"]))
+    print(row("event-loop lag", report["loopLag"]))
+    if report["stalls"]:
+        print(f"  Watchdog: {report['stalls']}")
+    memory = report["memory"]
+    print(f"\n  RSS baseline {memory['baselineRssMiB']} MiB, peak {memory['peakRssMiB']} MiB, "
+          f"~{memory['perSessionKiB']} KiB per session")
+    print(f"  Data channel: {report['publisher']}")
+    print(f"  Stand-in PostgREST requests: {report['standInRequests']}")
+    if report["errors"]:
+        print(f"\n⚠️ {len(report['errors'])} failed turns, first: {report['errors'][0]}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline load test for the Food Concierge agent")
+    parser.add_argument("--rooms", type=int, default=20, help="concurrent simulated rooms")
+    parser.add_argument("--ramp-seconds", type=float, default=1.0, help="spread room starts over this long")
+    parser.add_argument("--think-ms", type=float, default=200, help="pause between a room's turns")
+    parser.add_argument("--llm-delay-ms", type=float, default=50, help="fake LLM time per completion")
+    parser.add_argument("--db-latency-ms", type=float, default=5, help="stand-in PostgREST latency per request")
+    parser.add_argument("--pexels-latency-ms", type=float, default=80, help="stand-in Pexels latency per request")
+    parser.add_argument("--publish-latency-ms", type=float, default=2, help="simulated publish_data latency")
+    parser.add_argument("--restaurants", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--items", type=int, default=8, help="items per section")
+    parser.add_argument("--sample-interval-ms", type=float, default=20, help="event-loop lag sampling interval")
+    parser.add_argument("--no-negotiate", dest="negotiate", action="store_false",
+                        help="skip client_hello (plain tool_call JSON, no compression or deltas)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the agent's own logging")
+    parser.add_argument("--order-recovery", type=int, metavar="ORDERS",
+                        help="run the order crash/resume check with this many orders instead of the load test")
+    parser.add_argument("--pexels-bench", type=int, metavar="REQUESTS",
+                        help="benchmark image lookups, pooled client vs a client per call, instead of the load test")
+    parser.add_argument("--db-stall-check", action="store_true",
+                        help="check that --rooms concurrent queries to a slow stand-in (--db-latency-ms, at least 200) "
+                             "do not stall the event loop, instead of the load test")
+    parser.add_argument("--fuzzy-bench", type=int, metavar="ITEMS",
+                        help="benchmark fuzzy lookups on a generated catalog of about this many items instead of the load test")
+    parser.add_argument("--cart-bench", type=int, metavar="LINES",
+                        help="benchmark cart changes on a cart with this many lines instead of the load test")
+    parser.add_argument("--bench-repeats", type=int, default=200, help="timed repetitions per benchmark case")
+    parser.add_argument("--order-recovery-child", nargs=2, metavar=("ORDERS", "CONFIRMED_PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.order_recovery_child:
+        # Spawned by run_order_recovery with the stand-in's environment
+        orders, confirmed_path = args.order_recovery_child
+        order_recovery_child(int(orders), confirmed_path)
+        return 0
+
+    if args.cart_bench:
+        print_cart_bench(run_cart_bench(args))
+        return 0
+
+    if args.fuzzy_bench:
+        # Pure in-memory catalog work: no stand-in or agent modules needed
+        report = run_fuzzy_bench(args)
+        print_fuzzy_bench(report)
+        return 1 if report["misses"] else 0
+
+    if args.db_stall_check:
+        # A stall has to stand out from ordinary scheduling noise
+        args.db_latency_ms = max(args.db_latency_ms, 200)
+
+    tables = build_catalog(args.restaurants, args.sections, args.items, args.seed)
+    db = PostgrestStandIn(tables)
+    stand_in = start_stand_in(db, args.db_latency_ms / 1000, args.pexels_latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{stand_in.server_address[1]}"
+
+    # database.py creates its clients at import time, so point it at the
+    # stand-in before importing anything from the agent
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "loadtest.stand-in.key"
+    os.environ["PEXELS_API_KEY"] = "loadtest"
+    os.environ["PEXELS_SEARCH_URL"] = f"{base_url}/v1/search"
+    os.environ.setdefault("METRICS_ENABLED", "false")
+    os.environ.setdefault("CATALOG_SYNC_INTERVAL_SECONDS", "0")
+    os.environ.setdefault("ORDER_JOURNAL_DIR", tempfile.mkdtemp(prefix="loadtest-orders-"))
+
+    if args.pexels_bench:
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with output:
+            report = run_pexels_bench(args, db)
+        stand_in.shutdown()
+        print_pexels_bench(report)
+        return 1 if any(run["failed"] for run in report["runs"].values()) else 0
+
+    if args.db_stall_check:
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with output:
+            report = run_db_stall_check(args)
+        stand_in.shutdown()
+        print_db_stall_check(report)
+        return 0 if all(report["checks"].values()) else 1
+
+    if args.order_recovery:
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with output:
+            report = run_order_recovery(args, db)
+        stand_in.shutdown()
+        print_order_recovery(report)
+        return 0 if all(report["checks"].values()) else 1
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with output:
+        import data_publisher
+        import database
+        import metrics
+
+        # Collect raw observations through the same instrumentation points the
+        # Prometheus histograms use
+        recorders = {
+            "tool": LatencyRecorder("tool"), "db": LatencyRecorder("target"),
+            "pexels": LatencyRecorder("status"), "publish": LatencyRecorder("status"),
+        }
+        metrics.TOOL_DURATION = recorders["tool"]
+        database.DB_QUERY_DURATION = recorders["db"]
+        database.PEXELS_DURATION = recorders["pexels"]
+        data_publisher.PUBLISH_DURATION = recorders["publish"]
+
+        profile = database.prewarm_worker().get("profile")
+        report = asyncio.run(run_load(args, tables, profile, recorders))
+
+    report["standInRequests"] = db.requests
+    stand_in.shutdown()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
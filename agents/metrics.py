@@ -0,0 +1,189 @@
+"""
+Latency metrics for the Food Concierge agent (Prometheus format)
+Histograms for every function tool, Supabase query, Pexels fetch, data-channel
+publish and STT -> LLM -> TTS pipeline phase, served from a local HTTP
+endpoint in each worker process. Observations carry an exemplar with the room
+name, so a slow bucket in Grafana links straight to the session that caused it.
+
+prometheus_client is optional: without it (or with METRICS_ENABLED=false)
+every helper here is a cheap no-op.
+"""
+
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    from prometheus_client import Histogram, start_http_server
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Each job process needs its own port; if the base port is taken, the next
+# METRICS_PORT_RANGE ports are tried in turn
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_PORT_RANGE = int(os.getenv("METRICS_PORT_RANGE", "16"))
+
+# Room / tool currently being served, inherited by tasks spawned from the session
+current_room: ContextVar[Optional[str]] = ContextVar("current_room", default=None)
+current_tool: ContextVar[Optional[str]] = ContextVar("current_tool", default=None)
+
+# Voice turns care about tens of milliseconds up to several seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+
+if METRICS_ENABLED:
+    TOOL_DURATION = Histogram(
+        "food_concierge_tool_duration_seconds",
+        "Function tool execution time",
+        ["tool", "status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    DB_QUERY_DURATION = Histogram(
+        "food_concierge_db_query_duration_seconds",
+        "Supabase (PostgREST) query time, by table or RPC",
+        ["target", "method", "status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    PEXELS_DURATION = Histogram(
+        "food_concierge_pexels_fetch_duration_seconds",
+        "Pexels image search time",
+        ["status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    PUBLISH_DURATION = Histogram(
+        "food_concierge_publish_data_duration_seconds",
+        "Data-channel publish_data time per packet",
+        ["status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    PIPELINE_PHASE_DURATION = Histogram(
+        "food_concierge_pipeline_phase_seconds",
+        "Voice pipeline phases reported by AgentSession metrics_collected events",
+        ["phase"],
+        buckets=LATENCY_BUCKETS,
+    )
+    LOOP_LAG = Histogram(
+        "food_concierge_event_loop_lag_seconds",
+        "How late the event loop ran a scheduled wake-up (watchdog heartbeat)",
+        buckets=LATENCY_BUCKETS,
+    )
+    LOOP_STALL_DURATION = Histogram(
+        "food_concierge_event_loop_stall_seconds",
+        "Event loop stalls above the watchdog threshold, by the tool that was running",
+        ["tool"],
+        buckets=LATENCY_BUCKETS,
+    )
+else:
+    TOOL_DURATION = DB_QUERY_DURATION = PEXELS_DURATION = PUBLISH_DURATION = PIPELINE_PHASE_DURATION = None
+    LOOP_LAG = LOOP_STALL_DURATION = None
+
+# Running tool per task, with its room; ContextVars are not readable from other
+# threads, so the watchdog looks up the blocked task here
+active_tools: Dict["asyncio.Task[Any]", Tuple[str, Optional[str]]] = {}
+
+_server_port: Optional[int] = None
+
+
+def start_metrics_server() -> Optional[int]:
+    """Serve /metrics for this process (idempotent); returns the bound port or None"""
+    global _server_port
+    if not METRICS_ENABLED or _server_port is not None:
+        return _server_port
+    for port in range(METRICS_PORT, METRICS_PORT + max(1, METRICS_PORT_RANGE)):
+        try:
+            start_http_server(port, addr=METRICS_HOST)
+        except OSError:
+            continue
+        _server_port = port
+        print(f"📈 Metrics endpoint: http://{METRICS_HOST}:{port}/metrics")
+        return port
+    print(f"⚠️ No free metrics port in {METRICS_PORT}-{METRICS_PORT + METRICS_PORT_RANGE - 1}")
+    return None
+
+
+def _exemplar(room: Optional[str] = None) -> Optional[Dict[str, str]]:
+    room = room or current_room.get()
+    # OpenMetrics caps exemplar labels at 128 characters in total
+    return {"room": room[:64]} if room else None
+
+
+def observe(histogram: Any, seconds: float, *, exemplar_room: Optional[str] = None, **labels: str) -> None:
+    """Record one observation, tagged with the current (or given) room as exemplar"""
+    if histogram is None or seconds < 0:
+        return
+    series = histogram.labels(**labels) if labels else histogram
+    series.observe(seconds, exemplar=_exemplar(exemplar_room))
+
+
+@contextmanager
+def timed(histogram: Any, **labels: str) -> Iterator[None]:
+    """Time a block into histogram; adds status="ok"/"error" from the outcome"""
+    if histogram is None:
+        yield
+        return
+    started = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        observe(histogram, time.perf_counter() - started, status=status, **labels)
+
+
+def timed_tool(name: str) -> Callable:
+    """
+    Decorator for function tool implementations: records duration per tool,
+    sets current_tool for nested database / HTTP observations and registers
+    the task in active_tools for the watchdog. Place it under
+    @function_tool so the tool schema still comes from the wrapped signature.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            token = current_tool.set(name)
+            task = asyncio.current_task()
+            active_tools[task] = (name, current_room.get())
+            try:
+                with timed(TOOL_DURATION, tool=name):
+                    return await fn(*args, **kwargs)
+            finally:
+                active_tools.pop(task, None)
+                current_tool.reset(token)
+        return wrapper
+    return decorator
+
+
+def query_labels(query: Any) -> Dict[str, str]:
+    """target/method labels for a postgrest-py request builder ("/fc_menu_items", "GET")"""
+    path = getattr(query, "path", None)
+    method = getattr(query, "http_method", None)
+    return {
+        "target": path.strip("/") or "unknown" if isinstance(path, str) else "unknown",
+        "method": method.upper() if isinstance(method, str) else "unknown",
+    }
+
+
+def record_session_metrics(metrics: Any) -> None:
+    """
+    Map a livekit.agents metrics object (from the session's metrics_collected
+    event) onto pipeline phase observations
+    """
+    if PIPELINE_PHASE_DURATION is None:
+        return
+    kind = type(metrics).__name__
+    phases = {
+        "STTMetrics": {"stt": "duration"},
+        "LLMMetrics": {"llm_ttft": "ttft", "llm": "duration"},
+        "TTSMetrics": {"tts_ttfb": "ttfb", "tts": "duration"},
+        "EOUMetrics": {"end_of_utterance": "end_of_utterance_delay", "transcription": "transcription_delay"},
+    }.get(kind, {})
+    for phase, attribute in phases.items():
+        value = getattr(metrics, attribute, None)
+        if isinstance(value, (int, float)):
+            observe(PIPELINE_PHASE_DURATION, float(value), phase=phase)
@@ -0,0 +1,70 @@
+"""
+Single-flight coalescing for concurrent identical lookups
+When several rooms on one worker ask for the same menu, search or image at
+the same moment, only the first caller runs the fetch; the others await the
+same in-flight task instead of issuing their own Supabase/Pexels calls.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Shares one in-flight task per key among concurrent callers.
+    Results are not kept once the task finishes (that is catalog_cache's job);
+    callers that receive a shared result must copy it before mutating.
+    """
+
+    def __init__(self, max_tracked_keys: int = 1000) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        # key -> calls started / calls that joined an in-flight task
+        self.calls: Counter = Counter()
+        self.coalesced: Counter = Counter()
+        self.max_tracked_keys = max_tracked_keys
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        """Await fetch() for key, joining an identical call already in flight"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced[key] += 1
+        else:
+            self.calls[key] += 1
+            if len(self.calls) > self.max_tracked_keys:
+                self._trim_counters()
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        # shield: one caller being cancelled must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieve the exception so a result nobody awaited is not logged as unhandled
+            task.exception()
+
+    def _trim_counters(self) -> None:
+        """Keep per-key counters bounded: drop the least-called half of the keys"""
+        keep = dict(self.calls.most_common(self.max_tracked_keys // 2))
+        self.calls = Counter(keep)
+        self.coalesced = Counter({key: count for key, count in self.coalesced.items() if key in keep})
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        """Totals plus the most-coalesced keys, for logging or metrics"""
+        return {
+            "calls": sum(self.calls.values()),
+            "coalesced": sum(self.coalesced.values()),
+            "inFlight": len(self._inflight),
+            "topCoalesced": [
+                {"key": repr(key), "coalesced": count, "calls": self.calls[key]}
+                for key, count in self.coalesced.most_common(top)
+            ],
+        }
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,65 @@
+"""
+Shared setup for the agent's behaviour checks (run from agents/: python -m pytest tests)
+database.py creates its Supabase client at import time, so point it at an
+unused local URL first; the checks never reach the network.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "tests.stand-in.key")
+os.environ.setdefault("METRICS_ENABLED", "false")
+os.environ.setdefault("CATALOG_SYNC_INTERVAL_SECONDS", "0")
+os.environ.setdefault("ORDER_JOURNAL_DIR", tempfile.mkdtemp(prefix="agent-tests-orders-"))
+
+from catalog import MenuCatalog  # noqa: E402 (needs AGENTS_DIR on sys.path)
+
+RESTAURANTS = [
+    {"id": "r-thai", "slug": "thai-house", "name": "Thai House", "cuisine": "thai", "delivery_fee": 1.99},
+    {"id": "r-cafe", "slug": "corner-cafe", "name": "Corner Cafe", "cuisine": "american", "delivery_fee": 3.49},
+]
+SECTIONS = [
+    {"id": "s-thai", "restaurant_id": "r-thai", "name": "Mains"},
+    {"id": "s-cafe", "restaurant_id": "r-cafe", "name": "Cafe"},
+]
+# (id, restaurant, section, name, price)
+ITEMS = [
+    ("i-pad", "r-thai", "s-thai", "Pad Thai", 13.5),
+    ("i-curry", "r-thai", "s-thai", "Green Curry", 14.25),
+    ("i-tea", "r-cafe", "s-cafe", "Iced Tea", 3.25),
+    ("i-chicken", "r-cafe", "s-cafe", "Jerk Chicken", 12.0),
+    ("i-carrot-cake", "r-cafe", "s-cafe", "Carrot Cake", 6.5),
+    ("i-cake", "r-cafe", "s-cafe", "Cake", 5.0),
+    ("i-bread", "r-cafe", "s-cafe", "Garlic Bread", 4.5),
+    ("i-lemonade", "r-cafe", "s-cafe", "Lemonade", 3.0),
+    ("i-churros", "r-cafe", "s-cafe", "Churros", 5.75),
+]
+
+
+@pytest.fixture
+def catalog() -> MenuCatalog:
+    """A two-restaurant catalog snapshot"""
+    snapshot = MenuCatalog()
+    snapshot.load(RESTAURANTS, SECTIONS, [
+        {"id": item_id, "restaurant_id": restaurant_id, "section_id": section_id, "name": name,
+         "description": None, "base_price": price, "is_available": True}
+        for item_id, restaurant_id, section_id, name, price in ITEMS
+    ])
+    return snapshot
+
+
+@pytest.fixture
+def priced_menu(monkeypatch, catalog) -> MenuCatalog:
+    """database prices cart lines from the test catalog"""
+    import database
+    monkeypatch.setattr(database, "menu_catalog", catalog)
+    monkeypatch.setattr(database, "PRICED_CART_ENABLED", True)
+    return catalog
@@ -0,0 +1,126 @@
+"""Cart changes by spoken name (user-009) and batched changes (user-024)"""
+
+import asyncio
+
+import pytest
+
+import database
+from catalog import MenuCatalog
+
+
+@pytest.fixture
+def session(monkeypatch, priced_menu):
+    monkeypatch.setattr(database, "_mark_cart_dirty", lambda *args, **kwargs: None)
+    session_id = "tests-cart-operations"
+    yield session_id
+    database.reset_voice_cart(session_id)
+
+
+def _lines(session_id):
+    return [(item["name"], item["quantity"]) for item in database.get_voice_cart(session_id)["cart"]["items"]]
+
+
+def test_misheard_remove_resolves_close_name_and_reads_it_back(session):
+    database.add_to_voice_cart("Pad Thai", quantity=2, session_id=session)
+    result = database.remove_from_cart("pad tie", session_id=session)
+    assert result["success"] and "matched 'pad tie' to Pad Thai" in result["message"]
+    assert _lines(session) == []
+
+
+def test_same_sounding_word_does_not_change_another_line(session):
+    database.add_to_voice_cart("Cake", quantity=1, session_id=session)
+    assert not database.remove_from_cart("coke", session_id=session)["success"]
+    assert not database.update_cart_item_quantity("coke", 3, session_id=session)["success"]
+    assert _lines(session) == [("Cake", 1)]
+
+
+def test_lines_are_priced_from_the_catalog(session):
+    result = database.add_to_voice_cart("pad tie", quantity=2, session_id=session,
+                                        additional_items=[{"itemName": "tea", "quantity": 1}])
+    cart = result["cart"]
+    assert [(item["name"], item["menuItemId"], item["basePrice"]) for item in cart["items"]] == [
+        ("Pad Thai", "i-pad", 13.5), ("Iced Tea", "i-tea", 3.25),
+    ]
+    # One delivery fee per restaurant
+    assert (cart["subtotal"], cart["deliveryFee"], cart["total"]) == (30.25, 5.48, 35.73)
+
+
+def test_unknown_item_is_reported_not_priced(session):
+    result = database.add_to_voice_cart("sushi platter", session_id=session)
+    assert not result["success"] and "sushi platter" in result["message"]
+    assert database.get_voice_cart(session)["cart"]["items"] == []
+
+    result = database.add_to_voice_cart("Churros", session_id=session,
+                                         additional_items=[{"itemName": "sushi platter", "quantity": 1}])
+    assert result["success"] and result["notFound"] == ["sushi platter"]
+    assert _lines(session) == [("Churros", 1)]
+
+
+def test_failed_batch_leaves_cart_unchanged(session):
+    database.add_to_voice_cart("Pad Thai", quantity=1, session_id=session)
+    result = database.apply_cart_operations([
+        {"action": "add", "itemName": "Churros", "quantity": 2},
+        {"action": "set", "itemName": "Pad Thai", "quantity": 3},
+        {"action": "remove", "itemName": "sushi platter"},
+    ], session_id=session)
+    assert not result["success"] and result["errors"] == ["Item 'sushi platter' not found in cart."]
+    assert _lines(session) == [("Pad Thai", 1)]
+
+    result = database.apply_cart_operations([
+        {"action": "add", "itemName": "Churros", "quantity": 2},
+        {"action": "set", "itemName": "Pad Thai", "quantity": 3},
+    ], session_id=session)
+    assert result["success"]
+    assert _lines(session) == [("Pad Thai", 3), ("Churros", 2)]
+
+
+def test_adds_use_estimated_prices_while_the_catalog_is_not_loaded(monkeypatch, session):
+    monkeypatch.setattr(database, "menu_catalog", MenuCatalog())
+    assert not database.menu_catalog.loaded
+
+    result = database.add_to_voice_cart("Pad Thai", session_id=session)
+    assert result["success"] and result["pricesUnavailable"]
+    assert "prices are unavailable" in result["message"]
+
+    result = database.apply_cart_operations([{"action": "add", "itemName": "Churros", "quantity": 2}], session_id=session)
+    assert result["success"] and result["pricesUnavailable"]
+    assert _lines(session) == [("Pad Thai", 1), ("Churros", 2)]
+
+
+def test_failed_catalog_load_is_retried_after_the_interval(monkeypatch):
+    monkeypatch.setattr(database, "menu_catalog", MenuCatalog())
+    monkeypatch.setattr(database, "_catalog_retry_at", 0.0)
+    attempts = []
+
+    async def failing_load():
+        attempts.append(1)
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(database, "load_menu_catalog", failing_load)
+    assert not asyncio.run(database.ensure_price_index())
+    assert not asyncio.run(database.ensure_price_index())
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(database, "_catalog_retry_at", 0.0)
+    assert not asyncio.run(database.ensure_price_index())
+    assert len(attempts) == 2
+
+
+def test_ambiguous_item_is_asked_about_not_guessed(session, priced_menu):
+    priced_menu.upsert_item({"id": "i-satay", "restaurant_id": "r-thai", "section_id": "s-thai",
+                             "name": "Chicken Satay", "base_price": 9.0, "is_available": True})
+    result = database.add_to_voice_cart("chicken", session_id=session)
+    assert not result["success"] and result["ambiguous"] == {"chicken": ["Chicken Satay", "Jerk Chicken"]}
+    assert result["message"] == "'chicken' could be Chicken Satay or Jerk Chicken. Which one?"
+
+    result = database.apply_cart_operations([
+        {"action": "add", "itemName": "chicken", "quantity": 1},
+        {"action": "add", "itemName": "Churros", "quantity": 1},
+    ], session_id=session)
+    assert not result["success"] and "Which one?" in result["message"]
+    assert _lines(session) == []
+
+    # With the cafe in the cart, its chicken is the one meant
+    database.add_to_voice_cart("Churros", session_id=session)
+    assert database.add_to_voice_cart("chicken", session_id=session)["success"]
+    assert _lines(session) == [("Churros", 1), ("Jerk Chicken", 1)]
@@ -0,0 +1,121 @@
+"""Write-behind cart persistence (user-021): coalescing and restore"""
+
+import asyncio
+from types import SimpleNamespace
+
+import database
+from write_behind import WriteBehindQueue
+
+
+def test_burst_of_changes_to_one_session_is_written_once():
+    writes = []
+
+    async def write(batch):
+        writes.append(dict(batch))
+
+    async def burst():
+        queue = WriteBehindQueue(write, delay=0.05)
+        for quantity in range(1, 21):
+            queue.put("room-a", quantity)
+        queue.put("room-b", 1)
+        await asyncio.sleep(0.2)
+        await queue.aclose()
+        return queue.stats
+
+    stats = asyncio.run(burst())
+    assert writes == [{"room-a": 20, "room-b": 1}]
+    assert stats["puts"] == 21 and stats["writes"] == 2 and stats["batches"] == 1
+
+
+def test_cart_changes_are_coalesced_per_session(monkeypatch, priced_menu):
+    session = "tests-coalesce"
+    writes = []
+
+    async def write(batch):
+        writes.append({key: value[0].to_dict() if value[0] else None for key, value in batch.items()})
+
+    async def edit_cart():
+        monkeypatch.setattr(database, "CART_PERSISTENCE_ENABLED", True)
+        monkeypatch.setattr(database, "cart_writer", WriteBehindQueue(write, delay=0.05))
+        database.add_to_voice_cart("Garlic Bread", quantity=1, session_id=session)
+        database.add_to_voice_cart("Lemonade", quantity=2, session_id=session)
+        database.update_cart_item_quantity("Garlic Bread", 3, session_id=session)
+        await database.flush_voice_carts(session)
+
+    try:
+        asyncio.run(edit_cart())
+    finally:
+        database.reset_voice_cart(session)
+    assert len(writes) == 1
+    cart = writes[0][session]
+    assert [(item["name"], item["quantity"]) for item in cart["items"]] == [("Garlic Bread", 3), ("Lemonade", 2)]
+
+
+def test_restored_cart_keeps_unique_line_ids(monkeypatch, priced_menu):
+    session = "tests-restore"
+    row = {
+        "id": "cart-1", "restaurant_id": None, "restaurant_name": "Restaurant",
+        "subtotal": 17.98, "delivery_fee": 2.99, "total": 20.97,
+        "items": [
+            {"line_key": "item-2", "position": 1, "menu_item_id": None, "name": "Lemonade",
+             "quantity": 1, "base_price": 8.99, "total_price": 8.99},
+            {"line_key": "item-1", "position": 0, "menu_item_id": None, "name": "Garlic Bread",
+             "quantity": 1, "base_price": 8.99, "total_price": 8.99},
+        ],
+    }
+
+    async def execute(query):
+        return SimpleNamespace(data=[row])
+
+    monkeypatch.setattr(database, "CART_PERSISTENCE_ENABLED", True)
+    monkeypatch.setattr(database, "_execute", execute)
+    monkeypatch.setattr(database, "_mark_cart_dirty", lambda *args, **kwargs: None)
+    try:
+        restored = asyncio.run(database.restore_voice_cart(session))
+        assert [line.id for line in restored] == ["item-1", "item-2"]
+        database.add_to_voice_cart("Churros", quantity=1, session_id=session)
+        ids = [item["id"] for item in database.get_voice_cart(session)["cart"]["items"]]
+    finally:
+        database.reset_voice_cart(session)
+    assert len(ids) == 3 and len(set(ids)) == 3
+
+
+def test_next_cart_never_replaces_an_unwritten_order(monkeypatch, priced_menu):
+    session = "tests-checkout"
+    # fc_carts stand-in: row id -> {session_key, status, items}
+    rows = {}
+    attempts = []
+
+    async def write_carts(batch):
+        attempts.append(sorted(status for _, status in batch.values()))
+        if len(attempts) == 1:
+            raise ConnectionError("database unavailable")
+        for session_id, (cart, status) in batch.items():
+            row = next((row for row in rows.values() if row["session_key"] == session_id), None)
+            if row is None:
+                row = rows[len(rows) + 1] = {"session_key": session_id}
+            row.update(status=status, items=[line.name for line in cart])
+            if status == "ordered":
+                row["session_key"] = None
+
+    async def checkout_then_add():
+        monkeypatch.setattr(database, "CART_PERSISTENCE_ENABLED", True)
+        monkeypatch.setattr(database, "ORDER_SUBMISSION_ENABLED", False)
+        monkeypatch.setattr(database, "_write_carts", write_carts)
+        monkeypatch.setattr(database, "cart_writer", WriteBehindQueue(database._persist_carts, delay=0.05))
+        database.add_to_voice_cart("Pad Thai", quantity=1, session_id=session)
+        assert database.checkout_cart(session)["success"]
+        assert not await database.flush_voice_carts(session)
+        database.add_to_voice_cart("Churros", quantity=2, session_id=session)
+        assert await database.flush_voice_carts(session)
+
+    try:
+        asyncio.run(checkout_then_add())
+    finally:
+        database.reset_voice_cart(session)
+    # The failed write held only the order; the order is written before the new cart
+    assert attempts == [["ordered"], ["ordered"], ["active"]]
+    assert list(rows.values()) == [
+        {"session_key": None, "status": "ordered", "items": ["Pad Thai"]},
+        {"session_key": session, "status": "active", "items": ["Churros"]},
+    ]
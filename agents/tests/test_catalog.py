@@ -0,0 +1,51 @@
+"""In-memory catalog: fuzzy search (user-009) and the cart price index (user-022)"""
+
+
+def test_misheard_word_is_corrected_in_context_of_the_query(catalog):
+    assert catalog.correct_term("tie", context=["pad"]) == "thai"
+    assert [row["name"] for row in catalog.search("pad tie")][0] == "Pad Thai"
+
+
+def test_misheard_word_still_corrected_without_context(catalog):
+    assert catalog.correct_term("chikin") == "chicken"
+    assert [row["name"] for row in catalog.search("jerk chikin")][0] == "Jerk Chicken"
+
+
+def test_price_lookup_resolves_exact_partial_and_misheard_names(catalog):
+    assert catalog.price_lookup("Pad Thai")["menuItemId"] == "i-pad"
+    assert catalog.price_lookup("pad thai!")["basePrice"] == 13.5
+    assert catalog.price_lookup("tea")["name"] == "Iced Tea"
+    assert catalog.price_lookup("garlic")["name"] == "Garlic Bread"
+    assert catalog.price_lookup("lemon")["name"] == "Lemonade"
+    assert catalog.price_lookup("pad tie", min_score=0.75)["name"] == "Pad Thai"
+    assert catalog.price_lookup("sushi platter") is None
+
+
+def test_price_lookup_returns_restaurant_and_follows_changes(catalog):
+    entry = catalog.price_lookup("green curry")
+    assert (entry["restaurantId"], entry["restaurantSlug"], entry["deliveryFee"]) == ("r-thai", "thai-house", 1.99)
+    catalog.upsert_item({"id": "i-curry", "restaurant_id": "r-thai", "section_id": "s-thai",
+                         "name": "Green Curry", "base_price": 15.0, "is_available": True})
+    assert catalog.price_lookup("green curry")["basePrice"] == 15.0
+    catalog.upsert_item({"id": "i-curry", "restaurant_id": "r-thai", "section_id": "s-thai",
+                         "name": "Green Curry", "base_price": 15.0, "is_available": False})
+    assert catalog.price_lookup("green curry") is None
+    catalog.remove_item("i-tea")
+    assert catalog.price_lookup("tea") is None
+
+
+def test_equally_good_partial_matches_are_offered_not_guessed(catalog):
+    catalog.upsert_item({"id": "i-satay", "restaurant_id": "r-thai", "section_id": "s-thai",
+                         "name": "Chicken Satay", "base_price": 9.0, "is_available": True})
+    assert catalog.price_lookup("chicken") is None
+    assert [entry["name"] for entry in catalog.price_candidates("chicken")] == ["Chicken Satay", "Jerk Chicken"]
+    assert [entry["name"] for entry in catalog.price_candidates("chick")] == ["Chicken Satay", "Jerk Chicken"]
+    # Only one of them is sold by a restaurant already in the cart
+    assert catalog.price_lookup("chicken", restaurant_ids=["r-thai"])["name"] == "Chicken Satay"
+    # A whole-word match beats a prefix match; "cake" itself is a menu item
+    assert catalog.price_lookup("carrot")["name"] == "Carrot Cake"
+    assert catalog.price_lookup("cake")["name"] == "Cake"
+
+    catalog.remove_item("i-satay")
+    assert catalog.price_lookup("chick")["name"] == "Jerk Chicken"
+    assert catalog.price_candidates("sat") == []
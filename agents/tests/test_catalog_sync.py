@@ -0,0 +1,109 @@
+"""Incremental catalog sync from updated_at (user-008) against a local change feed"""
+
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import database
+from catalog import CATALOG_TABLES, parse_timestamp
+from catalog_cache import TTLCache
+
+LOADED_AT = "2026-10-01T12:00:00+00:00"
+CHANGED_AT = "2026-10-01T12:05:00+00:00"
+
+
+class ChangeFeed:
+    """Stand-in for the supabase client: rows per table, and the `since` of every read"""
+
+    def __init__(self):
+        self.rows = {table: [] for table in CATALOG_TABLES}
+        self.reads = []
+
+    def table(self, name):
+        return _ChangedRowsQuery(name)
+
+    async def execute(self, query):
+        self.reads.append((query.table, query.since))
+        rows = [row for row in self.rows[query.table] if parse_timestamp(row["updated_at"]) > parse_timestamp(query.since)]
+        return SimpleNamespace(data=rows[query.start:query.end + 1])
+
+
+class _ChangedRowsQuery:
+    def __init__(self, table):
+        self.table = table
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.since = value
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+
+@pytest.fixture
+def feed(monkeypatch, catalog):
+    """The test catalog stamped LOADED_AT, synced from an empty change feed"""
+    restaurants, sections, items = (
+        [dict(row, updated_at=LOADED_AT) for row in rows]
+        for rows in (catalog.restaurants.values(), catalog.sections.values(), catalog.items.values())
+    )
+    catalog.load(restaurants, sections, items)
+    feed = ChangeFeed()
+    monkeypatch.setattr(database, "menu_catalog", catalog)
+    monkeypatch.setattr(database, "catalog_cache", TTLCache())
+    monkeypatch.setattr(database, "supabase", feed)
+    monkeypatch.setattr(database, "_execute", feed.execute)
+    return feed
+
+
+def _cache_menus():
+    for key in (("get_restaurant_menu", "thai-house", None, None),
+                ("get_restaurant_menu", "corner-cafe", None, None),
+                ("search_menu_items", "churros", 5)):
+        database.catalog_cache.set(key, {"cached": True})
+
+
+def test_sync_patches_changes_and_invalidates_their_restaurants(feed):
+    catalog = database.menu_catalog
+    churros = dict(catalog.items["i-churros"], is_available=False, updated_at=CHANGED_AT)
+    # Pad Thai is replayed unchanged: the overlap window re-reads rows at the boundary
+    feed.rows["fc_menu_items"] = [dict(catalog.items["i-pad"]), churros]
+    _cache_menus()
+
+    assert [row["name"] for row in catalog.search("churros", 5)] == ["Churros"]
+    assert asyncio.run(database.sync_menu_catalog()) == 2
+
+    overlap = timedelta(seconds=database.CATALOG_SYNC_OVERLAP)
+    assert dict(feed.reads)["fc_menu_items"] == (parse_timestamp(LOADED_AT) - overlap).isoformat()
+    assert catalog.watermarks["fc_menu_items"] == parse_timestamp(CHANGED_AT)
+    assert catalog.search("churros", 5) == []
+
+    cached = lambda *key: database.catalog_cache.get(key) is not None
+    assert cached("get_restaurant_menu", "thai-house", None, None)
+    assert not cached("get_restaurant_menu", "corner-cafe", None, None)
+    assert not cached("search_menu_items", "churros", 5)
+
+
+def test_replayed_overlap_is_skipped(feed):
+    catalog = database.menu_catalog
+    churros = dict(catalog.items["i-churros"], base_price=6.25, updated_at=CHANGED_AT)
+    feed.rows["fc_menu_items"] = [churros]
+    asyncio.run(database.sync_menu_catalog())
+    _cache_menus()
+
+    # The next window starts CATALOG_SYNC_OVERLAP before the watermark, so the same row comes back
+    feed.reads.clear()
+    assert asyncio.run(database.sync_menu_catalog()) == 1
+    assert dict(feed.reads)["fc_menu_items"] == (parse_timestamp(CHANGED_AT) - timedelta(seconds=database.CATALOG_SYNC_OVERLAP)).isoformat()
+    assert database.apply_catalog_changes("fc_menu_items", [churros]) == 0
+    assert database.catalog_cache.get(("get_restaurant_menu", "corner-cafe", None, None)) is not None
+    assert catalog.price_lookup("churros")["basePrice"] == 6.25
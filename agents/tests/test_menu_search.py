@@ -0,0 +1,85 @@
+"""Menu search through the fc_search_menu_items RPC with the ilike fallback (user-010)"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from postgrest.exceptions import APIError
+
+import database
+from catalog_cache import TTLCache
+
+ROW = {
+    "id": "i-pad", "slug": "pad-thai", "name": "Pad Thai", "description": None, "base_price": 13.5,
+    "calories": None, "dietary_tags": [], "image": "https://images.example/pad-thai.jpg", "section_name": "Mains",
+    "restaurant_id": "r-thai", "restaurant_slug": "thai-house", "restaurant_name": "Thai House",
+}
+
+
+class Backend:
+    """Stand-in client: the RPC answers with `rpc_reply` (rows or an exception), ilike queries find nothing"""
+
+    def __init__(self):
+        self.rpc_reply = [ROW]
+        self.calls = []
+
+    def rpc(self, name, params):
+        return SimpleNamespace(kind="rpc", name=name)
+
+    def table(self, name):
+        return _TableQuery()
+
+    async def execute(self, query):
+        kind = query.kind
+        self.calls.append(kind)
+        if kind == "rpc" and isinstance(self.rpc_reply, Exception):
+            raise self.rpc_reply
+        return SimpleNamespace(data=self.rpc_reply if kind == "rpc" else [])
+
+
+class _TableQuery:
+    kind = "table"
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = Backend()
+    monkeypatch.setattr(database, "supabase", backend)
+    monkeypatch.setattr(database, "_execute", backend.execute)
+    monkeypatch.setattr(database, "catalog_cache", TTLCache())
+    monkeypatch.setattr(database, "CATALOG_SEARCH_ENGINE", "postgrest")
+    monkeypatch.setattr(database, "FUZZY_SEARCH_FALLBACK", False)
+    monkeypatch.setattr(database, "_menu_search_rpc_missing", False)
+    return backend
+
+
+def _search(query):
+    return asyncio.run(database.search_menu_items(query, 5))
+
+
+def test_search_uses_the_ranked_rpc_by_default(backend):
+    assert database.MENU_SEARCH_RPC
+    assert [item["name"] for item in _search("pad thai")] == ["Pad Thai"]
+    assert backend.calls == ["rpc"]
+
+
+def test_failed_rpc_falls_back_and_is_tried_again(backend):
+    backend.rpc_reply = ConnectionError("statement timeout")
+    assert _search("pad thai") == []
+    assert backend.calls[0] == "rpc" and "table" in backend.calls
+
+    backend.calls.clear()
+    backend.rpc_reply = [ROW]
+    assert [item["name"] for item in _search("green curry")] == ["Pad Thai"]
+    assert backend.calls == ["rpc"]
+
+
+def test_missing_rpc_falls_back_and_is_not_asked_again(backend):
+    backend.rpc_reply = APIError({"code": "PGRST202", "message": "function not found", "hint": None, "details": None})
+    _search("pad thai")
+    backend.calls.clear()
+    _search("green curry")
+    assert "rpc" not in backend.calls and "table" in backend.calls
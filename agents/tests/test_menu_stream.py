@@ -0,0 +1,108 @@
+"""Streamed restaurant menus (user-016): paged section fetches, chunks flushed past the batching window"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import database
+from catalog_cache import TTLCache
+from data_publisher import DataPublisher
+
+SECTIONS = [{"id": f"s-{n}", "name": f"Section {n}", "description": None, "display_order": n, "is_active": True} for n in range(5)]
+ITEMS = [
+    {"id": f"i-{n}-{k}", "slug": None, "name": f"Dish {n}.{k}", "description": None, "base_price": 10 + k,
+     "dietary_tags": [], "calories": None, "image": None, "section_id": f"s-{n}", "display_order": k}
+    for n in range(5) for k in range(3)
+]
+
+
+class MenuBackend:
+    """Stand-in client: fc_restaurants (with embedded sections) and fc_menu_items, logging every read"""
+
+    def __init__(self):
+        self.reads = []
+
+    def table(self, name):
+        return _Query(name)
+
+    async def execute(self, query):
+        await asyncio.sleep(0.01)
+        if query.table == "fc_restaurants":
+            self.reads.append("outline")
+            restaurant = {"id": "r-thai", "slug": "thai-house", "name": "Thai House", "cuisine": "thai", "hero_image": None}
+            return SimpleNamespace(data=[dict(restaurant, sections=[dict(section) for section in reversed(SECTIONS)])])
+        self.reads.append(query.section_ids)
+        return SimpleNamespace(data=[dict(item) for item in ITEMS if item["section_id"] in query.section_ids])
+
+
+class _Query:
+    def __init__(self, table):
+        self.table = table
+        self.section_ids = None
+
+    def in_(self, column, values):
+        self.section_ids = list(values)
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = MenuBackend()
+    monkeypatch.setattr(database, "supabase", backend)
+    monkeypatch.setattr(database, "_execute", backend.execute)
+    monkeypatch.setattr(database, "catalog_cache", TTLCache())
+    monkeypatch.setattr(database, "MENU_STREAM_PAGE_SECTIONS", 2)
+    return backend
+
+
+def test_first_section_is_yielded_before_the_rest_is_read(backend):
+    async def stream():
+        pieces = []
+        async for kind, payload in database.stream_restaurant_menu("thai-house"):
+            pieces.append((kind, payload, len(backend.reads)))
+        return pieces
+
+    pieces = asyncio.run(stream())
+    kinds = [kind for kind, _, _ in pieces]
+    assert kinds == ["header"] + ["section"] * 5
+    header = pieces[0][1]
+    assert header["sectionCount"] == 5 and header["speechSummary"].startswith("Here are 5 menu sections at Thai House. Dish 0.0")
+    assert [payload["title"] for _, payload, _ in pieces[1:]] == [f"Section {n}" for n in range(5)]
+    assert [item["name"] for item in pieces[1][1]["items"]] == ["Dish 0.0", "Dish 0.1", "Dish 0.2"]
+    # Header and first section: the outline, the first page and (at most) the next page in flight
+    assert pieces[1][2] <= 3
+    assert backend.reads == ["outline", ["s-0", "s-1"], ["s-2", "s-3"], ["s-4"]]
+
+    # The assembled menu is cached in get_restaurant_menu's shape
+    backend.reads.clear()
+    menu = asyncio.run(database.get_restaurant_menu("thai-house"))
+    assert backend.reads == []
+    assert menu["speechSummary"] == header["speechSummary"] and len(menu["sections"]) == 5
+
+
+def test_flushed_chunks_skip_the_batching_window():
+    sent = []
+
+    async def publish_data(packet, reliable=True):
+        sent.append((time.monotonic(), json.loads(packet)))
+
+    async def publish():
+        room = SimpleNamespace(local_participant=SimpleNamespace(publish_data=publish_data))
+        publisher = DataPublisher(room, window=0.5)
+        started = time.monotonic()
+        publisher.publish({"type": "menu_chunk", "seq": 0}, flush=True)
+        await asyncio.sleep(0.05)
+        publisher.publish({"type": "transcript"})
+        await publisher.aclose()
+        return started
+
+    started = asyncio.run(publish())
+    (chunk_at, chunk), (transcript_at, transcript) = sent
+    assert chunk["type"] == "menu_chunk" and chunk_at - started < 0.1
+    assert transcript["type"] == "transcript" and transcript_at - started >= 0.5
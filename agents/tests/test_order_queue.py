@@ -0,0 +1,121 @@
+"""Journaled order submission (user-025)"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import database
+from order_queue import OrderQueue
+
+
+def _order(number: int) -> dict:
+    return {"id": f"00000000-0000-4000-8000-{number:012d}", "order_number": f"VO{number}", "items": []}
+
+
+def test_live_journal_is_never_adopted_and_dead_one_is(tmp_path):
+    submitted = []
+
+    async def submit(order):
+        submitted.append(order["id"])
+        return {"duplicate": False}
+
+    live = OrderQueue(submit, directory=str(tmp_path))
+    live.put(_order(1))
+    other = OrderQueue(submit, directory=str(tmp_path))
+    other.open()
+    assert len(other) == 0 and os.path.exists(live.path)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".new")]
+
+    # The owner dies: its lock goes with it
+    live._journal.close()
+    assert other.adopt_orphans() == 1 and not os.path.exists(live.path)
+    assert asyncio.run(other.flush()) is True
+    assert submitted == [_order(1)["id"]] and other.stats["recovered"] == 1
+
+
+def test_failed_submission_stays_journaled_and_is_retried(tmp_path):
+    attempts = []
+
+    async def submit(order):
+        attempts.append(order["id"])
+        if len(attempts) == 1:
+            raise ConnectionError("database down")
+        return {"duplicate": False}
+
+    async def checkout_during_outage():
+        queue = OrderQueue(submit, directory=str(tmp_path), retry_delay=0.01)
+        queue.put(_order(2))
+        first = await queue.flush()
+        with open(queue.path) as journal:
+            journaled = journal.read()
+        # The background submitter retries after its backoff
+        await asyncio.sleep(0.1)
+        await queue.aclose()
+        return queue, first, journaled
+
+    queue, first, journaled = asyncio.run(checkout_during_outage())
+    assert first is False and _order(2)["id"] in journaled
+    assert len(queue) == 0 and len(attempts) == 2
+    assert queue.stats == {"queued": 1, "recovered": 0, "submitted": 1, "duplicates": 0, "failures": 1}
+
+
+def test_checkout_after_a_crash_is_submitted_exactly_once(monkeypatch, tmp_path, priced_menu):
+    session = "tests-crash"
+    outage = True
+    attempts, written = [], []
+
+    class Client:
+        def rpc(self, name, params):
+            return SimpleNamespace(name=name, params=params)
+
+    async def execute(query):
+        assert query.name == "fc_submit_order"
+        attempts.append(query.params["p_order"]["id"])
+        if outage:
+            raise ConnectionError("database unavailable")
+        written.append(query.params["p_order"])
+        return SimpleNamespace(data={"duplicate": False})
+
+    def worker():
+        queue = OrderQueue(database._submit_order, directory=str(tmp_path), fsync=True, retry_delay=0.01)
+        monkeypatch.setattr(database, "order_queue", queue)
+        return queue
+
+    monkeypatch.setattr(database, "supabase", Client())
+    monkeypatch.setattr(database, "_execute", execute)
+    monkeypatch.setattr(database, "ORDER_SUBMISSION_ENABLED", True)
+    monkeypatch.setattr(database, "CART_PERSISTENCE_ENABLED", False)
+
+    async def checkout_then_crash():
+        crashed = worker()
+        database.start_order_submission()
+        database.add_to_voice_cart("Pad Thai", quantity=2, session_id=session)
+        result = database.checkout_cart(session)
+        await database.sync_orders()
+        await asyncio.sleep(0.05)
+        # Killed before the outage ends: no aclose(), the lock goes with the process
+        crashed._journal.close()
+        return result
+
+    result = asyncio.run(checkout_then_crash())
+    assert result["success"] and attempts and not written
+
+    async def restart():
+        nonlocal outage
+        outage = False
+        restarted = worker()
+        assert database.start_order_submission() == 1
+        assert await database.flush_orders()
+        await restarted.aclose()
+        return restarted
+
+    restarted = asyncio.run(restart())
+    assert [order["order_number"] for order in written] == [result["orderId"]]
+    assert written[0]["total"] == result["total"] and written[0]["items"][0]["quantity"] == 2
+    assert restarted.stats["recovered"] == 1 and restarted.stats["submitted"] == 1
+
+    # Nothing is left to replay on the next start
+    next_start = worker()
+    next_start.open()
+    next_start._journal.close()
+    assert len(next_start) == 0 and len(written) == 1
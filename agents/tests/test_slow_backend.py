@@ -0,0 +1,59 @@
+"""Queries against a slow database must not stall the event loop (user-001)"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import database
+
+LATENCY = 0.2
+CALLS = 8
+
+
+class SlowQuery:
+    """Any PostgREST builder chain; execute() blocks for a slow database round trip"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(LATENCY)
+        return SimpleNamespace(data=None, count=0)
+
+
+class SlowClient:
+    def table(self, name):
+        return SlowQuery()
+
+    def rpc(self, name, params=None):
+        return SlowQuery()
+
+
+def test_tool_calls_overlap_and_the_loop_keeps_beating(monkeypatch):
+    monkeypatch.setattr(database, "supabase", SlowClient())
+    interval = 0.01
+    lags = []
+
+    async def heartbeat(stop):
+        while not stop.is_set():
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            lags.append(time.monotonic() - expected)
+
+    async def run():
+        stop = asyncio.Event()
+        beating = asyncio.create_task(heartbeat(stop))
+        started = time.monotonic()
+        profiles = await asyncio.gather(*(database.get_user_profile(f"profile-{n}") for n in range(CALLS)))
+        wall = time.monotonic() - started
+        stop.set()
+        await beating
+        return profiles, wall
+
+    profiles, wall = asyncio.run(run())
+    assert all(profile["profile"]["spiceLevel"] == "medium" for profile in profiles)
+    # Serial execution would take CALLS * LATENCY
+    assert wall < 2 * LATENCY
+    # The loop kept running while every call waited on the database
+    assert len(lags) >= LATENCY / interval / 2
+    assert max(lags) < LATENCY / 2
@@ -0,0 +1,54 @@
+"""Event-loop watchdog (user-020)"""
+
+import asyncio
+import logging
+import time
+
+from metrics import current_room, timed_tool
+from watchdog import LoopWatchdog
+
+
+def _block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+def _watch(work):
+    async def run():
+        watchdog = LoopWatchdog(interval=0.01, threshold=0.05)
+        watchdog.start()
+        try:
+            await work()
+            # Give the monitor a few beats to see the loop recover
+            await asyncio.sleep(0.1)
+        finally:
+            watchdog.stop()
+        return watchdog.stats
+
+    return asyncio.run(run())
+
+
+def test_blocking_tool_is_reported_with_tool_room_and_stack(caplog):
+    @timed_tool("quick_checkout")
+    async def tool():
+        _block_the_loop(0.3)
+
+    async def work():
+        current_room.set("room-blocked")
+        await tool()
+
+    with caplog.at_level(logging.WARNING, logger="food-concierge-agentserver"):
+        stats = _watch(work)
+
+    assert stats["stalls"] == 1 and stats["maxStallMs"] >= 200
+    blocked, recovered = [record.getMessage() for record in caplog.records]
+    assert "tool=quick_checkout, room=room-blocked" in blocked
+    assert "_block_the_loop" in blocked
+    assert "recovered" in recovered and "tool=quick_checkout" in recovered
+
+
+def test_awaiting_work_is_not_a_stall():
+    async def work():
+        await asyncio.gather(*(asyncio.sleep(0.02) for _ in range(50)))
+        await asyncio.to_thread(time.sleep, 0.3)
+
+    assert _watch(work)["stalls"] == 0
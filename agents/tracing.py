@@ -0,0 +1,165 @@
+"""
+Turn-level tracing for the Food Concierge agent (OpenTelemetry)
+Every user turn becomes one trace: a root "turn" span opened when the user's
+speech is committed and closed when the agent's answer is committed. Function
+tools, Supabase queries, Pexels fetches and data-channel publishes open child
+spans, and the STT / LLM / TTS timings from metrics_collected are added as
+spans too, so a slow answer can be attributed to the LLM, the database, Pexels
+or the network from the trace alone.
+
+Tool and publish tasks are spawned by the framework, not by the speech event
+handler, so the turn span is looked up per room (current_room) rather than
+inherited through the OpenTelemetry context.
+
+opentelemetry-sdk is optional: without it (or with TRACING_EXPORTER=none, the
+default) every helper here is a cheap no-op.
+"""
+
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from metrics import current_room, current_tool
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+# "otlp" (collector at OTEL_EXPORTER_OTLP_ENDPOINT, default localhost:4317),
+# "file" (one JSON span per line in TRACING_FILE) or "none"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "food-concierge-agent")
+TRACING_ENABLED = OTEL_AVAILABLE and TRACING_EXPORTER in ("otlp", "file")
+
+# Open turn span per room
+_turns: Dict[str, Any] = {}
+_tracer: Any = None
+
+
+def setup_tracing() -> bool:
+    """Install the tracer provider for this process (idempotent)"""
+    global _tracer
+    if not TRACING_ENABLED or _tracer is not None:
+        return _tracer is not None
+
+    if TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("⚠️ TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp, tracing disabled")
+            return False
+        exporter = OTLPSpanExporter()
+        target = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4317")
+    else:
+        # Line-buffered so spans survive a killed worker process
+        out = open(TRACING_FILE, "a", buffering=1)
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        target = TRACING_FILE
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("food-concierge")
+    print(f"🧭 Tracing enabled ({TRACING_EXPORTER}): {target}")
+    return True
+
+
+def start_turn(room: str, transcript: str) -> None:
+    """Open the root span for a new user turn, closing the previous one"""
+    if _tracer is None:
+        return
+    end_turn(room)
+    _turns[room] = _tracer.start_span(
+        "turn",
+        context=trace.set_span_in_context(trace.INVALID_SPAN),
+        attributes={"room": room, "user.transcript": transcript[:200], "user.transcript_chars": len(transcript)},
+    )
+
+
+def end_turn(room: str, response: Optional[str] = None) -> None:
+    """Close the room's open turn span (agent answered, or the session ended)"""
+    turn = _turns.pop(room, None)
+    if turn is None:
+        return
+    if response is not None:
+        turn.set_attribute("agent.response_chars", len(response))
+    turn.end()
+
+
+def add_turn_event(name: str, **attributes: Any) -> None:
+    """Mark a point in the current room's turn (e.g. the LLM requesting tools)"""
+    turn = _turns.get(current_room.get() or "")
+    if turn is not None:
+        turn.add_event(name, attributes=attributes)
+
+
+def _parent_context() -> Any:
+    """Enclosing live span if there is one, else the room's turn span"""
+    active = trace.get_current_span()
+    if active.is_recording():
+        return None
+    turn = _turns.get(current_room.get() or "")
+    return trace.set_span_in_context(turn) if turn is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Child span of the current turn; exceptions are recorded on it and re-raised"""
+    if _tracer is None:
+        yield None
+        return
+    tool = current_tool.get()
+    if tool:
+        attributes.setdefault("tool", tool)
+    with _tracer.start_as_current_span(name, context=_parent_context(), attributes=attributes) as current:
+        yield current
+
+
+def traced_tool(name: str) -> Callable:
+    """Decorator for function tools: one span per tool execution (place under @timed_tool)"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(f"tool {name}", tool=name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_pipeline_spans(metrics: Any) -> None:
+    """
+    Add the STT / LLM / TTS phases reported by metrics_collected to the room's
+    turn as spans, back-dated from the metric's end timestamp and duration
+    """
+    if _tracer is None:
+        return
+    turn = _turns.get(current_room.get() or "")
+    duration = getattr(metrics, "duration", None)
+    if turn is None or not isinstance(duration, (int, float)) or duration <= 0:
+        return
+    phase = {"STTMetrics": "stt", "LLMMetrics": "llm", "TTSMetrics": "tts"}.get(type(metrics).__name__)
+    if phase is None:
+        return
+
+    ended = getattr(metrics, "timestamp", None)
+    end_ns = int(ended * 1e9) if isinstance(ended, (int, float)) else time.time_ns()
+    attributes: Dict[str, Any] = {}
+    for key in ("ttft", "ttfb", "prompt_tokens", "completion_tokens", "characters_count", "audio_duration"):
+        value = getattr(metrics, key, None)
+        if isinstance(value, (int, float)):
+            attributes[key] = value
+    phase_span = _tracer.start_span(
+        phase,
+        context=trace.set_span_in_context(turn),
+        start_time=end_ns - int(duration * 1e9),
+        attributes=attributes,
+    )
+    phase_span.end(end_time=end_ns)
@@ -0,0 +1,279 @@
+"""
+Compact in-memory voice cart
+Lines are __slots__ objects kept in an insertion-ordered dict keyed by the
+normalized item name, so finding, merging, updating and removing a line is
+O(1), and the subtotal, quantity and per-restaurant delivery fees are kept as
+running totals (in cents, so repeated updates never drift). The dict shape the
+frontend, the LLM and cart persistence expect is only built by to_dict().
+
+database.py owns the session store and pricing; this module is pure data.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from catalog import normalize_name
+
+# Flat demo prices, used for items the catalog cannot price
+UNPRICED_ITEM_PRICE = 8.99
+UNPRICED_DELIVERY_FEE = 2.99
+
+# Line ids minted by VoiceCart.add ("item-3")
+_LINE_ID_RE = re.compile(r"^item-(\d+)$")
+
+
+def to_cents(amount: Optional[float]) -> int:
+    return int(round((amount or 0) * 100))
+
+
+class CartLine:
+    """
+    One cart line; restaurant_id / delivery_fee are set for catalog-priced items.
+    Change quantities through VoiceCart, which keeps totals and the cached
+    serialized form in step.
+    """
+
+    __slots__ = (
+        "id", "menu_item_id", "name", "quantity", "price_cents",
+        "restaurant_id", "restaurant_name", "delivery_fee_cents", "_dict",
+    )
+
+    def __init__(
+        self,
+        line_id: str,
+        menu_item_id: str,
+        name: str,
+        quantity: int,
+        price_cents: int,
+        restaurant_id: Optional[str] = None,
+        restaurant_name: Optional[str] = None,
+        delivery_fee_cents: Optional[int] = None,
+    ) -> None:
+        self.id = line_id
+        self.menu_item_id = menu_item_id
+        self.name = name
+        self.quantity = quantity
+        self.price_cents = price_cents
+        self.restaurant_id = restaurant_id
+        self.restaurant_name = restaurant_name
+        self.delivery_fee_cents = delivery_fee_cents
+        self._dict: Optional[Dict[str, Any]] = None
+
+    @property
+    def base_price(self) -> float:
+        return self.price_cents / 100
+
+    @property
+    def total_price(self) -> float:
+        return self.price_cents * self.quantity / 100
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialized line, rebuilt only after a change (treat the result as read-only)"""
+        if self._dict is not None:
+            return self._dict
+        if self.restaurant_id:
+            restaurant = {"id": self.restaurant_id, "name": self.restaurant_name, "deliveryFee": self.delivery_fee_cents / 100}
+        else:
+            restaurant = {"name": self.restaurant_name}
+        self._dict = {
+            "id": self.id,
+            "menuItemId": self.menu_item_id,
+            "name": self.name,
+            "quantity": self.quantity,
+            "basePrice": self.base_price,
+            "totalPrice": self.total_price,
+            "options": [],
+            "restaurant": restaurant,
+        }
+        return self._dict
+
+
+class VoiceCart:
+    """
+    A session's cart. The delivery fee is one fee per restaurant with priced
+    lines; carts with no priced line use base_delivery_fee. restaurant_* are
+    the cart-level fallbacks shown until a priced line names the restaurant.
+    """
+
+    __slots__ = (
+        "restaurant_id", "restaurant_slug", "restaurant_name", "base_delivery_fee_cents",
+        "_lines", "_next_line", "_subtotal_cents", "_quantity", "_restaurant_lines", "_restaurant_slugs",
+    )
+
+    def __init__(
+        self,
+        restaurant_name: str = "Restaurant",
+        restaurant_id: str = "mock-restaurant-id",
+        restaurant_slug: str = "mock-restaurant",
+        base_delivery_fee: float = UNPRICED_DELIVERY_FEE,
+    ) -> None:
+        self.restaurant_id = restaurant_id
+        self.restaurant_slug = restaurant_slug
+        self.restaurant_name = restaurant_name
+        self.base_delivery_fee_cents = to_cents(base_delivery_fee)
+        self._lines: Dict[str, CartLine] = {}
+        self._next_line = 0
+        self._subtotal_cents = 0
+        self._quantity = 0
+        # restaurant id -> [priced line count, delivery fee cents]
+        self._restaurant_lines: Dict[str, List[int]] = {}
+        self._restaurant_slugs: Dict[str, Optional[str]] = {}
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def find(self, name: str) -> Optional[CartLine]:
+        """Line whose name matches ignoring case and punctuation"""
+        return self._lines.get(normalize_name(name))
+
+    def names(self) -> List[str]:
+        return [line.name for line in self._lines.values()]
+
+    def restaurant_ids(self) -> List[str]:
+        """Restaurants with priced lines, in the order they entered the cart"""
+        return list(self._restaurant_lines)
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(self._lines.values())
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        name: str,
+        quantity: int,
+        base_price: float = UNPRICED_ITEM_PRICE,
+        *,
+        menu_item_id: Optional[str] = None,
+        restaurant_id: Optional[str] = None,
+        restaurant_slug: Optional[str] = None,
+        restaurant_name: Optional[str] = None,
+        delivery_fee: Optional[float] = None,
+        line_id: Optional[str] = None,
+    ) -> CartLine:
+        """Add quantity of an item, merging into an existing line with the same name"""
+        key = normalize_name(name)
+        line = self._lines.get(key)
+        if line is not None:
+            self.set_quantity(line, line.quantity + quantity)
+            return line
+
+        index = self._next_line
+        self._next_line += 1
+        if line_id:
+            # Restored lines keep their persisted id; new lines must never reuse it
+            minted = _LINE_ID_RE.match(line_id)
+            if minted:
+                self._next_line = max(self._next_line, int(minted.group(1)) + 1)
+        line = CartLine(
+            line_id or f"item-{index}",
+            menu_item_id or f"menu-{index}",
+            name,
+            quantity,
+            to_cents(base_price),
+            restaurant_id,
+            restaurant_name or self.restaurant_name,
+            to_cents(delivery_fee) if restaurant_id else None,
+        )
+        self._lines[key] = line
+        self._subtotal_cents += line.price_cents * quantity
+        self._quantity += quantity
+        if restaurant_id:
+            counted = self._restaurant_lines.setdefault(restaurant_id, [0, line.delivery_fee_cents])
+            counted[0] += 1
+            self._restaurant_slugs.setdefault(restaurant_id, restaurant_slug)
+        return line
+
+    def set_quantity(self, line: CartLine, quantity: int) -> None:
+        """Change a line's quantity; 0 or less removes it"""
+        if quantity <= 0:
+            self.remove(line)
+            return
+        self._subtotal_cents += line.price_cents * (quantity - line.quantity)
+        self._quantity += quantity - line.quantity
+        line.quantity = quantity
+        line._dict = None
+
+    def remove(self, line: CartLine) -> None:
+        if self._lines.pop(normalize_name(line.name), None) is None:
+            return
+        self._subtotal_cents -= line.price_cents * line.quantity
+        self._quantity -= line.quantity
+        if line.restaurant_id:
+            counted = self._restaurant_lines[line.restaurant_id]
+            counted[0] -= 1
+            if not counted[0]:
+                # The restaurant's last line is gone, and with it its delivery fee
+                del self._restaurant_lines[line.restaurant_id]
+                self._restaurant_slugs.pop(line.restaurant_id, None)
+
+    def copy(self) -> "VoiceCart":
+        """Independent copy, for applying a batch of changes all-or-nothing"""
+        clone = VoiceCart(self.restaurant_name, self.restaurant_id, self.restaurant_slug)
+        clone.base_delivery_fee_cents = self.base_delivery_fee_cents
+        for key, line in self._lines.items():
+            copied = CartLine(
+                line.id, line.menu_item_id, line.name, line.quantity, line.price_cents,
+                line.restaurant_id, line.restaurant_name, line.delivery_fee_cents,
+            )
+            # Serialized lines are never mutated in place, so the cache can be shared
+            copied._dict = line._dict
+            clone._lines[key] = copied
+        clone._next_line = self._next_line
+        clone._subtotal_cents = self._subtotal_cents
+        clone._quantity = self._quantity
+        clone._restaurant_lines = {restaurant_id: list(counted) for restaurant_id, counted in self._restaurant_lines.items()}
+        clone._restaurant_slugs = dict(self._restaurant_slugs)
+        return clone
+
+    # ------------------------------------------------------------------
+    # Totals
+    # ------------------------------------------------------------------
+
+    @property
+    def subtotal(self) -> float:
+        return self._subtotal_cents / 100
+
+    @property
+    def delivery_fee(self) -> float:
+        if not self._restaurant_lines:
+            return self.base_delivery_fee_cents / 100
+        return sum(fee for _, fee in self._restaurant_lines.values()) / 100
+
+    @property
+    def total(self) -> float:
+        return round(self.subtotal + self.delivery_fee, 2)
+
+    @property
+    def quantity(self) -> int:
+        return self._quantity
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The voice cart shape published to the frontend (matches voice-chat/tools.ts voiceCart)"""
+        restaurant_id, restaurant_slug, restaurant_name = self.restaurant_id, self.restaurant_slug, self.restaurant_name
+        if self._restaurant_lines:
+            # The cart's restaurant is the first priced line's restaurant
+            restaurant_id = next(iter(self._restaurant_lines))
+            restaurant_slug = self._restaurant_slugs.get(restaurant_id) or restaurant_slug
+            restaurant_name = next(line.restaurant_name for line in self._lines.values() if line.restaurant_id == restaurant_id)
+        return {
+            "id": "cart-voice",
+            "restaurantId": restaurant_id,
+            "restaurantSlug": restaurant_slug,
+            "restaurantName": restaurant_name,
+            "status": "active",
+            "subtotal": self.subtotal,
+            "deliveryFee": self.delivery_fee,
+            "total": self.total,
+            "items": [line.to_dict() for line in self._lines.values()],
+        }
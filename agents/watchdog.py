@@ -0,0 +1,145 @@
+"""
+Event-loop watchdog for the agent worker
+Synchronous work on the event loop (a blocking query, a burst of debug
+prints, json.dumps of a large menu) delays STT, TTS and avatar frames, which
+users hear as stutter. The watchdog makes such stalls visible in production:
+
+- a heartbeat task on the loop measures scheduling lag (LOOP_LAG histogram)
+- a monitor thread notices when the heartbeat stops for longer than
+  WATCHDOG_STALL_THRESHOLD_SECONDS, captures the stack of the loop thread
+  while it is still stuck, and logs it with the running tool and room
+- when the loop recovers, the stall duration is recorded per tool
+  (LOOP_STALL_DURATION) with the room as exemplar
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import LOOP_LAG, LOOP_STALL_DURATION, active_tools, observe
+
+logger = logging.getLogger("food-concierge-agentserver")
+
+WATCHDOG_ENABLED = os.getenv("WATCHDOG_ENABLED", "true").lower() == "true"
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL_SECONDS", "0.05"))
+WATCHDOG_STALL_THRESHOLD = float(os.getenv("WATCHDOG_STALL_THRESHOLD_SECONDS", "0.1"))
+WATCHDOG_STACK_DEPTH = int(os.getenv("WATCHDOG_STACK_DEPTH", "25"))
+
+
+class LoopWatchdog:
+    """
+    Watches one event loop. start() must be called from a coroutine running
+    on that loop; stop() cancels the heartbeat and ends the monitor thread.
+    """
+
+    def __init__(self, *, interval: float = WATCHDOG_INTERVAL, threshold: float = WATCHDOG_STALL_THRESHOLD, stack_depth: int = WATCHDOG_STACK_DEPTH) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._beat = time.monotonic()
+        # Stall in progress: (started, tool, room, stack) captured by the monitor thread
+        self._stall: Optional[Tuple[float, str, Optional[str], List[str]]] = None
+        self.stats = {"stalls": 0, "maxLagMs": 0.0, "maxStallMs": 0.0}
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        self._monitor = threading.Thread(target=self._run_monitor, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+        logger.info(f"🐕 Loop watchdog started (stall threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        logger.info(f"🐕 Loop watchdog stopped: {self.stats}")
+
+    async def _run_heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            observe(LOOP_LAG, lag)
+            self.stats["maxLagMs"] = max(self.stats["maxLagMs"], round(lag * 1000, 1))
+
+    def _run_monitor(self) -> None:
+        while not self._stopped.wait(self.interval):
+            # Beat time is read once so both checks below see the same value
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if self._stall is None and blocked > self.threshold:
+                self._stall = (beat + self.interval, *self._blocked_work(), self._capture_stack())
+                _, tool, room, stack = self._stall
+                logger.warning(
+                    f"🐢 Event loop blocked for {blocked * 1000:.0f}ms+ (tool={tool}, room={room})\n"
+                    + "".join(stack)
+                )
+            elif self._stall is not None and blocked <= self.threshold:
+                self._finish_stall(beat)
+
+    def _blocked_work(self) -> Tuple[str, Optional[str]]:
+        """Tool and room of the task that is hogging the loop, if it is a tool"""
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            task = None
+        return active_tools.get(task, ("none", None)) if task is not None else ("none", None)
+
+    def _capture_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return traceback.format_stack(frame, limit=self.stack_depth)
+
+    def _finish_stall(self, recovered: float) -> None:
+        started, tool, room, _ = self._stall
+        self._stall = None
+        duration = max(0.0, recovered - started)
+        self.stats["stalls"] += 1
+        self.stats["maxStallMs"] = max(self.stats["maxStallMs"], round(duration * 1000, 1))
+        observe(LOOP_STALL_DURATION, duration, exemplar_room=room, tool=tool)
+        logger.warning(f"🐢 Event loop recovered after {duration * 1000:.0f}ms (tool={tool}, room={room})")
+
+
+# One watchdog per event loop (several rooms can share a job process loop)
+_watchdogs: Dict[int, LoopWatchdog] = {}
+
+
+def start_watchdog() -> Optional[LoopWatchdog]:
+    """Start watching the running loop (idempotent); None when disabled"""
+    if not WATCHDOG_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    watchdog = _watchdogs.get(id(loop))
+    if watchdog is None or watchdog.loop is not loop:
+        watchdog = LoopWatchdog()
+        watchdog.start()
+        _watchdogs[id(loop)] = watchdog
+    return watchdog
+
+
+def stop_watchdog() -> None:
+    """Stop the running loop's watchdog, e.g. once its last session ended"""
+    watchdog = _watchdogs.pop(id(asyncio.get_running_loop()), None)
+    if watchdog is not None:
+        watchdog.stop()
+
+
+def watchdog_stats() -> Dict[str, Any]:
+    """Stall counters of the running loop's watchdog"""
+    watchdog = _watchdogs.get(id(asyncio.get_running_loop()))
+    return dict(watchdog.stats) if watchdog else {}
@@ -0,0 +1,128 @@
+"""
+Compact wire format for agent -> frontend data-channel payloads
+Opt-in, negotiated per session: the agent announces what it supports in a
+server_hello and the frontend answers with a client_hello listing what it
+can decode. Until then everything is sent as plain tool_call JSON.
+
+- "deflate-json": packets above a size threshold are zlib-compressed JSON
+  prefixed with a marker byte (browsers inflate with DecompressionStream)
+- "cart_delta": cart tools send only changed cart lines plus totals
+- "menu_chunks": restaurant menus are streamed one section per message with
+  a sequence number and a final menu_complete marker
+"""
+
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+ENCODING_DEFLATE = "deflate-json"
+FEATURE_CART_DELTA = "cart_delta"
+FEATURE_MENU_CHUNKS = "menu_chunks"
+
+SUPPORTED_ENCODINGS = [ENCODING_DEFLATE]
+SUPPORTED_FEATURES = [FEATURE_CART_DELTA, FEATURE_MENU_CHUNKS]
+
+# First byte of a compressed packet; plain JSON packets always start with "{"
+COMPRESSED_MARKER = b"\x01"
+COMPRESS_MIN_BYTES = int(os.getenv("DATA_COMPRESS_MIN_BYTES", "512"))
+COMPRESS_LEVEL = int(os.getenv("DATA_COMPRESS_LEVEL", "6"))
+
+
+def server_hello() -> Dict[str, Any]:
+    """Capabilities announced to the frontend once the agent is connected"""
+    return {
+        "type": "server_hello",
+        "encodings": SUPPORTED_ENCODINGS,
+        "features": SUPPORTED_FEATURES,
+    }
+
+
+def compress_packet(packet: bytes, min_bytes: int = COMPRESS_MIN_BYTES) -> bytes:
+    """Deflate a JSON packet if it is large enough for compression to pay off"""
+    if len(packet) < min_bytes:
+        return packet
+    compressed = zlib.compress(packet, COMPRESS_LEVEL)
+    if len(compressed) + 1 >= len(packet):
+        return packet
+    return COMPRESSED_MARKER + compressed
+
+
+def decompress_packet(packet: bytes) -> bytes:
+    """Inverse of compress_packet (for tooling and tests)"""
+    if packet[:1] == COMPRESSED_MARKER:
+        return zlib.decompress(packet[1:])
+    return packet
+
+
+class CartDeltaEncoder:
+    """
+    Turns cart tool results into cart_delta messages against the last cart
+    sent to this session's frontend. Lines are keyed by their cart line id.
+    The frontend echoes `base` back in a cart_resync request if it missed a
+    version, and reset() makes the next message a full snapshot.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._lines: Dict[str, Dict[str, Any]] = {}
+        self._has_base = False
+
+    def reset(self) -> None:
+        self._lines = {}
+        self._has_base = False
+
+    def encode(self, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a cart_delta message; the rest of the tool result is sent as-is"""
+        cart = result.get("cart")
+        base = self.version if self._has_base else None
+        self.version += 1
+
+        delta: Dict[str, Any] = {"version": self.version, "base": base}
+        if not cart:
+            delta["cleared"] = True
+            self._lines = {}
+        else:
+            lines = {line["id"]: line for line in cart.get("items", [])}
+            delta["meta"] = {key: value for key, value in cart.items() if key != "items"}
+            delta["upsert"] = [line for line_id, line in lines.items() if self._lines.get(line_id) != line]
+            delta["remove"] = [line_id for line_id in self._lines if line_id not in lines]
+            delta["order"] = list(lines)
+            # Copy so later in-place edits of the cart still register as changes
+            self._lines = {line_id: dict(line) for line_id, line in lines.items()}
+        self._has_base = True
+
+        return {
+            "type": "cart_delta",
+            "tool_name": tool_name,
+            "result": {key: value for key, value in result.items() if key != "cart"},
+            "cart": delta,
+        }
+
+
+def menu_chunk(tool_name: str, stream_id: str, seq: int, header: Optional[Dict[str, Any]] = None, section: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    One piece of a streamed menu: seq 0 carries the header (restaurant,
+    speech summary), seq 1..n carry one section each
+    """
+    message: Dict[str, Any] = {"type": "menu_chunk", "tool_name": tool_name, "stream_id": stream_id, "seq": seq}
+    if header is not None:
+        message["header"] = header
+    if section is not None:
+        message["section"] = section
+    return message
+
+
+def menu_complete(tool_name: str, stream_id: str, total: int) -> Dict[str, Any]:
+    """Final marker of a streamed menu; total is the number of sections sent"""
+    return {"type": "menu_complete", "tool_name": tool_name, "stream_id": stream_id, "total": total}
+
+
+def negotiate(hello: Dict[str, Any]) -> Dict[str, bool]:
+    """Options both sides support, from a client_hello message"""
+    encodings = set(hello.get("encodings") or [])
+    features = set(hello.get("features") or [])
+    return {
+        "compress": ENCODING_DEFLATE in encodings,
+        "cart_delta": FEATURE_CART_DELTA in features,
+        "menu_chunks": FEATURE_MENU_CHUNKS in features,
+    }
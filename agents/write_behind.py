@@ -0,0 +1,134 @@
+"""
+Write-behind queue for state that lives in memory but must survive restarts
+Callers put() the latest value for a key on the hot path (no I/O, no await);
+a background task writes dirty keys in batches after a short coalescing delay,
+so a burst of changes to one key costs a single write of its final value.
+flush() forces specific keys (or everything) out immediately, e.g. at session
+end or checkout. Failed batches are requeued unless a newer value arrived.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger("food-concierge-agentserver")
+
+WRITE_BEHIND_DELAY = float(os.getenv("CART_FLUSH_DELAY_SECONDS", "0.5"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("CART_FLUSH_MAX_BATCH", "50"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("CART_FLUSH_MAX_BACKOFF_SECONDS", "30"))
+
+
+class WriteBehindQueue:
+    """
+    Coalescing, batching write-behind buffer.
+    write(batch) receives {key: value} and must persist all of it or raise.
+    Writes are serialized, so a flush never races a background batch.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Dict[Hashable, Any]], Awaitable[None]],
+        *,
+        delay: float = WRITE_BEHIND_DELAY,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        max_backoff: float = WRITE_BEHIND_MAX_BACKOFF,
+    ) -> None:
+        self._write = write
+        self.delay = delay
+        self.max_batch = max(1, max_batch)
+        self.max_backoff = max_backoff
+        self._pending: Dict[Hashable, Any] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self.stats = {"puts": 0, "writes": 0, "batches": 0, "failures": 0}
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Record the latest value for key; it is written within `delay` seconds"""
+        # Re-inserting keeps pending keys in order of their last change
+        self._pending.pop(key, None)
+        self._pending[key] = value
+        self.stats["puts"] += 1
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (scripts, prewarm thread): written by the next flush()
+            return
+        self._ensure_started()
+        self._wake.set()
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await asyncio.sleep(self.delay)
+            while self._pending:
+                async with self._lock:
+                    written = await self._write_batch(list(self._pending)[:self.max_batch])
+                if not written:
+                    # Back off, then retry whatever is still dirty
+                    await asyncio.sleep(min(self.max_backoff, self.delay * (2 ** min(self._failures, 10))))
+
+    async def _write_batch(self, keys: list) -> bool:
+        """Write the pending values of keys (caller holds the lock)"""
+        batch = {key: self._pending.pop(key) for key in keys if key in self._pending}
+        if not batch:
+            return True
+        try:
+            await self._write(batch)
+        except Exception as e:
+            self._failures += 1
+            self.stats["failures"] += 1
+            logger.error(f"   ⚠️ Write-behind batch of {len(batch)} failed (attempt {self._failures}): {e}")
+            # Requeue ahead of later changes so keys are still written in the
+            # order they were put; keep a newer value if one was put while writing
+            requeued = {key: value for key, value in batch.items() if key not in self._pending}
+            self._pending = {**requeued, **self._pending}
+            return False
+        self._failures = 0
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(batch)
+        return True
+
+    def discard(self, key: Hashable) -> None:
+        """Drop key's pending value without writing it (superseded by another key)"""
+        self._pending.pop(key, None)
+
+    def pending(self) -> list:
+        """Keys waiting to be written, oldest change first"""
+        return list(self._pending)
+
+    async def flush(self, *keys: Hashable) -> bool:
+        """Write the given keys (all pending keys if none) now; False if the write failed"""
+        if self._lock is None and not self._pending:
+            return True
+        self._ensure_started()
+        # Holding the lock also waits out a background batch already writing these keys
+        async with self._lock:
+            targets = [key for key in keys if key in self._pending] if keys else list(self._pending)
+            for start in range(0, len(targets), self.max_batch):
+                if not await self._write_batch(targets[start:start + self.max_batch]):
+                    # Requeued; the background writer retries it with backoff
+                    self._wake.set()
+                    return False
+        return True
+
+    async def aclose(self) -> None:
+        """Flush everything, then stop the background writer"""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
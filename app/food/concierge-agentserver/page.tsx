@@ -104,6 +104,103 @@ type OrderSummary = {
   items?: OrderItemSummary[];
 };
 
+type ImageUpdate = {
+  tool_name: string;
+  id: string;
+  field: string;
+  image: string;
+};
+
+// Patch a late-arriving image (deferred enrichment) into an earlier tool result
+function applyImageUpdate(msg: ChatMessage, update: ImageUpdate): ChatMessage {
+  if (msg.toolName !== update.tool_name || !msg.toolResult) {
+    return msg;
+  }
+  const listKey = Array.isArray(msg.toolResult.results) ? 'results' : 'restaurants';
+  const rows = msg.toolResult[listKey];
+  if (!Array.isArray(rows) || !rows.some((row: any) => row?.id === update.id)) {
+    return msg;
+  }
+  return {
+    ...msg,
+    toolResult: {
+      ...msg.toolResult,
+      [listKey]: rows.map((row: any) => (
+        row?.id === update.id ? { ...row, [update.field]: update.image } : row
+      )),
+    },
+  };
+}
+
+// Compact wire format negotiated with the Python agent (agents/wire_format.py)
+const COMPRESSED_MARKER = 0x01;
+const WIRE_FEATURES = ['cart_delta', 'menu_chunks'];
+
+function supportedWireEncodings(): string[] {
+  return typeof DecompressionStream !== 'undefined' ? ['deflate-json'] : [];
+}
+
+// Compressed packets are a marker byte followed by zlib-deflated JSON
+async function decodeAgentPayload(payload: Uint8Array): Promise<string> {
+  if (payload[0] !== COMPRESSED_MARKER) {
+    return new TextDecoder().decode(payload);
+  }
+  const stream = new Blob([payload.slice(1)]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Response(stream).text();
+}
+
+type CartDeltaState = {
+  version: number;
+  meta: any;
+  lines: Map<string, any>;
+};
+
+// Rebuild the full cart from a cart_delta; null means a version was missed
+function applyCartDelta(state: CartDeltaState | null, delta: any): { state: CartDeltaState; cart: any } | null {
+  const isSnapshot = delta.base === null || delta.base === undefined;
+  if (!isSnapshot && state?.version !== delta.base) {
+    return null;
+  }
+  if (delta.cleared) {
+    return { state: { version: delta.version, meta: null, lines: new Map() }, cart: null };
+  }
+  const lines = new Map<string, any>(isSnapshot || !state ? [] : state.lines);
+  (delta.upsert || []).forEach((line: any) => lines.set(line.id, line));
+  (delta.remove || []).forEach((id: string) => lines.delete(id));
+  const items = (delta.order || []).map((id: string) => lines.get(id)).filter(Boolean);
+  return {
+    state: { version: delta.version, meta: delta.meta, lines },
+    cart: { ...delta.meta, items },
+  };
+}
+
+type MenuStreamUpdate = {
+  streamId: string;
+  seq?: number;
+  section?: any;
+  complete?: boolean;
+  total?: number;
+};
+
+// Patch a streamed menu section (or the completion marker) into its menu card
+function applyMenuStreamUpdate(msg: ChatMessage, update: MenuStreamUpdate): ChatMessage {
+  if (!msg.toolResult || msg.toolResult.streamId !== update.streamId) {
+    return msg;
+  }
+  const sections = [...(msg.toolResult.sections || [])];
+  if (update.section && update.seq) {
+    sections[update.seq - 1] = update.section;
+  }
+  return {
+    ...msg,
+    toolResult: {
+      ...msg.toolResult,
+      sections: update.complete ? sections.slice(0, update.total ?? sections.length) : sections,
+      streaming: !update.complete,
+    },
+  };
+}
+
 // Render tool output cards
 function renderToolOutput(toolName: string, payload: any) {
   if (!payload || typeof payload !== 'object') {
@@ -243,6 +340,7 @@ function renderToolOutput(toolName: string, payload: any) {
     
     case 'updateCartQuantity':
     case 'update_cart_quantity':
+    case 'update_cart':
       // Handle quantity update - show updated cart or empty message
       if (!payload || payload.success === false) {
         return <div className="text-xs text-red-500">{payload?.message || 'Unable to update cart quantity.'}</div>;
@@ -639,6 +737,12 @@ export default function AgentServerConcierge() {
                   }]);
                 }
               }}
+              onImageUpdate={(update) => {
+                setMessages(prev => prev.map(msg => applyImageUpdate(msg, update)));
+              }}
+              onMenuStreamUpdate={(update) => {
+                setMessages(prev => prev.map(msg => applyMenuStreamUpdate(msg, update)));
+              }}
               onAgentLog={(log) => {
                 setAgentLogs(prev => [...prev, log]);
               }}
@@ -873,11 +977,15 @@ export default function AgentServerConcierge() {
 function VoiceAssistantControls({ 
   onDisconnect, 
   onMessage,
+  onImageUpdate,
+  onMenuStreamUpdate,
   onAgentLog,
   onCartUpdate
 }: { 
   onDisconnect: () => void;
   onMessage: (msg: ChatMessage) => void;
+  onImageUpdate: (update: ImageUpdate) => void;
+  onMenuStreamUpdate: (update: MenuStreamUpdate) => void;
   onAgentLog: (log: { type: 'user_said' | 'agent_saying' | 'tool_called' | 'tool_result' | 'info' | 'error'; message: string; timestamp: number; details?: any }) => void;
   onCartUpdate: (count: number) => void;
 }) {
@@ -894,6 +1002,7 @@ function VoiceAssistantControls({
   const [agentError, setAgentError] = React.useState<{type: string, message: string, timestamp: number} | null>(null);
   const [showAvatar, setShowAvatar] = React.useState(false); // Start with avatar hidden for demos
   const hasAutoEnabledMic = React.useRef(false); // Track if we've already auto-enabled mic once
+  const cartStateRef = React.useRef<CartDeltaState | null>(null); // Last cart rebuilt from cart_delta messages
 
   const micTrack = localParticipant?.getTrackPublication(Track.Source.Microphone)?.track;
   
@@ -984,76 +1093,131 @@ function VoiceAssistantControls({
 
     console.log('[AGENTSERVER] 📡 Setting up data message listener...');
 
-    const handleData = (payload: Uint8Array, participant?: any) => {
-      try {
-        const text = new TextDecoder().decode(payload);
-        console.log('[AGENTSERVER] 📩 Received data message:', text);
-        const data = JSON.parse(text);
-        
-        // Handle different message types from the Python agent
-        if (data.type === 'user_transcript') {
-          console.log('[AGENTSERVER] 🎤 User transcript:', data.text, '(final:', data.is_final, ')');
-          setUserTranscript(data.text);
-          if (data.is_final) {
-            onMessage({ role: 'user', content: data.text });
-            setTimeout(() => setUserTranscript(''), 500);
-          }
-        } else if (data.type === 'agent_transcript' || data.type === 'agent_response') {
-          console.log('[AGENTSERVER] 🗣️ Agent response:', data.text, '(final:', data.is_final, ')');
-          setAgentTranscript(data.text);
-          if (data.is_final) {
-            onMessage({ role: 'assistant', content: data.text });
-            setTimeout(() => setAgentTranscript(''), 500);
-          }
-        } else if (data.type === 'agent_error') {
-          console.error('[AGENTSERVER] ❌ Agent error received:', data);
-          setAgentError({
-            type: data.error_type || 'Unknown Error',
-            message: data.error_message || 'An unknown error occurred',
-            timestamp: data.timestamp || Date.now()
-          });
-          
-          onMessage({ 
-            role: 'assistant', 
-            content: `⚠️ Agent Error (${data.error_type || 'Unknown'}): ${data.error_message || 'The agent encountered an error. Please check logs.'}` 
-          });
-        } else if (data.type === 'tool_call') {
-          console.log('[AGENTSERVER] 🔧 Tool call:', data.tool_name);
-          onMessage({ 
-            role: 'assistant', 
-            content: `Executing: ${data.tool_name}`,
-            toolName: data.tool_name,
-            toolResult: data.result 
+    const sendToAgent = (message: any) => {
+      room.localParticipant
+        .publishData(new TextEncoder().encode(JSON.stringify(message)), { reliable: true })
+        .catch((err) => console.warn('[AGENTSERVER] ⚠️ Failed to send to agent:', err));
+    };
+
+    const handleMessage = (data: any) => {
+      // Handle different message types from the Python agent
+      if (data.type === 'server_hello') {
+        // Negotiate compact payloads; cart/menu state restarts from full snapshots
+        cartStateRef.current = null;
+        sendToAgent({ type: 'client_hello', encodings: supportedWireEncodings(), features: WIRE_FEATURES });
+      } else if (data.type === 'cart_delta') {
+        const applied = applyCartDelta(cartStateRef.current, data.cart);
+        if (!applied) {
+          console.warn('[AGENTSERVER] 🛒 Missed cart version, requesting resync');
+          cartStateRef.current = null;
+          sendToAgent({ type: 'cart_resync' });
+          return;
+        }
+        cartStateRef.current = applied.state;
+        if (!applied.cart?.items?.length) {
+          // Emptied or cleared cart: the tool_call branch below only counts carts with items
+          onCartUpdate(0);
+        }
+        handleMessage({ type: 'tool_call', tool_name: data.tool_name, result: { ...data.result, cart: applied.cart } });
+      } else if (data.type === 'menu_chunk') {
+        // Streamed menu: the header opens the card, each section is appended as it arrives
+        if (data.header) {
+          handleMessage({
+            type: 'tool_call',
+            tool_name: data.tool_name,
+            result: { ...data.header, sections: [], streamId: data.stream_id, streaming: true },
           });
+        } else {
+          onMenuStreamUpdate({ streamId: data.stream_id, seq: data.seq, section: data.section });
+        }
+      } else if (data.type === 'menu_complete') {
+        onMenuStreamUpdate({ streamId: data.stream_id, complete: true, total: data.total });
+      } else if (data.type === 'user_transcript') {
+        console.log('[AGENTSERVER] 🎤 User transcript:', data.text, '(final:', data.is_final, ')');
+        setUserTranscript(data.text);
+        if (data.is_final) {
+          onMessage({ role: 'user', content: data.text });
+          setTimeout(() => setUserTranscript(''), 500);
+        }
+      } else if (data.type === 'agent_transcript' || data.type === 'agent_response') {
+        console.log('[AGENTSERVER] 🗣️ Agent response:', data.text, '(final:', data.is_final, ')');
+        setAgentTranscript(data.text);
+        if (data.is_final) {
+          onMessage({ role: 'assistant', content: data.text });
+          setTimeout(() => setAgentTranscript(''), 500);
+        }
+      } else if (data.type === 'agent_error') {
+        console.error('[AGENTSERVER] ❌ Agent error received:', data);
+        setAgentError({
+          type: data.error_type || 'Unknown Error',
+          message: data.error_message || 'An unknown error occurred',
+          timestamp: data.timestamp || Date.now()
+        });
+        
+        onMessage({ 
+          role: 'assistant', 
+          content: `⚠️ Agent Error (${data.error_type || 'Unknown'}): ${data.error_message || 'The agent encountered an error. Please check logs.'}` 
+        });
+      } else if (data.type === 'tool_call') {
+        console.log('[AGENTSERVER] 🔧 Tool call:', data.tool_name);
+        onMessage({ 
+          role: 'assistant', 
+          content: `Executing: ${data.tool_name}`,
+          toolName: data.tool_name,
+          toolResult: data.result 
+        });
+        
+        // Update cart count from LiveKit data
+        const cartTools = ['quick_add_to_cart', 'quickAddToCart', 'addItemToCart', 
+                            'quick_view_cart', 'quickViewCart', 'viewCart',
+                            'remove_from_cart', 'removeFromCart',
+                            'update_cart_quantity', 'updateCartQuantity', 'update_cart'];
+        
+        if (cartTools.includes(data.tool_name) && data.result?.cart?.items) {
+          const itemCount = data.result.cart.items.reduce((sum: number, item: any) => sum + (item.quantity || 0), 0);
+          console.log('[AGENTSERVER] 🛒 Cart count from LiveKit:', itemCount);
+          onCartUpdate(itemCount);
+        } else if (data.tool_name === 'quick_checkout' || data.tool_name === 'quickCheckout') {
+          // Cart cleared after checkout
+          console.log('[AGENTSERVER] 🛒 Cart cleared after checkout');
+          onCartUpdate(0);
+        }
+      } else if (data.type === 'image_update') {
+        // Deferred image enrichment: fill in a card rendered earlier
+        console.log('[AGENTSERVER] 🖼️ Image update:', data.tool_name, data.id);
+        onImageUpdate(data);
+      } else if (data.type === 'agent_log') {
+        // NEW: Handle agent logs for debug panel
+        console.log('[AGENTSERVER] 📝 Agent log:', data);
+        onAgentLog({
+          type: data.log_type || 'info',
+          message: data.message || '',
+          timestamp: data.timestamp || Date.now(),
+          details: data.details
+        });
+      }
+    };
+
+    // Compressed packets inflate asynchronously; chain decoding to keep arrival order
+    let decodeChain = Promise.resolve();
+
+    const handleData = (payload: Uint8Array, participant?: any) => {
+      decodeChain = decodeChain.then(async () => {
+        try {
+          const text = await decodeAgentPayload(payload);
+          console.log('[AGENTSERVER] 📩 Received data message:', text);
+          const data = JSON.parse(text);
           
-          // Update cart count from LiveKit data
-          const cartTools = ['quick_add_to_cart', 'quickAddToCart', 'addItemToCart', 
-                              'quick_view_cart', 'quickViewCart', 'viewCart',
-                              'remove_from_cart', 'removeFromCart',
-                              'update_cart_quantity', 'updateCartQuantity'];
-          
-          if (cartTools.includes(data.tool_name) && data.result?.cart?.items) {
-            const itemCount = data.result.cart.items.reduce((sum: number, item: any) => sum + (item.quantity || 0), 0);
-            console.log('[AGENTSERVER] 🛒 Cart count from LiveKit:', itemCount);
-            onCartUpdate(itemCount);
-          } else if (data.tool_name === 'quick_checkout' || data.tool_name === 'quickCheckout') {
-            // Cart cleared after checkout
-            console.log('[AGENTSERVER] 🛒 Cart cleared after checkout');
-            onCartUpdate(0);
+          // The agent coalesces bursts of events into one packet
+          if (data.type === 'batch' && Array.isArray(data.messages)) {
+            data.messages.forEach(handleMessage);
+          } else {
+            handleMessage(data);
           }
-        } else if (data.type === 'agent_log') {
-          // NEW: Handle agent logs for debug panel
-          console.log('[AGENTSERVER] 📝 Agent log:', data);
-          onAgentLog({
-            type: data.log_type || 'info',
-            message: data.message || '',
-            timestamp: data.timestamp || Date.now(),
-            details: data.details
-          });
+        } catch (e) {
+          console.log('[AGENTSERVER] ℹ️ Non-JSON data received (likely audio)');
         }
-      } catch (e) {
-        console.log('[AGENTSERVER] ℹ️ Non-JSON data received (likely audio)');
-      }
+      });
     };
     
     room.on('dataReceived', handleData);
@@ -1063,7 +1227,7 @@ function VoiceAssistantControls({
       console.log('[AGENTSERVER] 🧹 Cleaning up data listener');
       room.off('dataReceived', handleData);
     };
-  }, [room, onMessage]);
+  }, [room, onMessage, onImageUpdate, onMenuStreamUpdate]);
 
   // Log state changes
   React.useEffect(() => {
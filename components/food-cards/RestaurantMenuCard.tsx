@@ -5,7 +5,9 @@ import { RestaurantMenuCardProps } from './types'
 import BaseCard, { CardSection, CardBadge, CardMetric, CardButton } from './BaseCard'
 
 const RestaurantMenuCard: React.FC<RestaurantMenuCardProps> = ({ data }) => {
-  const { restaurant, sections, speechSummary } = data
+  const { restaurant, speechSummary, streaming, sectionCount } = data
+  // Streamed menus fill in section by section; skip slots that have not arrived yet
+  const sections = data.sections.filter(Boolean)
   const [expandedSections, setExpandedSections] = useState<Set<string>>(new Set())
   
   const toggleSection = (sectionId: string) => {
@@ -72,7 +74,7 @@ const RestaurantMenuCard: React.FC<RestaurantMenuCardProps> = ({ data }) => {
         <div className="grid grid-cols-3 gap-4">
           <CardMetric
             label="Sections"
-            value={sections.length}
+            value={streaming && sectionCount ? `${sections.length}/${sectionCount}` : sections.length}
           />
           <CardMetric
             label="Items"
@@ -231,6 +233,12 @@ const RestaurantMenuCard: React.FC<RestaurantMenuCardProps> = ({ data }) => {
               </div>
             )
           })}
+
+          {streaming && (
+            <div className="text-center py-2 text-xs text-gray-500 animate-pulse">
+              Loading more sections…
+            </div>
+          )}
         </div>
       </CardSection>
 
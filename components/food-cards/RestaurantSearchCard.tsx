@@ -74,6 +74,15 @@ const RestaurantSearchCard: React.FC<RestaurantSearchCardProps> = ({ data }) =>
                 key={restaurant.id} 
                 className="border border-gray-200 rounded-lg p-3 bg-white shadow-sm hover:shadow-md transition-shadow"
               >
+                {/* Hero Image (may arrive after the results via image_update) */}
+                {restaurant.heroImage && (
+                  <img
+                    src={restaurant.heroImage}
+                    alt={restaurant.name}
+                    className="w-full h-24 object-cover rounded-md mb-2"
+                  />
+                )}
+
                 <div className="flex items-start justify-between mb-2">
                   <div className="flex-1">
                     <h4 className="font-semibold text-gray-900 text-sm">
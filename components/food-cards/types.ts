@@ -131,6 +131,8 @@ export interface RestaurantMenuData {
   restaurant: Restaurant;
   sections: MenuSection[];
   speechSummary: string;
+  streaming?: boolean;
+  sectionCount?: number;
 }
 
 export interface MenuItemSearchData {
@@ -0,0 +1,42 @@
+-- Catalog change tracking for incremental agent refresh
+-- The Python agent keeps an in-memory catalog snapshot and patches it by
+-- polling rows with updated_at newer than its last watermark. That only works
+-- if every UPDATE bumps updated_at and the delta query is index-backed.
+
+CREATE OR REPLACE FUNCTION "public"."fc_set_updated_at"() RETURNS "trigger"
+    LANGUAGE "plpgsql"
+    AS $$
+BEGIN
+    NEW.updated_at = timezone('utc'::text, now());
+    RETURN NEW;
+END;
+$$;
+
+
+ALTER FUNCTION "public"."fc_set_updated_at"() OWNER TO "postgres";
+
+
+CREATE OR REPLACE TRIGGER "fc_restaurants_set_updated_at"
+    BEFORE UPDATE ON "public"."fc_restaurants"
+    FOR EACH ROW EXECUTE FUNCTION "public"."fc_set_updated_at"();
+
+
+CREATE OR REPLACE TRIGGER "fc_menu_sections_set_updated_at"
+    BEFORE UPDATE ON "public"."fc_menu_sections"
+    FOR EACH ROW EXECUTE FUNCTION "public"."fc_set_updated_at"();
+
+
+CREATE OR REPLACE TRIGGER "fc_menu_items_set_updated_at"
+    BEFORE UPDATE ON "public"."fc_menu_items"
+    FOR EACH ROW EXECUTE FUNCTION "public"."fc_set_updated_at"();
+
+
+CREATE INDEX IF NOT EXISTS "fc_restaurants_updated_at_idx" ON "public"."fc_restaurants" USING "btree" ("updated_at");
+
+
+
+CREATE INDEX IF NOT EXISTS "fc_menu_sections_updated_at_idx" ON "public"."fc_menu_sections" USING "btree" ("updated_at");
+
+
+
+CREATE INDEX IF NOT EXISTS "fc_menu_items_updated_at_idx" ON "public"."fc_menu_items" USING "btree" ("updated_at");
@@ -0,0 +1,92 @@
+-- Index-backed menu search
+-- search_menu_items used to send name/description ILIKE '%word%' OR filters,
+-- which only btree indexes could not serve (sequential scan per search).
+-- This adds trigram GIN indexes for substring/fuzzy matching, a weighted
+-- tsvector column for full-text ranking, and a single ranked search RPC the
+-- Python agent calls in one round trip.
+
+CREATE EXTENSION IF NOT EXISTS "pg_trgm" WITH SCHEMA "extensions";
+
+
+ALTER TABLE "public"."fc_menu_items"
+    ADD COLUMN IF NOT EXISTS "search_vector" "tsvector"
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, COALESCE("name", '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, COALESCE("description", '')), 'B')
+    ) STORED;
+
+
+CREATE INDEX IF NOT EXISTS "fc_menu_items_search_vector_idx" ON "public"."fc_menu_items" USING "gin" ("search_vector");
+
+
+
+CREATE INDEX IF NOT EXISTS "fc_menu_items_name_trgm_idx" ON "public"."fc_menu_items" USING "gin" ("name" "extensions"."gin_trgm_ops");
+
+
+
+CREATE INDEX IF NOT EXISTS "fc_menu_items_description_trgm_idx" ON "public"."fc_menu_items" USING "gin" ("description" "extensions"."gin_trgm_ops");
+
+
+
+-- Ranked menu search: any query word may match (OR semantics, like the old
+-- Python re-ranking), full-text hits rank by ts_rank_cd and misspellings are
+-- caught by trigram similarity on the item name.
+CREATE OR REPLACE FUNCTION "public"."fc_search_menu_items"("search_query" "text", "max_results" integer DEFAULT 10)
+    RETURNS TABLE (
+        "id" "uuid",
+        "slug" "text",
+        "name" "text",
+        "description" "text",
+        "base_price" numeric,
+        "calories" integer,
+        "dietary_tags" "text"[],
+        "image" "text",
+        "section_name" "text",
+        "restaurant_id" "uuid",
+        "restaurant_slug" "text",
+        "restaurant_name" "text",
+        "rank" real
+    )
+    LANGUAGE "sql" STABLE
+    SET "search_path" TO 'public', 'extensions'
+    AS $$
+    WITH q AS (
+        SELECT
+            NULLIF(replace(plainto_tsquery('english'::regconfig, search_query)::text, '&', '|'), '')::tsquery AS tsq,
+            lower(trim(search_query)) AS raw
+    )
+    SELECT
+        mi.id,
+        mi.slug,
+        mi.name,
+        mi.description,
+        mi.base_price,
+        mi.calories,
+        mi.dietary_tags,
+        mi.image,
+        ms.name AS section_name,
+        r.id AS restaurant_id,
+        r.slug AS restaurant_slug,
+        r.name AS restaurant_name,
+        (COALESCE(ts_rank_cd(mi.search_vector, q.tsq), 0) + similarity(mi.name, q.raw))::real AS rank
+    FROM q, "public"."fc_menu_items" mi
+    JOIN "public"."fc_restaurants" r ON r.id = mi.restaurant_id
+    LEFT JOIN "public"."fc_menu_sections" ms ON ms.id = mi.section_id
+    WHERE mi.is_available
+      AND r.is_active IS NOT FALSE
+      AND (
+          mi.search_vector @@ q.tsq
+          OR mi.name % q.raw
+          OR mi.name ILIKE '%' || q.raw || '%'
+      )
+    ORDER BY rank DESC, mi.name
+    LIMIT GREATEST(max_results, 1);
+$$;
+
+
+ALTER FUNCTION "public"."fc_search_menu_items"("search_query" "text", "max_results" integer) OWNER TO "postgres";
+
+
+GRANT ALL ON FUNCTION "public"."fc_search_menu_items"("search_query" "text", "max_results" integer) TO "anon";
+GRANT ALL ON FUNCTION "public"."fc_search_menu_items"("search_query" "text", "max_results" integer) TO "authenticated";
+GRANT ALL ON FUNCTION "public"."fc_search_menu_items"("search_query" "text", "max_results" integer) TO "service_role";
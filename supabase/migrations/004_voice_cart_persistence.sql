@@ -0,0 +1,31 @@
+-- Write-behind persistence for agent voice carts
+-- The Python agent keeps each room's cart in memory and flushes it to
+-- fc_carts / fc_cart_items in batches (upsert carts by session, replace their
+-- lines), so a worker restart or job migration can restore the cart.
+-- Voice cart lines are keyed by spoken name and may not map to a catalog row
+-- yet, so menu_item_id becomes optional and the line name is stored.
+
+ALTER TABLE "public"."fc_carts"
+    ADD COLUMN IF NOT EXISTS "session_key" "text",
+    ADD COLUMN IF NOT EXISTS "restaurant_name" "text",
+    ADD COLUMN IF NOT EXISTS "delivery_fee" numeric(10,2) DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS "total" numeric(10,2) DEFAULT 0;
+
+-- Upsert target (NULLs do not conflict, so ordered carts can be detached).
+-- A unique index rather than a constraint so the migration can be re-run;
+-- ON CONFLICT ("session_key") infers either.
+CREATE UNIQUE INDEX IF NOT EXISTS "fc_carts_session_key_key" ON "public"."fc_carts" USING "btree" ("session_key");
+
+
+ALTER TABLE "public"."fc_cart_items"
+    ALTER COLUMN "menu_item_id" DROP NOT NULL,
+    ADD COLUMN IF NOT EXISTS "name" "text",
+    ADD COLUMN IF NOT EXISTS "line_key" "text",
+    ADD COLUMN IF NOT EXISTS "position" integer DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS "fc_cart_items_cart_id_idx" ON "public"."fc_cart_items" USING "btree" ("cart_id");
+
+
+CREATE OR REPLACE TRIGGER "fc_carts_set_updated_at"
+    BEFORE UPDATE ON "public"."fc_carts"
+    FOR EACH ROW EXECUTE FUNCTION "public"."fc_set_updated_at"();
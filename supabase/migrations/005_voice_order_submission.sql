@@ -0,0 +1,83 @@
+-- Voice order submission
+-- checkout_cart answers the user right away and journals the order locally;
+-- the agent's order queue then calls fc_submit_order, which writes the order,
+-- its lines and its events in one transaction (one round trip per order).
+-- The order's UUID, generated by the agent, doubles as the idempotency key:
+-- a retried or replayed submission returns the existing order instead of
+-- creating a second one.
+-- Voice carts can hold items the catalog could not price, so orders and
+-- order lines no longer require a catalog restaurant / menu item.
+
+ALTER TABLE "public"."fc_orders"
+    ALTER COLUMN "restaurant_id" DROP NOT NULL;
+
+
+ALTER TABLE "public"."fc_order_items"
+    ALTER COLUMN "menu_item_id" DROP NOT NULL;
+
+
+CREATE INDEX IF NOT EXISTS "fc_order_items_order_id_idx" ON "public"."fc_order_items" USING "btree" ("order_id");
+
+
+
+CREATE INDEX IF NOT EXISTS "fc_order_events_order_id_idx" ON "public"."fc_order_events" USING "btree" ("order_id");
+
+
+
+-- p_order: {id, order_number, profile_id, restaurant_id, restaurant_name,
+-- cuisine, status, subtotal, delivery_fee, total, placed_at,
+-- items: [{menu_item_id, name, quantity, unit_price, total_price}],
+-- events: [{event_type, event_data, notes, created_at}]}
+CREATE OR REPLACE FUNCTION "public"."fc_submit_order"("p_order" "jsonb")
+    RETURNS "jsonb"
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_order_id uuid := (p_order->>'id')::uuid;
+    v_inserted uuid;
+BEGIN
+    INSERT INTO public.fc_orders (
+        id, profile_id, restaurant_id, order_number, status, subtotal,
+        delivery_fee, total_amount, total, restaurant_name, cuisine, created_at
+    )
+    VALUES (
+        v_order_id,
+        (p_order->>'profile_id')::uuid,
+        NULLIF(p_order->>'restaurant_id', '')::uuid,
+        p_order->>'order_number',
+        COALESCE(p_order->>'status', 'pending'),
+        (p_order->>'subtotal')::numeric,
+        COALESCE((p_order->>'delivery_fee')::numeric, 0),
+        (p_order->>'total')::numeric,
+        (p_order->>'total')::numeric,
+        p_order->>'restaurant_name',
+        p_order->>'cuisine',
+        COALESCE((p_order->>'placed_at')::timestamptz, now())
+    )
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id INTO v_inserted;
+
+    -- Already submitted (a retry after a lost reply, or a journal replay)
+    IF v_inserted IS NULL THEN
+        RETURN jsonb_build_object('order_id', v_order_id, 'order_number', p_order->>'order_number', 'duplicate', true);
+    END IF;
+
+    INSERT INTO public.fc_order_items (order_id, menu_item_id, name, quantity, unit_price, total_price)
+    SELECT v_order_id, item.menu_item_id, item.name, item.quantity, item.unit_price, item.total_price
+    FROM jsonb_to_recordset(COALESCE(p_order->'items', '[]'::jsonb))
+        AS item(menu_item_id uuid, name text, quantity integer, unit_price numeric, total_price numeric);
+
+    INSERT INTO public.fc_order_events (order_id, event_type, event_data, notes, created_at)
+    SELECT v_order_id, event.event_type, event.event_data, event.notes, COALESCE(event.created_at, now())
+    FROM jsonb_to_recordset(COALESCE(p_order->'events', '[]'::jsonb))
+        AS event(event_type text, event_data jsonb, notes text, created_at timestamptz);
+
+    RETURN jsonb_build_object('order_id', v_order_id, 'order_number', p_order->>'order_number', 'duplicate', false);
+END;
+$$;
+
+
+ALTER FUNCTION "public"."fc_submit_order"("p_order" "jsonb") OWNER TO "postgres";
+
+
+GRANT ALL ON FUNCTION "public"."fc_submit_order"("p_order" "jsonb") TO "service_role";
@@ -0,0 +1,73 @@
+-- Plan regression check for fc_search_menu_items (003_menu_search_indexes.sql)
+-- Run against the local stack with: supabase test db
+--
+-- The RPC is a SQL function with its own search_path, so Postgres never
+-- inlines it and EXPLAIN on the call only shows a Function Scan. Instead the
+-- deployed function body is EXPLAINed with the query bound as a literal.
+-- Sequential scans are disabled so the small seed catalog cannot hide a
+-- predicate the indexes cannot serve: if one of the OR branches stops being
+-- index-backed, the planner falls back to a Seq Scan on fc_menu_items.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS "pgtap" WITH SCHEMA "extensions";
+
+SET LOCAL search_path TO public, extensions;
+SET LOCAL enable_seqscan TO off;
+
+CREATE FUNCTION pg_temp.search_plan(search_query text) RETURNS text
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+    body text;
+    plan_line text;
+    plan text := '';
+BEGIN
+    SELECT prosrc INTO body
+    FROM pg_proc
+    WHERE oid = 'public.fc_search_menu_items(text, integer)'::regprocedure;
+
+    body := regexp_replace(body, '\msearch_query\M', quote_literal(search_query), 'g');
+    body := regexp_replace(body, '\mmax_results\M', '10', 'g');
+    body := rtrim(btrim(body, E' \n\t'), ';');
+
+    FOR plan_line IN EXECUTE 'EXPLAIN (COSTS OFF) ' || body LOOP
+        plan := plan || plan_line || E'\n';
+    END LOOP;
+    RETURN plan;
+END;
+$$;
+
+SELECT plan(6);
+
+-- Spelled correctly: full-text branch
+SELECT ok(
+    pg_temp.search_plan('pad thai') ~ 'fc_menu_items_search_vector_idx',
+    'full-text match uses the search_vector GIN index'
+);
+SELECT ok(
+    pg_temp.search_plan('pad thai') ~ 'fc_menu_items_name_trgm_idx',
+    'name similarity and substring match use the name trigram GIN index'
+);
+SELECT ok(
+    pg_temp.search_plan('pad thai') !~ 'Seq Scan on fc_menu_items',
+    'menu search never scans fc_menu_items sequentially'
+);
+
+-- Misheard: only the trigram branch can match, but the plan must not change
+SELECT ok(
+    pg_temp.search_plan('chiken') ~ 'fc_menu_items_search_vector_idx',
+    'misspelled search still uses the search_vector GIN index'
+);
+SELECT ok(
+    pg_temp.search_plan('chiken') ~ 'fc_menu_items_name_trgm_idx',
+    'misspelled search uses the name trigram GIN index'
+);
+SELECT ok(
+    pg_temp.search_plan('chiken') !~ 'Seq Scan on fc_menu_items',
+    'misspelled search never scans fc_menu_items sequentially'
+);
+
+SELECT * FROM finish();
+
+ROLLBACK;